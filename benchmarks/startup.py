@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Startup time of the command line client.
+
+Runs ``python -X importtime -m yarn_api_client <args>`` a number of times and
+reports the median wall time, the median cumulative import time of the
+package and the slowest imports of the last run.  With ``--max-import-ms``
+the script exits with status 1 when the import time exceeds the budget, so
+it can track regressions in CI.
+
+Usage::
+
+    python benchmarks/startup.py [--runs 20] [--max-import-ms 50] [-- rm --help]
+"""
+from __future__ import print_function, unicode_literals
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def parse_importtime(stderr):
+    """
+    `(module, self us, cumulative us, depth)` tuples of an importtime report.
+    """
+    result = []
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            result.append((match.group(4), int(match.group(1)), int(match.group(2)), len(match.group(3)) // 2))
+    return result
+
+
+def run_once(args):
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    command = [sys.executable, '-X', 'importtime', '-m', 'yarn_api_client'] + args
+    begin = time.perf_counter()
+    process = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                             universal_newlines=True, env=env)
+    wall = time.perf_counter() - begin
+    return wall, parse_importtime(process.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Startup time of yarn_client')
+    parser.add_argument('--runs', type=int, default=20, help='number of runs')
+    parser.add_argument('--top', type=int, default=10, help='number of slowest imports to list')
+    parser.add_argument('--max-import-ms', type=float, help='fail if the package import time exceeds it')
+    parser.add_argument('args', nargs='*', help='command line of yarn_client (default: --help)')
+    opts = parser.parse_args()
+    args = opts.args or ['--help']
+
+    walls, imports = [], []
+    for _ in range(opts.runs):
+        wall, report = run_once(args)
+        walls.append(wall * 1000)
+        imports.append(sum(cumulative for module, _, cumulative, depth in report
+                           if depth == 0 and module.startswith('yarn_api_client')) / 1000.0)
+
+    modules = set(module for module, _, _, _ in report)
+    print('yarn_client {args}'.format(args=' '.join(args)))
+    print('  wall time (median of {runs}): {wall:.1f} ms'.format(runs=opts.runs, wall=statistics.median(walls)))
+    print('  yarn_api_client import time (median): {imports:.1f} ms'.format(imports=statistics.median(imports)))
+    print('  requests imported: {imported}'.format(imported='requests' in modules))
+    print('  slowest imports (self time):')
+    for module, own, _, _ in sorted(report, key=lambda entry: -entry[1])[:opts.top]:
+        print('    {own:8.2f} ms  {module}'.format(own=own / 1000.0, module=module))
+
+    if opts.max_import_ms is not None and statistics.median(imports) > opts.max_import_ms:
+        print('Import time exceeds {budget} ms'.format(budget=opts.max_import_ms))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
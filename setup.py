@@ -31,6 +31,11 @@ setup(
         'requests>=2.7,<3.0',
     ],
 
+    extras_require = {
+        'analysis': ['numpy'],
+        'kerberos': ['gssapi'],
+    },
+
     entry_points = {
         'console_scripts': [
             'yarn_client = yarn_api_client.main:main',
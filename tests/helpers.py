@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+import threading
+
+from http.server import HTTPServer
+from socketserver import ThreadingMixIn
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    """
+    Local HTTP server answering each request on its own thread, for tests
+    needing concurrent requests, which requests_mock serializes.
+    """
+    daemon_threads = True
+    block_on_close = False
+
+
+def start_http_server(handler, **attributes):
+    """
+    Starts a :py:class:`ThreadingHTTPServer` on a free local port, serving
+    on a daemon thread until its `shutdown()` is called.
+
+    :param handler: request handler class
+    :param attributes: attributes set on the server before it serves, to
+        share state with the handler
+    :rtype: :py:class:`ThreadingHTTPServer`
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    for name, value in attributes.items():
+        setattr(server, name, value)
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,))
+    thread.daemon = True
+    thread.start()
+    return server
@@ -1,8 +1,14 @@
 # -*- coding: utf-8 -*-
-from mock import patch
+import json
+import pickle
+import time
+import requests_mock
+
+from mock import MagicMock, patch
 from tests import TestCase
 
 from yarn_api_client.application_master import ApplicationMaster
+from yarn_api_client.errors import APIError, ConfigurationError
 
 
 @patch('yarn_api_client.application_master.ApplicationMaster.request')
@@ -75,3 +81,113 @@ class AppMasterTestCase(TestCase):
         request_mock.assert_called_with(
             '/proxy/app_1/ws/v1/mapreduce/jobs/job_2/tasks/task_3/attempts/attempt_4/counters'
         )
+
+
+class AppMasterDirectRoutingTestCase(TestCase):
+    def setUp(self):
+        self.rm = MagicMock()
+        self.app = ApplicationMaster('http://proxy:8089', resource_manager=self.rm, direct_routing=True)
+
+    def test_requires_resource_manager(self):
+        with self.assertRaises(ConfigurationError):
+            ApplicationMaster('localhost', direct_routing=True)
+
+    def test_direct_request(self):
+        self.rm.cluster_application.return_value.data = {'app': {
+            'trackingUrl': 'http://amhost:40000/', 'amHostHttpAddress': 'amhost:8042'}}
+
+        with requests_mock.mock() as requests_get_mock:
+            requests_get_mock.get('http://amhost:40000/ws/v1/mapreduce/info', text='{}')
+            requests_get_mock.get('http://amhost:40000/ws/v1/mapreduce/jobs', text=json.dumps({'jobs': None}))
+            self.app.jobs('app_1')
+            self.app.jobs('app_1')
+
+            self.assertEqual([r.path for r in requests_get_mock.request_history],
+                             ['/ws/v1/mapreduce/info', '/ws/v1/mapreduce/jobs', '/ws/v1/mapreduce/jobs'])
+            self.rm.cluster_application.assert_called_once_with('app_1')
+
+    def test_tracking_url_through_proxy(self):
+        # amHostHttpAddress is the NodeManager of the AM container, not the AM web app
+        self.rm.cluster_application.return_value.data = {'app': {
+            'trackingUrl': 'http://rm:8088/proxy/app_1/', 'amHostHttpAddress': 'amhost:8042'}}
+
+        self.assertIsNone(self.app.get_am_address('app_1'))
+        self.app.get_am_address('app_1')
+        self.assertEqual(self.rm.cluster_application.call_count, 1)
+        self.app.forget_am_address('app_1')
+        self.app.get_am_address('app_1')
+        self.assertEqual(self.rm.cluster_application.call_count, 2)
+
+    def test_failed_probe(self):
+        self.rm.cluster_application.return_value.data = {'app': {'trackingUrl': 'http://amhost:40000/'}}
+
+        with requests_mock.mock() as requests_get_mock:
+            requests_get_mock.get('http://amhost:40000/ws/v1/mapreduce/info', status_code=404)
+            requests_get_mock.get('http://proxy:8089/proxy/app_1/ws/v1/mapreduce/jobs', text=json.dumps({'jobs': None}))
+            self.app.jobs('app_1')
+            self.app.jobs('app_1')
+
+            self.assertEqual([r.hostname for r in requests_get_mock.request_history], ['amhost', 'proxy', 'proxy'])
+
+    def test_fallback_to_proxy(self):
+        self.rm.cluster_application.return_value.data = {'app': {'trackingUrl': 'http://amhost:40000/'}}
+
+        with requests_mock.mock() as requests_get_mock:
+            requests_get_mock.get('http://amhost:40000/ws/v1/mapreduce/info', text='{}')
+            requests_get_mock.get('http://amhost:40000/ws/v1/mapreduce/jobs', status_code=503)
+            requests_get_mock.get('http://proxy:8089/proxy/app_1/ws/v1/mapreduce/jobs', text=json.dumps({'jobs': None}))
+            self.app.jobs('app_1')
+            self.app.jobs('app_1')
+
+            self.assertEqual([r.hostname for r in requests_get_mock.request_history],
+                             ['amhost', 'amhost', 'proxy', 'proxy'])
+
+    def test_client_error_keeps_direct_route(self):
+        self.rm.cluster_application.return_value.data = {'app': {'trackingUrl': 'http://amhost:40000/'}}
+
+        with requests_mock.mock() as requests_get_mock:
+            requests_get_mock.get('http://amhost:40000/ws/v1/mapreduce/info', text='{}')
+            requests_get_mock.get('http://amhost:40000/ws/v1/mapreduce/jobs/job_0', status_code=404)
+            with self.assertRaises(APIError):
+                self.app.job('app_1', 'job_0')
+
+            self.assertEqual(requests_get_mock.call_count, 2)
+            self.assertEqual(self.app.get_am_address('app_1').to_url(), 'http://amhost:40000')
+
+    def test_unresolved_application(self):
+        self.rm.cluster_application.side_effect = APIError('not found')
+
+        with requests_mock.mock() as requests_get_mock:
+            requests_get_mock.get('http://proxy:8089/proxy/app_1/ws/v1/mapreduce/info', text='{}')
+            self.app.application_information('app_1')
+            self.app.application_information('app_1')
+            self.assertEqual(requests_get_mock.call_count, 2)
+        self.rm.cluster_application.assert_called_once_with('app_1')
+
+    def test_finished_application(self):
+        self.rm.cluster_application.return_value.data = {'app': {
+            'trackingUrl': 'http://jhs:19888/jobhistory/job/job_1', 'state': 'FINISHED'}}
+        with requests_mock.mock() as requests_get_mock:
+            self.assertIsNone(self.app.get_am_address('app_1'))
+            self.assertFalse(requests_get_mock.called)
+
+    def test_expired_addresses_dropped(self):
+        self.rm.cluster_application.return_value.data = {'app': {'trackingUrl': 'http://rm:8088/proxy/app_1/'}}
+        app = ApplicationMaster('http://proxy:8089', resource_manager=self.rm, direct_routing=True, unresolved_ttl=0.05)
+        app.get_am_address('app_1')
+        app.get_am_address('app_1')
+        self.assertEqual(self.rm.cluster_application.call_count, 1)
+
+        time.sleep(0.06)
+        app.get_am_address('app_2')
+        self.assertEqual(list(app._am_addresses), ['app_2'])
+        app.get_am_address('app_1')
+        self.assertEqual(self.rm.cluster_application.call_count, 3)
+
+    def test_pickle(self):
+        app = ApplicationMaster('http://proxy:8089', direct_routing=True, resource_manager={'stand-in': 'rm'})
+        app._cache_am_address('app_1', None)
+        clone = pickle.loads(pickle.dumps(app))
+
+        self.assertEqual(clone.service_uri.to_url(), 'http://proxy:8089')
+        self.assertIsNone(clone.get_am_address('app_1'))
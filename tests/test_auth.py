@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+import base64
+import pickle
+import socket
+import threading
+import time
+
+import requests
+import requests_mock
+
+from http.server import BaseHTTPRequestHandler
+from mock import patch
+from tests import TestCase
+from tests.helpers import start_http_server
+from yarn_api_client.auth import (AUTH_TIMEOUT, HadoopAuthTokenCache, SimpleAuth, SpnegoAuth, default_token_cache,
+                                  parse_hadoop_auth_expiry)
+from yarn_api_client.base import BaseYarnAPI
+from yarn_api_client.errors import ConfigurationError
+
+
+def _token(user, expiry):
+    return '"u={user}&p={user}&t=simple&e={expiry}&s=c2lnbmF0dXJl"'.format(user=user, expiry=int(expiry * 1000))
+
+
+class HadoopAuthTokenCacheTestCase(TestCase):
+    def test_parse_expiry(self):
+        self.assertEqual(parse_hadoop_auth_expiry(_token('yarn', 1600000000)), 1600000000)
+        self.assertIsNone(parse_hadoop_auth_expiry('u=yarn&s=abc'))
+        self.assertIsNone(parse_hadoop_auth_expiry('e=soon'))
+        self.assertIsNone(parse_hadoop_auth_expiry(None))
+
+    def test_expiry(self):
+        cache = HadoopAuthTokenCache(margin=30)
+        cache.set(('yarn', 'http://rm:8088'), _token('yarn', time.time() + 3600))
+        cache.set(('hdfs', 'http://rm:8088'), _token('hdfs', time.time() + 10))
+        self.assertIsNotNone(cache.get(('yarn', 'http://rm:8088')))
+        self.assertIsNone(cache.get(('hdfs', 'http://rm:8088')))
+
+    def test_single_fetch(self):
+        cache = HadoopAuthTokenCache()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            time.sleep(0.05)
+            return 'token'
+
+        threads = [threading.Thread(target=cache.get_or_fetch, args=(('yarn', 'http://rm:8088'), fetch))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache._fetch_locks, {})
+
+    def test_fetch_lock_released_on_error(self):
+        cache = HadoopAuthTokenCache()
+
+        def fetch():
+            raise requests.ConnectionError('unreachable')
+
+        with self.assertRaises(requests.ConnectionError):
+            cache.get_or_fetch(('yarn', 'http://rm:8088'), fetch)
+        cache.get_or_fetch(('yarn', 'http://rm:8089'), lambda: 'token')
+        self.assertEqual(cache._fetch_locks, {})
+
+    def test_invalidate(self):
+        cache = HadoopAuthTokenCache()
+        cache.set('key', 'new')
+        cache.invalidate('key', 'old')
+        self.assertEqual(cache.get('key'), 'new')
+        cache.invalidate('key', 'new')
+        self.assertIsNone(cache.get('key'))
+
+
+class SimpleAuthTestCase(TestCase):
+    def setUp(self):
+        self.cache = HadoopAuthTokenCache()
+        self.token = _token('yarn', time.time() + 3600)
+
+    def test_token_shared_between_handlers(self):
+        with requests_mock.mock() as mock:
+            mock.get('http://rm:8088/ws/v1/cluster/info', [
+                {'text': '', 'cookies': {'hadoop.auth': self.token}},
+                {'text': '{}'},
+                {'text': '{}'},
+            ])
+            requests.get('http://rm:8088/ws/v1/cluster/info', auth=SimpleAuth('yarn', self.cache))
+            requests.get('http://rm:8088/ws/v1/cluster/info', auth=SimpleAuth('yarn', self.cache))
+
+            self.assertEqual(mock.call_count, 3)
+            self.assertEqual(mock.request_history[0].qs, {'user.name': ['yarn']})
+            self.assertIn('hadoop.auth=' + self.token, mock.request_history[2].headers['Cookie'])
+
+    def test_standby_rm(self):
+        with requests_mock.mock() as mock:
+            mock.get('http://rm:8088/ws/v1/cluster/info', text='This is standby RM. The redirect url is: ...')
+            requests.get('http://rm:8088/ws/v1/cluster/info', auth=SimpleAuth('yarn', self.cache))
+
+            self.assertNotIn('Cookie', mock.last_request.headers)
+            self.assertIsNone(self.cache.get(('yarn', 'http://rm:8088')))
+
+    def test_refresh_on_401(self):
+        fresh = _token('yarn', time.time() + 7200)
+        self.cache.set(('yarn', 'http://rm:8088'), self.token)
+
+        with requests_mock.mock() as mock:
+            mock.get('http://rm:8088/ws/v1/cluster/info', [
+                {'status_code': 401},
+                {'text': '', 'cookies': {'hadoop.auth': fresh}},
+                {'text': '{}'},
+            ])
+            response = requests.get('http://rm:8088/ws/v1/cluster/info', auth=SimpleAuth('yarn', self.cache),
+                                    cookies={'other': 'value'})
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(mock.call_count, 3)
+            self.assertEqual(mock.last_request.headers['Cookie'], 'other=value; hadoop.auth=' + fresh)
+            self.assertEqual(self.cache.get(('yarn', 'http://rm:8088')), fresh)
+
+    def test_default_timeout(self):
+        with requests_mock.mock() as mock:
+            mock.get('http://rm:8088/ws/v1/cluster/info', text='', cookies={'hadoop.auth': self.token})
+            requests.get('http://rm:8088/ws/v1/cluster/info', auth=SimpleAuth('yarn', self.cache))
+
+            self.assertEqual(mock.request_history[0].timeout, AUTH_TIMEOUT)
+
+    def test_client_settings(self):
+        auth = SimpleAuth('yarn', self.cache)
+        proxies = {'http': 'http://proxy:3128'}
+        client = BaseYarnAPI('http://rm:8088', timeout=5, auth=auth, verify='/etc/ssl/ca.pem', proxies=proxies)
+
+        with requests_mock.mock() as mock:
+            mock.get('http://rm:8088/ws/v1/cluster/info', [
+                {'text': '', 'cookies': {'hadoop.auth': self.token}},
+                {'text': '{}'},
+            ])
+            client.request('/ws/v1/cluster/info')
+
+            authentication = mock.request_history[0]
+            self.assertEqual(authentication.qs, {'user.name': ['yarn']})
+            self.assertEqual((authentication.timeout, authentication.verify, authentication.proxies),
+                             (5, '/etc/ssl/ca.pem', proxies))
+        # The handler given to the client is left unchanged
+        self.assertIsNone(auth.timeout)
+        self.assertIsNone(auth.verify)
+
+    def test_pickle(self):
+        auth = pickle.loads(pickle.dumps(SimpleAuth('hdfs')))
+        self.assertEqual(auth.username, 'hdfs')
+        self.assertIs(auth.token_cache, default_token_cache)
+        self.assertEqual(pickle.loads(pickle.dumps(self.cache)).margin, 30)
+
+
+class _NegotiateHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        cookies = self.headers.get('Cookie') or ''
+        authorization = self.headers.get('Authorization') or ''
+
+        if authorization == 'Negotiate ' + base64.b64encode(b'ticket').decode('ascii'):
+            server.negotiations += 1
+            server.valid_token = _token('alice@EXAMPLE.COM', time.time() + 3600).strip('"')
+            self._reply(200, {'Set-Cookie': 'hadoop.auth="{0}"; Path=/; HttpOnly'.format(server.valid_token)})
+        elif server.valid_token and server.valid_token in cookies:
+            self._reply(200)
+        else:
+            self._reply(401, {'WWW-Authenticate': 'Negotiate'})
+
+    def _reply(self, status, headers=None):
+        body = b'{}'
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class SpnegoAuthTestCase(TestCase):
+    def setUp(self):
+        self.server = start_http_server(_NegotiateHandler, negotiations=0, valid_token=None)
+        self.url = 'http://127.0.0.1:{port}/ws/v1/cluster/info'.format(port=self.server.server_port)
+        self.cache = HadoopAuthTokenCache()
+        self.hosts = []
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def negotiate(self, hostname, principal):
+        self.hosts.append((hostname, principal))
+        return base64.b64encode(b'ticket').decode('ascii')
+
+    def test_negotiate_once(self):
+        auth = SpnegoAuth('alice@EXAMPLE.COM', negotiate=self.negotiate, token_cache=self.cache)
+        for _ in range(3):
+            self.assertEqual(requests.get(self.url, auth=auth).status_code, 200)
+        # A new handler for the same principal reuses the cookie as well
+        other = SpnegoAuth('alice@EXAMPLE.COM', negotiate=self.negotiate, token_cache=self.cache)
+        self.assertEqual(requests.get(self.url, auth=other).status_code, 200)
+
+        self.assertEqual(self.server.negotiations, 1)
+        self.assertEqual(self.hosts, [('127.0.0.1', 'alice@EXAMPLE.COM')])
+
+    def test_renegotiate_on_401(self):
+        auth = SpnegoAuth(negotiate=self.negotiate, token_cache=self.cache)
+        requests.get(self.url, auth=auth)
+        # Server side secret rotation invalidates the issued cookie
+        self.server.valid_token = 'rotated'
+
+        self.assertEqual(requests.get(self.url, auth=auth).status_code, 200)
+        self.assertEqual(self.server.negotiations, 2)
+
+    def test_unresponsive_service(self):
+        # Connections are queued by the listening socket but never answered
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(1)
+        self.addCleanup(listener.close)
+        url = 'http://127.0.0.1:{port}/ws/v1/cluster/info'.format(port=listener.getsockname()[1])
+
+        auth = SpnegoAuth(negotiate=self.negotiate, token_cache=self.cache, timeout=0.1)
+        with self.assertRaises(requests.Timeout):
+            auth.authenticate(url)
+
+    def test_positional_arguments(self):
+        # Same order as the other cookie auth handlers
+        auth = SpnegoAuth('alice@EXAMPLE.COM', self.negotiate, self.cache, 5, '/etc/ssl/ca.pem', {})
+        simple = SimpleAuth('alice', self.cache, 5, '/etc/ssl/ca.pem', {})
+        for handler in (auth, simple):
+            self.assertEqual((handler.token_cache, handler.timeout, handler.verify, handler.proxies),
+                             (self.cache, 5, '/etc/ssl/ca.pem', {}))
+
+    def test_missing_gssapi(self):
+        with patch.dict('sys.modules', {'gssapi': None}):
+            with self.assertRaises(ConfigurationError):
+                SpnegoAuth()
@@ -1,8 +1,20 @@
 # -*- coding: utf-8 -*-
 import json
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+import requests
 import requests_mock
 
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler
+
+from mock import patch
 from tests import TestCase
+from tests.helpers import start_http_server
 from yarn_api_client import base
 from yarn_api_client.errors import APIError, ConfigurationError
 
@@ -84,3 +96,308 @@ class BaseYarnAPITestCase(TestCase):
         client.auth = None
         client.verify = True
         return client
+
+
+class SharedSessionTestCase(TestCase):
+    def tearDown(self):
+        base.clear_shared_sessions()
+
+    def test_shared_session_registry(self):
+        first = base.BaseYarnAPI('http://example.com:80', share_session=True)
+        second = base.BaseYarnAPI('http://example.com:80', auth=('user', 'pass'), share_session=True)
+        other_port = base.BaseYarnAPI('http://example.com:81', share_session=True)
+        other_proxies = base.BaseYarnAPI('http://example.com:80', proxies={'http': 'proxy:3128'}, share_session=True)
+        private = base.BaseYarnAPI('http://example.com:80')
+
+        self.assertIs(first.session, second.session)
+        self.assertIsNot(first.session, other_port.session)
+        self.assertIsNot(first.session, other_proxies.session)
+        self.assertIsNot(first.session, private.session)
+
+    def test_auth_is_sent_per_request(self):
+        client = base.BaseYarnAPI('http://example.com:80', auth=('user', 'pass'), share_session=True)
+        self.assertIsNone(client.session.auth)
+
+        with requests_mock.mock() as requests_get_mock:
+            requests_get_mock.get('/ololo', text=json.dumps(BaseYarnAPITestCase.success_response()))
+            client.request('/ololo')
+            self.assertIn('Authorization', requests_get_mock.last_request.headers)
+
+    @patch.dict('os.environ', {'REQUESTS_CA_BUNDLE': '', 'CURL_CA_BUNDLE': ''})
+    def test_ssl_context(self):
+        context = base.get_ssl_context(True)
+        self.assertIs(base.get_ssl_context(True), context)
+
+        client = base.BaseYarnAPI('https://example.com:8090', share_session=True)
+        adapter = client.session.get_adapter('https://example.com:8090')
+        self.assertIsInstance(adapter, base.SSLContextAdapter)
+        self.assertIs(adapter.ssl_context, context)
+
+        insecure = base.BaseYarnAPI('https://example.com:8090', verify=False, share_session=True)
+        self.assertNotIsInstance(insecure.session.get_adapter('https://example.com:8090'), base.SSLContextAdapter)
+
+    def test_ssl_context_of_environment_ca_bundle(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        ca_bundle = os.path.join(tmpdir, 'ca.pem')
+        shutil.copy(requests.certs.where(), ca_bundle)
+
+        with patch.dict('os.environ', {'REQUESTS_CA_BUNDLE': ca_bundle}):
+            client = base.BaseYarnAPI('https://example.com:8090', share_session=True)
+            session = client.session
+            url = 'https://example.com:8090/ws/v1/cluster/info'
+            verify = session.merge_environment_settings(url, {}, None, None, None)['verify']
+            adapter = session.get_adapter(url)
+            _, pool_kwargs = adapter.build_connection_pool_key_attributes(
+                requests.Request('GET', url).prepare(), verify)
+
+        context = base.get_ssl_context(ca_bundle)
+        self.assertIs(adapter.ssl_context, context)
+        self.assertIs(pool_kwargs['ssl_context'], context)
+        self.assertNotIn('ca_certs', pool_kwargs)
+
+
+class ForkSafetyTestCase(TestCase):
+    def tearDown(self):
+        base.clear_shared_sessions()
+
+    def test_session_rebuilt_in_other_process(self):
+        client = base.BaseYarnAPI('http://example.com:80', auth=('user', 'pass'))
+        session = client.session
+        client._pid = -1
+
+        with requests_mock.mock() as requests_get_mock:
+            requests_get_mock.get('/ololo', text='{}')
+            client.request('/ololo')
+
+        self.assertIsNot(client.session, session)
+        self.assertEqual(client.session.auth, ('user', 'pass'))
+
+    def test_shared_sessions_reset_in_other_process(self):
+        session = base.get_shared_session(base.Uri('http://example.com:80'))
+        base._shared_pid = -1
+        self.assertIsNot(base.get_shared_session(base.Uri('http://example.com:80')), session)
+
+    def test_pickle(self):
+        client = base.BaseYarnAPI('https://example.com:8090', timeout=10, verify=False, share_session=True)
+        clone = pickle.loads(pickle.dumps(client))
+
+        self.assertEqual(clone.service_uri.to_url(), 'https://example.com:8090')
+        self.assertEqual(clone.timeout, 10)
+        self.assertIs(clone.session, client.session)
+
+
+class EndpointPoolTestCase(TestCase):
+    def test_least_outstanding_requests(self):
+        pool = base.EndpointPool(['http://a:1', 'http://b:1', 'http://c:1'])
+        first, second, third = pool.acquire(), pool.acquire(), pool.acquire()
+        self.assertEqual(sorted([first, second, third]), [0, 1, 2])
+        pool.release(second)
+        self.assertEqual(pool.acquire(), second)
+
+    def test_power_of_two_choices(self):
+        pool = base.EndpointPool(['http://a:1', 'http://b:1', 'http://c:1'], policy=base.POWER_OF_TWO_CHOICES)
+        busy = pool.acquire()
+        for _ in range(20):
+            index = pool.acquire()
+            self.assertNotEqual(index, busy)
+            pool.release(index)
+
+        with self.assertRaises(ConfigurationError):
+            base.EndpointPool(['http://a:1'], policy='round_robin')
+
+    def test_ejection_and_readmission(self):
+        pool = base.EndpointPool(['http://a:1', 'http://b:1'], max_failures=2, ejection_time=60)
+        for _ in range(2):
+            pool.release(pool.acquire(exclude=[1]), failed=True)
+        self.assertTrue(pool.is_ejected(0))
+        self.assertEqual([pool.acquire() for _ in range(3)], [1, 1, 1])
+
+        # Re-admitted, a single failure ejects it again
+        pool._ejected_until[0] = 0
+        self.assertFalse(pool.is_ejected(0))
+        pool._outstanding[0] = 0
+        pool._outstanding[1] = 0
+        pool.release(pool.acquire(exclude=[1]), failed=True)
+        self.assertTrue(pool.is_ejected(0))
+
+        # All endpoints ejected: the one re-admitted first is used
+        for _ in range(2):
+            pool.release(pool.acquire(exclude=[0]), failed=True)
+        pool._ejected_until[1] = pool._ejected_until[0] - 1
+        self.assertEqual(pool.acquire(), 1)
+
+    def test_pooled_requests(self):
+        client = base.BaseYarnAPI(['http://a:1', 'http://b:1'])
+        self.assertIsInstance(client.endpoint_pool, base.EndpointPool)
+        with requests_mock.mock() as mock:
+            mock.get('http://a:1/ws', status_code=503)
+            mock.get('http://b:1/ws', json={'status': 'success'})
+            for _ in range(4):
+                self.assertEqual(client.request('/ws').data['status'], 'success')
+
+            # Client errors are not endpoint failures and are not retried
+            mock.get('http://b:1/missing', status_code=404)
+            mock.get('http://a:1/missing', status_code=404)
+            with self.assertRaises(APIError) as context:
+                client.request('/missing')
+            self.assertEqual(context.exception.status_code, 404)
+            self.assertEqual(len([r for r in mock.request_history if r.path == '/missing']), 1)
+
+    def test_pool_pickle(self):
+        pool = pickle.loads(pickle.dumps(base.EndpointPool(['http://a:1'], max_failures=5)))
+        self.assertEqual(pool.max_failures, 5)
+        self.assertEqual(pool.acquire(), 0)
+
+
+class _SlowFirstHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.calls.append(self.server.server_port)
+            first = len(self.server.calls) == 1 and self.server.slow_first
+        if first:
+            self.server.release.wait(5)
+        body = json.dumps({'status': 'success', 'port': self.server.server_port}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _SaturatedExecutor(object):
+    # Runs the first task submitted, the following ones stay queued
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.running = None
+        self.queued = []
+
+    def submit(self, fn, *args):
+        if self.running is None:
+            self.running = self.executor.submit(fn, *args)
+            return self.running
+        future = Future()
+        self.queued.append(future)
+        return future
+
+
+class HedgePolicyTestCase(TestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.calls = []
+        self.servers = [self._start_server(slow_first=True), self._start_server(slow_first=False)]
+
+    def _start_server(self, slow_first):
+        return start_http_server(_SlowFirstHandler, lock=threading.Lock(), calls=self.calls, release=self.release,
+                                 slow_first=slow_first)
+
+    def _endpoint(self, index):
+        return 'http://127.0.0.1:{port}'.format(port=self.servers[index].server_port)
+
+    def tearDown(self):
+        self.release.set()
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+
+    def test_hedge_slow_request(self):
+        client = base.BaseYarnAPI(self._endpoint(0))
+        client.hedge_policy = base.HedgePolicy(max_delay=0.05)
+        begin = time.time()
+        self.assertEqual(client.request('/ws').data['status'], 'success')
+        self.assertLess(time.time() - begin, 2)
+        self.assertEqual(len(self.calls), 2)
+
+        stats = client.hedge_policy.stats()
+        self.assertEqual((stats['requests'], stats['hedged'], stats['hedge_wins']), (1, 1, 1))
+        self.assertEqual(stats['hedge_rate'], 1.0)
+
+    def test_hedge_on_other_endpoint(self):
+        client = base.BaseYarnAPI(base.EndpointPool([self._endpoint(0), self._endpoint(1)]))
+        client.hedge_policy = base.HedgePolicy(max_delay=0.05)
+        # The first request goes to the slow endpoint
+        client.endpoint_pool._outstanding[1] = 1
+        response = client.request('/ws')
+        self.assertEqual(response.data['port'], self.servers[1].server_port)
+        self.assertEqual(self.calls, [self.servers[0].server_port, self.servers[1].server_port])
+
+    def test_queued_hedge_releases_endpoint(self):
+        self.servers[1].slow_first = True
+        client = base.BaseYarnAPI(base.EndpointPool([self._endpoint(0), self._endpoint(1)]))
+        client.hedge_policy = base.HedgePolicy(max_delay=0.05)
+        executor = client.hedge_policy._executor = _SaturatedExecutor()
+        self.addCleanup(executor.executor.shutdown)
+        threading.Timer(0.2, self.release.set).start()
+
+        self.assertEqual(client.request('/ws').data['status'], 'success')
+        self.assertEqual(len(executor.queued), 1)
+        self.assertTrue(executor.queued[0].cancelled())
+        self.assertEqual(client.endpoint_pool._outstanding, [0, 0])
+
+    def test_delay_starts_with_the_attempt(self):
+        self.release.set()
+        client = base.BaseYarnAPI(self._endpoint(1))
+        client.hedge_policy = base.HedgePolicy(max_delay=0.05, max_workers=1)
+        # Requests of other threads occupy the pool
+        client.hedge_policy.executor().submit(time.sleep, 0.3)
+
+        self.assertEqual(client.request('/ws').data['status'], 'success')
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(client.hedge_policy.stats()['hedged'], 0)
+
+    def test_fast_requests_not_hedged(self):
+        self.release.set()
+        client = base.BaseYarnAPI(self._endpoint(1))
+        client.hedge_policy = base.HedgePolicy(min_delay=1, max_delay=5, min_samples=2)
+        for _ in range(3):
+            client.request('/ws')
+        self.assertEqual(len(self.calls), 3)
+        self.assertEqual(client.hedge_policy.stats()['hedged'], 0)
+        self.assertEqual(client.hedge_policy.requests, 3)
+        self.assertLess(client.hedge_policy.delay(), 5)
+
+    def test_client_errors_not_hedged(self):
+        client = base.BaseYarnAPI('http://localhost:8088')
+        client.hedge_policy = base.HedgePolicy(max_delay=5)
+        with requests_mock.mock() as mock:
+            mock.get('http://localhost:8088/ws', status_code=404, text='not found')
+            with self.assertRaises(APIError) as context:
+                client.request('/ws')
+            self.assertEqual(context.exception.status_code, 404)
+            self.assertEqual(mock.call_count, 1)
+        self.assertEqual(client.hedge_policy.stats()['hedged'], 0)
+
+    def test_server_errors_hedged(self):
+        client = base.BaseYarnAPI('http://localhost:8088')
+        client.hedge_policy = base.HedgePolicy(max_delay=5)
+        with requests_mock.mock() as mock:
+            mock.get('http://localhost:8088/ws', [{'status_code': 503, 'text': 'busy'},
+                                                  {'status_code': 200, 'json': {'status': 'success'}}])
+            self.assertEqual(client.request('/ws').data, {'status': 'success'})
+            self.assertEqual(mock.call_count, 2)
+        self.assertEqual(client.hedge_policy.stats()['hedge_wins'], 1)
+
+    def test_delay_follows_latency_once_window_is_full(self):
+        policy = base.HedgePolicy(window=1000, max_delay=5)
+        for _ in range(1000):
+            policy.observe(0.01)
+        self.assertEqual(policy.delay(), 0.01)
+        for _ in range(5000):
+            policy.observe(2.0)
+        self.assertEqual(policy.delay(), 2.0)
+
+    def test_percentile_delay(self):
+        policy = base.HedgePolicy(percentile=90, min_delay=0.001, max_delay=10, min_samples=10)
+        self.assertEqual(policy.delay(), 10)
+        for latency in range(1, 101):
+            policy.observe(latency / 1000.0)
+        self.assertAlmostEqual(policy.delay(), 0.090, places=3)
+
+        policy = pickle.loads(pickle.dumps(policy))
+        self.assertEqual((policy.percentile, policy.delay()), (90, 10))
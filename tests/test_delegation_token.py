@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import requests_mock
+
+from mock import MagicMock, patch
+from tests import TestCase
+
+from yarn_api_client.delegation_token import DelegationToken, DelegationTokenManager
+from yarn_api_client.errors import APIError
+from yarn_api_client.resource_manager import ResourceManager
+
+
+def _response(data):
+    response = MagicMock()
+    response.data = data
+    return response
+
+
+def _new_token(token, expires_in, max_validity_in=3600):
+    now = time.time()
+    return _response({
+        'token': token,
+        'renewer': 'yarn',
+        'owner': 'client@REALM',
+        'kind': 'RM_DELEGATION_TOKEN',
+        'expiration-time': int((now + expires_in) * 1000),
+        'max-validity': int((now + max_validity_in) * 1000),
+    })
+
+
+class DelegationTokenManagerTestCase(TestCase):
+    def setUp(self):
+        self.rm = MagicMock()
+        self.rm.cluster_new_delegation_token.side_effect = [_new_token('token_1', 600), _new_token('token_2', 600)]
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.tmpdir, 'token.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_fetch_once_across_threads(self):
+        manager = DelegationTokenManager(self.rm, 'yarn')
+        tokens = []
+        threads = [threading.Thread(target=lambda: tokens.append(manager.token())) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(tokens, ['token_1'] * 8)
+        self.rm.cluster_new_delegation_token.assert_called_once_with('yarn')
+
+    def test_renew_when_due(self):
+        manager = DelegationTokenManager(self.rm, 'yarn', jitter=0)
+        manager.token()
+        # Nothing to do before 75% of the lifetime elapsed
+        self.assertAlmostEqual(manager.next_delay(), 450, delta=5)
+        manager.poll()
+        self.rm.cluster_renew_delegation_token.assert_not_called()
+
+        expiration = int((time.time() + 1200) * 1000)
+        self.rm.cluster_renew_delegation_token.return_value = _response({'expiration-time': expiration})
+        manager._renew_at = 0
+        manager.poll()
+
+        self.rm.cluster_renew_delegation_token.assert_called_once_with('token_1')
+        self.assertEqual(manager.delegation_token().expiration, expiration / 1000.0)
+        self.assertAlmostEqual(manager.next_delay(), 900, delta=5)
+
+    def test_failed_renewal_retries(self):
+        manager = DelegationTokenManager(self.rm, 'yarn', retry_interval=10)
+        manager.token()
+        self.rm.cluster_renew_delegation_token.side_effect = APIError('boom')
+        manager._renew_at = 0
+        manager.poll()
+
+        self.assertEqual(manager.token(), 'token_1')
+        self.assertAlmostEqual(manager.next_delay(), 10, delta=1)
+
+    def test_failed_replacement_retries(self):
+        self.rm.cluster_new_delegation_token.side_effect = [_new_token('token_1', 30), APIError('boom'),
+                                                            APIError('boom')]
+        self.rm.cluster_renew_delegation_token.side_effect = APIError('boom')
+        manager = DelegationTokenManager(self.rm, 'yarn', retry_interval=10)
+        manager.token()
+        manager._renew_at = 0
+        manager.poll()
+
+        self.assertGreaterEqual(manager.next_delay(), 9)
+        manager.poll()
+        self.assertEqual(self.rm.cluster_renew_delegation_token.call_count, 1)
+        self.assertEqual(self.rm.cluster_new_delegation_token.call_count, 2)
+
+    def test_new_token_after_max_validity(self):
+        self.rm.cluster_new_delegation_token.side_effect = [_new_token('token_1', 600, 30),
+                                                            _new_token('token_2', 600)]
+        manager = DelegationTokenManager(self.rm, 'yarn')
+        manager.token()
+        manager._renew_at = 0
+        manager.poll()
+
+        self.assertEqual(manager.token(), 'token_2')
+        self.rm.cluster_renew_delegation_token.assert_not_called()
+        self.rm.cluster_cancel_delegation_token.assert_called_once_with('token_1')
+
+    def test_expiring_token_replaced_and_cancelled(self):
+        self.rm.cluster_new_delegation_token.side_effect = [_new_token('token_1', 30), _new_token('token_2', 600)]
+        manager = DelegationTokenManager(self.rm, 'yarn')
+        self.assertEqual(manager.token(), 'token_1')
+        # Within the margin, without a running poller
+        self.assertEqual(manager.token(), 'token_2')
+        self.rm.cluster_cancel_delegation_token.assert_called_once_with('token_1')
+
+    def test_disk_cache_shared_between_managers(self):
+        first = DelegationTokenManager(self.rm, 'yarn', cache_path=self.cache_path)
+        self.assertEqual(first.token(), 'token_1')
+        with open(self.cache_path) as f:
+            self.assertEqual(json.load(f)['token'], 'token_1')
+
+        second = DelegationTokenManager(self.rm, 'yarn', cache_path=self.cache_path)
+        self.assertEqual(second.token(), 'token_1')
+        self.rm.cluster_new_delegation_token.assert_called_once_with('yarn')
+
+        # Tokens for another renewer are not reused
+        other = DelegationTokenManager(self.rm, 'other', cache_path=self.cache_path)
+        self.assertEqual(other.token(), 'token_2')
+
+    def test_cancel_on_stop(self):
+        manager = DelegationTokenManager(self.rm, 'yarn', cache_path=self.cache_path, cancel_on_stop=True)
+        with manager:
+            manager.token()
+        self.rm.cluster_cancel_delegation_token.assert_called_once_with('token_1')
+        self.assertFalse(os.path.exists(self.cache_path))
+
+        kept = DelegationTokenManager(self.rm, 'yarn', cache_path=self.cache_path, cancel_on_stop=False)
+        with kept:
+            kept.token()
+        self.rm.cluster_cancel_delegation_token.assert_called_once_with('token_1')
+        self.assertTrue(os.path.exists(self.cache_path))
+
+    def test_shared_cache_not_cancelled_by_default(self):
+        with DelegationTokenManager(self.rm, 'yarn', cache_path=self.cache_path) as manager:
+            manager.token()
+        self.rm.cluster_cancel_delegation_token.assert_not_called()
+        self.assertTrue(os.path.exists(self.cache_path))
+
+        with DelegationTokenManager(self.rm, 'yarn') as manager:
+            manager.token()
+        self.rm.cluster_cancel_delegation_token.assert_called_once_with('token_2')
+
+    def test_token_round_trip(self):
+        token = DelegationToken.from_response(_new_token('token_1', 600).data)
+        self.assertEqual(DelegationToken.from_dict(token.to_dict()).to_dict(), token.to_dict())
+        self.assertFalse(token.expires_within(60))
+        self.assertTrue(token.expires_within(601))
+        self.assertTrue(token.renewable())
+
+
+class DelegationTokenManagerRequestTestCase(TestCase):
+    @patch('yarn_api_client.resource_manager.check_is_active_rm')
+    def test_renew_and_cancel_through_resource_manager(self, check_is_active_rm_mock):
+        check_is_active_rm_mock.return_value = True
+        rm = ResourceManager(['http://rm:8088'])
+        manager = DelegationTokenManager(rm, 'yarn', jitter=0)
+        url = 'http://rm:8088/ws/v1/cluster/delegation-token'
+
+        with requests_mock.mock() as requests_mock_:
+            requests_mock_.post(url, json=_new_token('token_1', 600).data)
+            expiration = int((time.time() + 1200) * 1000)
+            renew = requests_mock_.post(url + '/expiration', json={'expiration-time': expiration})
+            cancel = requests_mock_.delete(url, text='')
+
+            self.assertEqual(manager.token(), 'token_1')
+            manager._renew_at = 0
+            manager.poll()
+            self.assertEqual(manager.delegation_token().expiration, expiration / 1000.0)
+            manager.cancel()
+
+        for mocked in (renew, cancel):
+            self.assertEqual(mocked.call_count, 1)
+            self.assertEqual(mocked.last_request.headers['Hadoop-YARN-RM-Delegation-Token'], 'token_1')
+            self.assertEqual(mocked.last_request.headers['Content-Type'], 'application/json')
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+import threading
+
+from mock import MagicMock
+from tests import TestCase
+
+from yarn_api_client.errors import APIError, DeadlineExceededError, IllegalArgumentError
+from yarn_api_client.federation import MultiClusterClient
+from yarn_api_client.resource_manager import ResourceManager
+
+
+def _response(data):
+    response = MagicMock()
+    response.data = data
+    return response
+
+
+def _rm(apps=None, error=None, delay=None):
+    rm = MagicMock(spec=ResourceManager)
+    release = threading.Event()
+
+    def cluster_applications(**kwargs):
+        if delay:
+            release.wait(delay)
+        if error:
+            raise error
+        return _response({'apps': {'app': apps} if apps else None})
+    rm.cluster_applications.side_effect = cluster_applications
+    rm.release = release
+    return rm
+
+
+class MultiClusterClientTestCase(TestCase):
+    def setUp(self):
+        self.slow = _rm([{'id': 'app_3'}], delay=5)
+        self.clusters = {
+            'east': _rm([{'id': 'app_1', 'user': 'alice'}, {'id': 'app_2', 'user': 'alice'}]),
+            'west': _rm(error=APIError('boom')),
+            'north': self.slow,
+            'south': _rm(),
+        }
+        self.client = MultiClusterClient(self.clusters, deadline=0.2)
+
+    def tearDown(self):
+        self.slow.release.set()
+        self.client.close()
+
+    def test_partial_results(self):
+        result = self.client.cluster_applications(states=['RUNNING'], user='alice')
+        self.assertTrue(result.partial)
+        self.assertEqual(sorted(result.results), ['east', 'south'])
+        self.assertIsInstance(result.errors['west'], APIError)
+        self.assertIsInstance(result.errors['north'], DeadlineExceededError)
+        self.assertEqual([(r['cluster'], r['id']) for r in result.records()], [('east', 'app_1'), ('east', 'app_2')])
+        self.clusters['east'].cluster_applications.assert_called_once_with(states=['RUNNING'], user='alice')
+
+    def test_per_cluster_deadline(self):
+        self.slow.release.set()
+        result = self.client.call('cluster_applications', clusters=['east', 'north'],
+                                  deadline={'east': 0.2, 'north': 10})
+        self.assertFalse(result.partial)
+        self.assertEqual(list(result.results), ['east', 'north'])
+
+    def test_find_application(self):
+        self.clusters['east'].cluster_application.return_value = _response({'app': {'id': 'app_1'}})
+        for cluster in ('west', 'north', 'south'):
+            self.clusters[cluster].cluster_application.side_effect = APIError('not found')
+        self.assertEqual(self.client.find_application('app_1'), ('east', {'id': 'app_1'}))
+
+    def test_read_methods_only(self):
+        with self.assertRaises(IllegalArgumentError):
+            self.client.call('cluster_application_kill', 'app_1')
+        with self.assertRaises(AttributeError):
+            self.client.cluster_application_kill
+
+    def test_lazy_clients(self):
+        client = MultiClusterClient({'a': 'rm1:8088', 'b': ['rm2:8088', 'rm3:8088']})
+        self.assertEqual(client.clients['a'].service_endpoints, ['rm1:8088'])
+        self.assertEqual(client.clients['b'].service_endpoints, ['rm2:8088', 'rm3:8088'])
+        self.assertTrue(client.clients['b'].lazy)
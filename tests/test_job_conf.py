@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+from mock import MagicMock
+from tests import TestCase
+
+from yarn_api_client.job_conf import JobConf, JobConfStore, diff_job_conf
+
+
+def _conf(**properties):
+    return {'conf': {'path': 'hdfs://job.xml', 'property': [
+        {'name': name.replace('_', '.'), 'value': value, 'source': ['job.xml']}
+        for name, value in properties.items()
+    ]}}
+
+
+class JobConfTestCase(TestCase):
+    def test_from_response(self):
+        conf = JobConf.from_response(_conf(mapreduce_job_reduces='10', mapreduce_job_maps='5'))
+        self.assertEqual(conf.keys, ('mapreduce.job.maps', 'mapreduce.job.reduces'))
+        self.assertEqual(conf['mapreduce.job.reduces'], '10')
+        self.assertEqual(conf.get('mapreduce.job.queuename', 'default'), 'default')
+        self.assertIn('mapreduce.job.maps', conf)
+        self.assertEqual(len(conf), 2)
+
+        self.assertEqual(len(JobConf.from_response({'conf': None})), 0)
+
+    def test_digest(self):
+        first = JobConf.from_response(_conf(a='1', b='2'))
+        second = JobConf.from_response(_conf(b='2', a='1'))
+        third = JobConf.from_response(_conf(a='1', b='3'))
+        self.assertEqual(first.digest, second.digest)
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, third)
+
+    def test_diff(self):
+        slow = JobConf.from_response(_conf(a='1', b='2', c='3'))
+        fast = JobConf.from_response(_conf(b='2', c='4', d='5'))
+        self.assertEqual(diff_job_conf(slow, fast), [
+            ('a', '1', None),
+            ('c', '3', '4'),
+            ('d', None, '5'),
+        ])
+        self.assertEqual(slow.diff(slow), [])
+
+
+class JobConfStoreTestCase(TestCase):
+    def test_deduplication(self):
+        store = JobConfStore()
+        first = store.add_response('job_1', _conf(a='1', b='2'))
+        second = store.add_response('job_2', _conf(a='1', b='2'))
+        store.add_response('job_3', _conf(a='1', b='3'))
+
+        self.assertIs(first, second)
+        self.assertEqual(len(store), 3)
+        self.assertEqual(store.unique_count(), 2)
+        self.assertEqual(store.diff('job_1', 'job_3'), [('b', '2', '3')])
+
+        store.remove('job_1')
+        self.assertEqual(store.unique_count(), 2)
+        store.remove('job_2')
+        self.assertEqual(store.unique_count(), 1)
+        self.assertIsNone(store.get('job_1'))
+
+    def test_shared_values_released(self):
+        store = JobConfStore()
+        store.add_response('job_1', _conf(a='1', b='2'))
+        store.add_response('job_2', _conf(a='1', b='3'))
+        store.add_response('job_3', _conf(c='1', d='1'))
+
+        store.remove('job_1')
+        self.assertEqual(sorted(store._values), ['1', '3'])
+        self.assertEqual(sorted(store._key_tuples), [('a', 'b'), ('c', 'd')])
+
+        # Replacing the configuration of a job releases the previous one
+        store.add_response('job_2', _conf(c='1', d='1'))
+        self.assertEqual(sorted(store._values), ['1'])
+        self.assertEqual(sorted(store._key_tuples), [('c', 'd')])
+
+        store.remove('job_2')
+        store.remove('job_3')
+        self.assertEqual(store._values, {})
+        self.assertEqual(store._key_tuples, {})
+
+    def test_fetch(self):
+        store = JobConfStore()
+        history_server = MagicMock()
+        history_server.job_conf.return_value.data = _conf(a='1')
+        application_master = MagicMock()
+        application_master.job_conf.return_value.data = _conf(a='1')
+
+        store.fetch_from_history_server(history_server, 'job_1')
+        store.fetch_from_history_server(history_server, 'job_1')
+        history_server.job_conf.assert_called_once_with('job_1')
+
+        conf = store.fetch_from_application_master(application_master, 'app_2', 'job_2')
+        application_master.job_conf.assert_called_once_with('app_2', 'job_2')
+        self.assertIs(conf, store.get('job_1'))
@@ -1,9 +1,114 @@
 # -*- coding: utf-8 -*-
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests_mock
+
+from io import StringIO
+from mock import MagicMock
 from tests import TestCase
 
 import yarn_api_client.main as m
+from yarn_api_client.output import parse_fields
 
 
 class MainTestCase(TestCase):
     def test_get_parser(self):
         m.get_parser()
+
+    def test_selected_service(self):
+        self.assertEqual(m.get_selected_service(['--endpoint', 'rm', 'hs', 'jobs']), 'hs')
+        self.assertEqual(m.get_selected_service(['--output=csv', 'nm', 'apps']), 'nm')
+        self.assertIsNone(m.get_selected_service(['--help']))
+
+        opts = m.get_parser('hs').parse_args(['hs', 'job', 'job_1'])
+        self.assertEqual(opts.method, 'job')
+        self.assertEqual(m.get_api_class(opts.api_class).__name__, 'HistoryServer')
+
+    def test_top_options(self):
+        opts = m.get_parser('rm').parse_args(['rm', 'top', '--interval', '5'])
+        self.assertEqual((opts.top, opts.interval, opts.rows), ('ResourceManagerTop', 5, None))
+        opts = m.get_parser('nm').parse_args(['nm', 'top', '--rows', '20'])
+        self.assertEqual((opts.top, opts.interval, opts.rows), ('NodeManagerTop', 2, 20))
+
+    def test_lazy_imports(self):
+        code = ("import sys, yarn_api_client.main as m; "
+                "m.get_parser(m.get_selected_service(['rm', 'apps'])).parse_args(['rm', 'apps']); "
+                "print(sorted(k for k in ('requests', 'yarn_api_client.resource_manager') if k in sys.modules))")
+        self.assertEqual(subprocess.check_output([sys.executable, '-c', code]).strip(), b'[]')
+
+        from yarn_api_client import ResourceManager
+        from yarn_api_client.resource_manager import ResourceManager as rm_class
+        self.assertIs(ResourceManager, rm_class)
+
+    def test_output_options(self):
+        opts = m.get_parser().parse_args(['--output', 'jsonl', '--fields', 'id,state', 'rm', 'apps'])
+        self.assertEqual(opts.output, 'jsonl')
+        self.assertEqual(opts.fields, 'id,state')
+
+    def test_write_response(self):
+        response = MagicMock()
+        response.data = {'apps': {'app': [{'id': 'app_1', 'state': 'RUNNING'}]}}
+
+        stream = StringIO()
+        m.write_response(response, 'csv', parse_fields('id'), stream)
+        self.assertEqual(stream.getvalue(), 'id\napp_1\n')
+
+        stream = StringIO()
+        m.write_response(response, 'pprint', parse_fields('state'), stream)
+        self.assertEqual(stream.getvalue(), "[{'state': 'RUNNING'}]\n")
+
+
+class BatchTestCase(TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def _run(self, lines, *args):
+        with open(self.path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        argv = ['--endpoint', 'http://hs:19888', '--output', 'jsonl'] + list(args) + ['batch', '--file', self.path]
+        opts = m.get_parser(m.get_selected_service(argv)).parse_args(argv)
+        stream, errors = StringIO(), StringIO()
+
+        def job(request, context):
+            job_id = re.search(r'jobs/(job_\d+)', request.path).group(1)
+            # Later jobs answer first, the output must keep the input order
+            time.sleep(0.02 * (4 - int(job_id[-1])))
+            return {'job': {'id': job_id}}
+
+        with requests_mock.Mocker() as mocker:
+            mocker.get(re.compile(r'/ws/v1/history/mapreduce/jobs/job_\d+$'), json=job)
+            failures = m.run_batch(opts, stream, errors)
+        return failures, [json.loads(line)['id'] for line in stream.getvalue().splitlines()], errors.getvalue()
+
+    def test_commands(self):
+        failures, ids, errors = self._run(
+            ['hs job job_1', '', '# comment', 'hs job job_2', 'xx job job_9', 'hs job job_3'], '--fields', 'id')
+        self.assertEqual(ids, ['job_1', 'job_2', 'job_3'])
+        self.assertEqual(failures, 1)
+        self.assertIn('line 5', errors)
+
+    def test_command_prefix(self):
+        # Bare ids are not commands
+        failures, ids, _ = self._run(['job_3', 'job_1'])
+        self.assertEqual((failures, ids), (2, []))
+
+        argv = ['--endpoint', 'http://hs:19888', 'batch', '--command', 'hs job', '--workers', '2']
+        opts = m.get_parser('batch').parse_args(argv)
+        runner = m.BatchRunner(opts.endpoint, 'jsonl', opts.workers, opts.command)
+        with requests_mock.Mocker() as mocker:
+            mocker.get(re.compile(r'/jobs/job_\d+$'), json=lambda request, context: {'job': {'id': request.path}})
+            results = list(runner.run(['job_3', 'job_1', 'job_2']))
+        self.assertEqual([number for number, _, _, _ in results], [1, 2, 3])
+        self.assertEqual([response.data['job']['id'][-5:] for _, _, response, _ in results],
+                         ['job_3', 'job_1', 'job_2'])
+        self.assertEqual(len(runner._apis), 1)
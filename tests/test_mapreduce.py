@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+from mock import MagicMock
+from tests import TestCase
+
+from yarn_api_client.errors import APIError
+from yarn_api_client.mapreduce import (MapReduceJobClient, application_to_job_id,
+                                       APPLICATION_MASTER, HISTORY_SERVER)
+
+
+class MapReduceJobClientTestCase(TestCase):
+    def setUp(self):
+        self.am = MagicMock()
+        self.hs = MagicMock()
+        self.client = MapReduceJobClient(self.am, self.hs)
+
+    def test_application_to_job_id(self):
+        self.assertEqual(application_to_job_id('application_1326821518301_0005'), 'job_1326821518301_0005')
+
+    def test_running_application(self):
+        self.client.job_counters('application_1_1', 'job_1_1')
+        self.am.job_counters.assert_called_once_with('application_1_1', 'job_1_1')
+        self.hs.job_counters.assert_not_called()
+        self.assertEqual(self.client.served_by('application_1_1'), APPLICATION_MASTER)
+
+    def test_handoff(self):
+        self.am.job_tasks.side_effect = APIError('moved', status_code=302)
+        self.client.job_tasks('application_1_1', 'job_1_1')
+        self.hs.job_tasks.assert_called_once_with('job_1_1')
+        self.assertEqual(self.client.served_by('application_1_1'), HISTORY_SERVER)
+
+        # Later calls go straight to the history server
+        self.client.job_conf('application_1_1', 'job_1_1')
+        self.client.task_attempt('application_1_1', 'job_1_1', 'task_1', 'attempt_1')
+        self.am.job_conf.assert_not_called()
+        self.am.task_attempt.assert_not_called()
+        self.hs.job_conf.assert_called_once_with('job_1_1')
+        self.hs.task_attempt.assert_called_once_with('job_1_1', 'task_1', 'attempt_1')
+
+    def test_history_server_failure_is_not_remembered(self):
+        self.am.job.side_effect = ValueError('not JSON')
+        self.hs.job.side_effect = APIError('not found yet')
+        with self.assertRaises(APIError):
+            self.client.job('application_1_1', 'job_1_1')
+        self.assertIsNone(self.client.served_by('application_1_1'))
+
+    def test_finished_application_not_found(self):
+        self.am.job.side_effect = APIError('not found', status_code=404)
+        self.am.application_information.side_effect = APIError('not found', status_code=404)
+        self.client.job('application_1_1', 'job_1_1')
+        self.hs.job.assert_called_once_with('job_1_1')
+        self.assertEqual(self.client.served_by('application_1_1'), HISTORY_SERVER)
+
+    def test_client_errors_raised(self):
+        self.am.job.side_effect = APIError('unknown job', status_code=404)
+        with self.assertRaises(APIError):
+            self.client.job('application_1_1', 'job_1_2')
+        self.am.job_tasks.side_effect = APIError('bad request', status_code=400)
+        with self.assertRaises(APIError):
+            self.client.job_tasks('application_1_1', 'job_1_1')
+
+        self.am.application_information.assert_called_once_with('application_1_1')
+        self.hs.job.assert_not_called()
+        self.hs.job_tasks.assert_not_called()
+        self.assertIsNone(self.client.served_by('application_1_1'))
+
+    def test_served_by_bounded(self):
+        client = MapReduceJobClient(self.am, self.hs, max_applications=2)
+        client.job('application_1_1', 'job_1_1')
+        client.job('application_1_2', 'job_1_2')
+        client.job('application_1_1', 'job_1_1')
+        client.job('application_1_3', 'job_1_3')
+        self.assertEqual(list(client._served_by), ['application_1_1', 'application_1_3'])
+
+    def test_jobs_from_history_server(self):
+        self.am.jobs.side_effect = APIError('moved', status_code=302)
+        self.hs.job.return_value.data = {'job': {'id': 'job_1_1', 'state': 'SUCCEEDED'}}
+
+        response = self.client.jobs('application_1_1')
+        self.hs.job.assert_called_once_with('job_1_1')
+        self.assertEqual(response.data, {'jobs': {'job': [{'id': 'job_1_1', 'state': 'SUCCEEDED'}]}})
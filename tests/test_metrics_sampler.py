@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from mock import MagicMock
+from tests import TestCase
+
+from yarn_api_client.errors import APIError
+from yarn_api_client.metrics_sampler import MetricsSampler, RingBuffer
+
+
+class RingBufferTestCase(TestCase):
+    def test_wraps_around(self):
+        buffer = RingBuffer(3, 1)
+        for i in range(5):
+            buffer.append(i, [i * 10])
+        timestamps, values = buffer.series()
+        np.testing.assert_array_equal(timestamps, [2, 3, 4])
+        np.testing.assert_array_equal(values[:, 0], [20, 30, 40])
+        self.assertEqual(len(buffer), 3)
+
+
+class MetricsSamplerTestCase(TestCase):
+    def setUp(self):
+        self.rm = MagicMock()
+        self.sampler = MetricsSampler(self.rm, fields=['appsSubmitted', 'allocatedMB'],
+                                      resolutions=[(60, 10), (1, 5)])
+
+    def test_poll(self):
+        self.rm.cluster_metrics.return_value.data = {'clusterMetrics': {'appsSubmitted': 3, 'allocatedMB': 1024,
+                                                                        'other': 'ignored'}}
+        self.sampler.poll()
+        self.assertEqual(self.sampler.latest('appsSubmitted'), 3)
+        self.assertEqual(self.sampler.latest('allocatedMB'), 1024)
+
+        self.rm.cluster_metrics.side_effect = APIError('boom')
+        self.sampler.poll()
+        self.assertEqual(len(self.sampler.series('appsSubmitted')[0]), 1)
+
+    def test_application_statistics(self):
+        sampler = MetricsSampler(self.rm, fields=['appsSubmitted'], application_statistics=True)
+        self.rm.cluster_metrics.return_value.data = {'clusterMetrics': {'appsSubmitted': 3}}
+        self.rm.cluster_application_statistics.return_value.data = {'appStatInfo': {'statItem': [
+            {'state': 'RUNNING', 'type': '*', 'count': 2}, {'state': 'ACCEPTED', 'type': '*', 'count': 1}]}}
+        sampler.poll()
+        self.assertEqual(sampler.latest('apps.RUNNING'), 2)
+        self.assertEqual(sampler.latest('apps.ACCEPTED'), 1)
+        self.assertTrue(np.isnan(sampler.latest('apps.KILLED')))
+
+    def test_memory_is_bounded(self):
+        for second in range(100):
+            self.sampler.record({'appsSubmitted': second}, 1000 + second)
+        timestamps, values = self.sampler.series('appsSubmitted', resolution=1)
+        # 5 samples kept, plus the second being filled
+        np.testing.assert_array_equal(timestamps, [1094, 1095, 1096, 1097, 1098, 1099])
+        np.testing.assert_array_equal(values, [94, 95, 96, 97, 98, 99])
+
+    def test_downsampling(self):
+        for second in range(0, 180, 10):
+            self.sampler.record({'appsSubmitted': second, 'allocatedMB': 100}, 1200 + second)
+        timestamps, values = self.sampler.series('appsSubmitted', resolution=60)
+        np.testing.assert_array_equal(timestamps, [1200, 1260, 1320])
+        np.testing.assert_array_equal(values, [25, 85, 145])
+        # Windows longer than the seconds kept are read from the minutes
+        self.assertEqual(len(self.sampler.series('allocatedMB', window=120)[0]), 3)
+
+    def test_rates_and_deltas(self):
+        for second in range(5):
+            self.sampler.record({'appsSubmitted': 2 * second, 'allocatedMB': None}, 1000 + second)
+        self.assertEqual(self.sampler.delta('appsSubmitted', 4), 8)
+        self.assertEqual(self.sampler.rate('appsSubmitted', 4), 2)
+        self.assertEqual(self.sampler.delta('appsSubmitted', 2), 4)
+        self.assertIsNone(self.sampler.rate('allocatedMB', 4))
+        self.assertIsNone(MetricsSampler(self.rm).delta('appsSubmitted', 60))
+
+        with self.assertRaises(ValueError):
+            self.sampler.series('appsSubmitted', resolution=3600)
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from mock import MagicMock
+from tests import TestCase
+
+from yarn_api_client.node_inventory import NodeInventory
+
+
+def _node(node_id, rack, avail_memory, avail_vcores=4, state='RUNNING', labels=None):
+    return {'id': node_id, 'nodeHostName': node_id.split(':')[0], 'rack': rack, 'state': state,
+            'nodeLabels': labels, 'usedMemoryMB': 8192 - avail_memory, 'availMemoryMB': avail_memory,
+            'usedVirtualCores': 8 - avail_vcores, 'availableVirtualCores': avail_vcores, 'numContainers': 1,
+            'lastHealthUpdate': 1000}
+
+
+def _nodes(*nodes):
+    return {'nodes': {'node': list(nodes)}}
+
+
+NODES = _nodes(
+    _node('n1:8041', '/r1', 1024),
+    _node('n2:8041', '/r1', 4096, labels=['gpu']),
+    _node('n3:8041', '/r2', 2048, avail_vcores=1),
+    _node('n4:8041', '/r2', 8192, state='UNHEALTHY'),
+)
+
+
+class NodeInventoryTestCase(TestCase):
+    def setUp(self):
+        self.inventory = NodeInventory.from_response(NODES)
+
+    def test_columns(self):
+        self.assertEqual(len(self.inventory), 4)
+        np.testing.assert_array_equal(self.inventory.avail_memory, [1024, 4096, 2048, 8192])
+        np.testing.assert_array_equal(self.inventory.used_vcores, [4, 4, 7, 4])
+        self.assertEqual(self.inventory.strings['rack'].values, ['/r1', '/r2'])
+        self.assertEqual(self.inventory.strings['label'].values, ['', 'gpu'])
+        self.assertEqual(self.inventory.index_of('n3:8041'), 2)
+        self.assertEqual(self.inventory.hosts[0], 'n1')
+        with self.assertRaises(AttributeError):
+            self.inventory.missing
+
+    def test_filters(self):
+        self.assertEqual(self.inventory.filter(states=['RUNNING'], min_memory=2048), ['n2:8041', 'n3:8041'])
+        self.assertEqual(self.inventory.filter(labels=['gpu']), ['n2:8041'])
+        self.assertEqual(self.inventory.filter(racks=['/r2'], min_vcores=2), ['n4:8041'])
+        self.assertEqual(self.inventory.filter(labels=['unknown']), [])
+
+    def test_top(self):
+        self.assertEqual(self.inventory.top(2), ['n4:8041', 'n2:8041'])
+        self.assertEqual(self.inventory.top(10, mask=self.inventory.mask(states=['RUNNING'])),
+                         ['n2:8041', 'n3:8041', 'n1:8041'])
+        self.assertEqual(self.inventory.top(1, by='used_vcores'), ['n3:8041'])
+
+    def test_group_by(self):
+        self.assertEqual(self.inventory.group_by('rack'), {'/r1': 5120, '/r2': 10240})
+        self.assertEqual(self.inventory.group_by('label', 'num_containers'), {'': 3, 'gpu': 1})
+        self.assertEqual(self.inventory.group_by('state', mask=self.inventory.mask(racks=['/r2'])),
+                         {'RUNNING': 2048, 'UNHEALTHY': 8192})
+
+    def test_refresh_reuses_buffer(self):
+        buffer = self.inventory._buffer
+        rm = MagicMock()
+        rm.cluster_nodes.return_value.data = _nodes(_node('n5:8041', '/r3', 512))
+        self.inventory.refresh(rm, states=['RUNNING'])
+
+        rm.cluster_nodes.assert_called_once_with(states=['RUNNING'])
+        self.assertIs(self.inventory._buffer, buffer)
+        self.assertEqual(len(self.inventory), 1)
+        self.assertEqual(self.inventory.filter(racks=['/r3']), ['n5:8041'])
+        # Codes of strings interned before stay valid
+        self.assertEqual(self.inventory.strings['rack'].values, ['/r1', '/r2', '/r3'])
+
+        self.inventory.load(_nodes(*[_node('n{0}:8041'.format(i), '/r1', i) for i in range(10)]))
+        self.assertEqual(self.inventory.capacity, 10)
+        self.assertEqual(self.inventory.top(1), ['n9:8041'])
+
+    def test_empty(self):
+        inventory = NodeInventory.from_response({'nodes': None})
+        self.assertEqual(len(inventory), 0)
+        self.assertEqual(inventory.top(5), [])
+        self.assertEqual(inventory.group_by(), {})
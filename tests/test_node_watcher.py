@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+from mock import MagicMock
+from tests import TestCase
+
+from yarn_api_client.errors import APIError
+from yarn_api_client.node_watcher import NodeWatcher
+
+
+def _node(node_id, state='RUNNING', last_health_update=1000, health_report='', **fields):
+    node = {'id': node_id, 'state': state, 'lastHealthUpdate': last_health_update, 'healthReport': health_report}
+    node.update(fields)
+    return node
+
+
+def _nodes(*nodes):
+    return MagicMock(data={'nodes': {'node': list(nodes)}})
+
+
+class NodeWatcherTestCase(TestCase):
+    def setUp(self):
+        self.rm = MagicMock()
+
+    def _events(self, watcher):
+        return [(event.kind, event.node_id, event.old_state, event.new_state, event.reason)
+                for event in watcher.poll()]
+
+    def test_first_poll_reports_problem_states(self):
+        self.rm.cluster_nodes.return_value = _nodes(_node('n1'), _node('n2', 'UNHEALTHY', health_report='disk full'))
+        watcher = NodeWatcher(self.rm)
+        self.assertEqual(self._events(watcher), [('UNHEALTHY', 'n2', None, 'UNHEALTHY', 'disk full')])
+        self.rm.cluster_nodes.assert_called_once_with(states=None)
+        self.assertEqual(sorted(watcher.nodes), ['n1', 'n2'])
+
+    def test_transitions(self):
+        events = []
+        watcher = NodeWatcher(self.rm, on_event=events.append)
+        self.rm.cluster_nodes.return_value = _nodes(_node('n1'), _node('n2'), _node('n3'))
+        watcher.poll()
+
+        self.rm.cluster_nodes.return_value = _nodes(
+            _node('n1', 'LOST'),
+            _node('n2', 'DECOMMISSIONING', decommissioningTimeout=3600),
+            _node('n3', last_health_update=2000),
+            _node('n4'))
+        self.assertEqual(self._events(watcher), [
+            ('LOST', 'n1', 'RUNNING', 'LOST', None),
+            ('DECOMMISSIONING', 'n2', 'RUNNING', 'DECOMMISSIONING', 'decommissioning timeout 3600s'),
+            ('RUNNING', 'n4', None, 'RUNNING', None),
+        ])
+        self.assertEqual([event.node_id for event in events], ['n1', 'n2', 'n4'])
+
+        self.rm.cluster_nodes.return_value = _nodes(
+            _node('n1', 'LOST'), _node('n3', last_health_update=3000, health_report='slow disk'), _node('n4'))
+        self.assertEqual(self._events(watcher), [
+            ('HEALTH_CHANGED', 'n3', 'RUNNING', 'RUNNING', 'slow disk'),
+            ('REMOVED', 'n2', 'DECOMMISSIONING', None, None),
+        ])
+
+    def test_unchanged_health_update_skipped(self):
+        watcher = NodeWatcher(self.rm)
+        self.rm.cluster_nodes.return_value = _nodes(_node('n1', health_report='ok'))
+        watcher.poll()
+        # Same state and health update: the health report is not compared
+        self.rm.cluster_nodes.return_value = _nodes(_node('n1', health_report='changed'))
+        self.assertEqual(watcher.poll(), [])
+
+    def test_state_filtered_polling(self):
+        watcher = NodeWatcher(self.rm, states=['LOST', 'UNHEALTHY'])
+        self.rm.cluster_nodes.return_value = _nodes(_node('n1', 'LOST'))
+        self.assertEqual(self._events(watcher), [('LOST', 'n1', None, 'LOST', None)])
+        self.rm.cluster_nodes.assert_called_with(states=['LOST', 'UNHEALTHY'])
+
+        self.rm.cluster_nodes.return_value = _nodes(_node('n2', 'UNHEALTHY', health_report='bad'))
+        self.assertEqual(self._events(watcher), [('UNHEALTHY', 'n2', None, 'UNHEALTHY', 'bad'),
+                                                 ('REMOVED', 'n1', 'LOST', None, None)])
+
+    def test_failed_poll_keeps_nodes(self):
+        watcher = NodeWatcher(self.rm)
+        self.rm.cluster_nodes.return_value = _nodes(_node('n1'))
+        watcher.poll()
+        self.rm.cluster_nodes.side_effect = APIError('boom')
+        self.assertEqual(watcher.poll(), [])
+        self.assertIn('n1', watcher.nodes)
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+import json
+
+from io import StringIO
+from mock import MagicMock
+from tests import TestCase
+
+from yarn_api_client.output import (StreamingResponse, get_writer, iter_json_records, iter_records,
+                                    parse_fields, project)
+
+APPS = {'apps': {'app': [
+    {'id': 'app_1', 'state': 'RUNNING', 'resourceInfo': {'memory': 1024}},
+    {'id': 'app_2', 'state': 'FINISHED', 'resourceInfo': {'memory': 2048}},
+]}}
+
+
+def _response(data):
+    response = MagicMock()
+    response.content = json.dumps(data, indent=2).encode('utf-8')
+    return response
+
+
+class RecordsTestCase(TestCase):
+    def test_iter_records(self):
+        cases = [
+            APPS,
+            {'app': {'id': 'app_1', 'state': 'RUNNING'}},
+            {'clusterInfo': {'id': 1, 'haState': 'ACTIVE'}},
+            {'apps': None},
+            {'apps': {'app': []}},
+            {},
+            [{'id': 1}, {'id': 2}],
+        ]
+        for data in cases:
+            records = list(iter_records(data))
+            self.assertEqual(list(iter_json_records(json.dumps(data, indent=1))), records)
+
+        self.assertEqual([r['id'] for r in iter_records(APPS)], ['app_1', 'app_2'])
+        self.assertEqual(list(iter_records({'app': {'id': 'app_1'}})), [{'id': 'app_1'}])
+        self.assertEqual(list(iter_records({'apps': None})), [])
+
+    def test_streaming_response(self):
+        response = StreamingResponse(_response(APPS))
+        self.assertEqual([r['id'] for r in response.records()], ['app_1', 'app_2'])
+        self.assertEqual(response.data, APPS)
+
+        response.data = {'jobs': {'job': []}}
+        self.assertEqual(list(response.records()), [])
+
+    def test_project(self):
+        fields = parse_fields('id, resourceInfo.memory,missing')
+        self.assertEqual(project(APPS['apps']['app'][0], fields),
+                         {'id': 'app_1', 'resourceInfo.memory': 1024, 'missing': None})
+        self.assertIsNone(parse_fields(''))
+
+
+class WritersTestCase(TestCase):
+    def _write(self, output_format, fields=None):
+        stream = StringIO()
+        count = get_writer(output_format, stream, parse_fields(fields)).write_all(iter_records(APPS))
+        self.assertEqual(count, 2)
+        return stream.getvalue()
+
+    def test_jsonl(self):
+        lines = self._write('jsonl', 'id,state').splitlines()
+        self.assertEqual([json.loads(line) for line in lines],
+                         [{'id': 'app_1', 'state': 'RUNNING'}, {'id': 'app_2', 'state': 'FINISHED'}])
+
+    def test_json(self):
+        self.assertEqual(json.loads(self._write('json')), APPS['apps']['app'])
+        stream = StringIO()
+        get_writer('json', stream).write_all([])
+        self.assertEqual(json.loads(stream.getvalue()), [])
+
+    def test_csv(self):
+        self.assertEqual(self._write('csv').splitlines(), [
+            'id,state,resourceInfo',
+            'app_1,RUNNING,"{""memory"":1024}"',
+            'app_2,FINISHED,"{""memory"":2048}"',
+        ])
+
+    def test_tsv(self):
+        self.assertEqual(self._write('tsv', 'id,resourceInfo.memory').splitlines(), [
+            'id\tresourceInfo.memory',
+            'app_1\t1024',
+            'app_2\t2048',
+        ])
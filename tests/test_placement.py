@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+from mock import MagicMock
+from tests import TestCase
+
+from yarn_api_client.node_inventory import NodeInventory
+from yarn_api_client.placement import PlacementSimulator
+from yarn_api_client.queue_capacity import QueueCapacityMatrix
+from yarn_api_client.scheduler import SchedulerSnapshot
+
+
+def _node(node_id, avail_memory, avail_vcores, used_memory=0, used_vcores=0, state='RUNNING', labels=None):
+    return {'id': node_id, 'state': state, 'rack': '/r1', 'nodeLabels': labels,
+            'availMemoryMB': avail_memory, 'availableVirtualCores': avail_vcores,
+            'usedMemoryMB': used_memory, 'usedVirtualCores': used_vcores}
+
+
+NODES = {'nodes': {'node': [
+    _node('n1', 8192, 8),
+    _node('n2', 6144, 8, used_memory=2048, used_vcores=0),
+    _node('n3', 4096, 1, used_memory=4096, used_vcores=7),
+    _node('n4', 8192, 8, state='UNHEALTHY'),
+    _node('n5', 16384, 16, labels=['gpu']),
+]}}
+
+
+def _queue(name, used, maximum, pending=0):
+    return {'queueName': name, 'queuePath': 'root.' + name,
+            'capacities': {'queueCapacitiesByPartition': [
+                {'partitionName': '', 'absoluteUsedCapacity': used, 'absoluteMaxCapacity': maximum}]},
+            'resources': {'resourceUsagesByPartition': [
+                {'partitionName': '', 'pending': {'memory': pending, 'vCores': 0}}]}}
+
+
+SCHEDULER = {'scheduler': {'schedulerInfo': {'queueName': 'root', 'queues': {'queue': [
+    _queue('default', 0.0, 100.0), _queue('small', 10.0, 35.0, pending=2048),
+]}}}}
+
+
+class PlacementSimulatorTestCase(TestCase):
+    def setUp(self):
+        self.simulator = PlacementSimulator(NodeInventory.from_response(NODES),
+                                            QueueCapacityMatrix.from_snapshot(SchedulerSnapshot(SCHEDULER)))
+
+    def test_node_packing(self):
+        # Only running nodes of the default partition, n3 has a single vcore
+        self.assertTrue(self.simulator.fits(8, 2048))
+        self.assertFalse(self.simulator.fits(9, 2048))
+        self.assertTrue(self.simulator.fits(2, 2048, 8))
+        self.assertFalse(self.simulator.fits(3, 2048, 8))
+        self.assertTrue(self.simulator.fits(2, 4096, 4))
+        self.assertFalse(self.simulator.fits(1, 10240))
+
+        result = self.simulator.simulate([(9, 2048, 1)])
+        self.assertEqual(result.placed, [8])
+        self.assertEqual(result.reason, 'Not enough node resources')
+
+    def test_largest_first(self):
+        # Placing the small containers first would leave room for a single
+        # large one
+        result = self.simulator.simulate([(3, 1024, 1), (2, 6144, 1)])
+        self.assertEqual(result.placed, [3, 2])
+        self.assertTrue(result.fits)
+
+    def test_labels(self):
+        self.assertTrue(self.simulator.fits(4, 4096, label='gpu'))
+        self.assertFalse(self.simulator.fits(5, 4096, label='gpu'))
+        self.assertFalse(self.simulator.fits(1, 1024, label='missing'))
+
+    def test_queue_headroom(self):
+        # 25% of the 24 GB and 24 vcores of the default partition
+        result = self.simulator.simulate([(4, 1024, 1)], queue='small')
+        self.assertEqual(result.headroom, (6144, 6))
+        self.assertTrue(result.fits)
+        result = self.simulator.simulate([(4, 2048, 1)], queue='root.small')
+        self.assertEqual((result.placed, result.reason), ([3], 'Not enough queue headroom'))
+        self.assertTrue(self.simulator.fits(7, 2048, queue='default'))
+
+        self.simulator.include_pending = True
+        self.assertEqual(self.simulator.simulate([(2, 2048, 1)], queue='small').placed, [2])
+        self.assertFalse(self.simulator.fits(3, 2048, queue='small'))
+
+        result = self.simulator.simulate([(1, 1024, 1)], queue='small', label='gpu')
+        self.assertEqual(result.reason, "Queue 'small' has no capacity in partition 'gpu'")
+
+    def test_queue_without_capacities(self):
+        queue = _queue('bare', 0.0, 100.0)
+        queue['capacities']['queueCapacitiesByPartition'] = [{'partitionName': ''}]
+        scheduler = {'scheduler': {'schedulerInfo': {'queueName': 'root', 'queues': {'queue': [queue]}}}}
+        simulator = PlacementSimulator(NodeInventory.from_response(NODES),
+                                       QueueCapacityMatrix.from_snapshot(SchedulerSnapshot(scheduler)))
+
+        result = simulator.simulate([(8, 2048, 1)], queue='bare')
+        self.assertEqual(result.headroom, (24576, 24))
+        self.assertTrue(result.fits)
+
+    def test_maximum_allocation(self):
+        self.simulator.max_memory = 4096
+        result = self.simulator.simulate([(1, 6144, 1)])
+        self.assertFalse(result.fits)
+        self.assertIn('maximum allocation', result.reason)
+        with self.assertRaises(ValueError):
+            self.simulator.fits(1, 0)
+
+    def test_from_resource_manager(self):
+        rm = MagicMock()
+        rm.cluster_nodes.return_value.data = NODES
+        rm.cluster_scheduler.return_value.data = SCHEDULER
+        simulator = PlacementSimulator.from_resource_manager(rm, max_memory=8192)
+        rm.cluster_nodes.assert_called_once_with(states=['RUNNING'])
+        self.assertEqual(simulator.max_memory, 8192)
+        self.assertTrue(simulator.fits(1, 1024, queue='default'))
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+import threading
+
+from tests import TestCase
+
+from yarn_api_client.poller import Poller
+
+
+class CountingPoller(Poller):
+    def __init__(self):
+        super(CountingPoller, self).__init__(0.01)
+        self.calls = 0
+        self.polled = threading.Event()
+
+    def poll(self):
+        self.calls += 1
+        if self.calls == 1:
+            raise ValueError('first poll fails')
+        self.polled.set()
+
+
+class PollerTestCase(TestCase):
+    def test_background_polling(self):
+        poller = CountingPoller()
+        with poller:
+            self.assertTrue(poller.is_alive())
+            self.assertTrue(poller.polled.wait(5))
+        self.assertFalse(poller.is_alive())
+        self.assertTrue(poller.stopped)
+        self.assertGreaterEqual(poller.calls, 2)
+
+    def test_poll_not_implemented(self):
+        with self.assertRaises(NotImplementedError):
+            Poller(1).poll()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+from mock import MagicMock
+from tests import TestCase
+
+from yarn_api_client.errors import APIError
+from yarn_api_client.progress import ProgressPoller
+
+
+def _jobs(*jobs):
+    response = MagicMock()
+    response.data = {'jobs': {'job': [
+        {'id': job_id, 'state': state, 'mapProgress': maps, 'reduceProgress': reduces}
+        for job_id, state, maps, reduces in jobs
+    ]}}
+    return response
+
+
+class ProgressPollerTestCase(TestCase):
+    def setUp(self):
+        self.am = MagicMock()
+        self.finished = []
+        self.poller = ProgressPoller(self.am, ['app_1', 'app_2'], min_interval=1, max_interval=8,
+                                     max_workers=2, on_finished=lambda app_id, jobs: self.finished.append(app_id))
+
+    def test_snapshot(self):
+        self.am.jobs.side_effect = lambda app_id: {
+            'app_1': _jobs(('job_1', 'RUNNING', 50.0, 0.0), ('job_2', 'RUNNING', 100.0, 20.0)),
+            'app_2': _jobs(('job_3', 'RUNNING', 10.0, 0.0)),
+        }[app_id]
+
+        self.assertEqual(sorted(self.poller.poll()), ['app_1', 'app_2'])
+        snapshot = self.poller.snapshot()
+        self.assertEqual(snapshot['app_1']['map_progress'], 75.0)
+        self.assertEqual(snapshot['app_1']['reduce_progress'], 10.0)
+        self.assertEqual(len(snapshot['app_2']['jobs']), 1)
+        self.assertIsNotNone(snapshot['app_2']['updated'])
+
+        # Nothing is due right after a poll
+        self.assertEqual(self.poller.poll(), [])
+        self.assertGreater(self.poller.next_delay(), 0)
+
+    def test_adaptive_interval(self):
+        self.am.jobs.return_value = _jobs(('job_1', 'RUNNING', 50.0, 0.0))
+        app = self.poller._apps['app_1']
+
+        self.poller._update(app, self.poller._fetch(app), 0)
+        self.assertEqual(app.interval, 1)
+        self.poller._update(app, self.poller._fetch(app), 0)
+        self.assertEqual(app.interval, 2)
+        self.poller._update(app, self.poller._fetch(app), 0)
+        self.assertEqual(app.interval, 4)
+
+        self.am.jobs.return_value = _jobs(('job_1', 'RUNNING', 60.0, 0.0))
+        self.poller._update(app, self.poller._fetch(app), 0)
+        self.assertEqual(app.interval, 2)
+
+    def test_drop_finished_jobs(self):
+        self.am.jobs.side_effect = lambda app_id: {
+            'app_1': _jobs(('job_1', 'SUCCEEDED', 100.0, 100.0)),
+            'app_2': _jobs(('job_3', 'RUNNING', 10.0, 0.0)),
+        }[app_id]
+
+        self.poller.poll()
+        self.assertEqual(self.poller.tracked(), ['app_2'])
+        self.assertEqual(self.finished, ['app_1'])
+
+    def test_drop_finished_application(self):
+        rm = MagicMock()
+        rm.cluster_application.return_value.data = {'app': {'state': 'FINISHED'}}
+        self.poller.resource_manager = rm
+        self.am.jobs.side_effect = APIError('redirected')
+
+        self.poller.poll()
+        self.assertEqual(self.poller.tracked(), [])
+        self.assertEqual(sorted(self.finished), ['app_1', 'app_2'])
+
+    def test_drop_after_failures(self):
+        self.am.jobs.side_effect = APIError('unreachable')
+        self.poller.untrack('app_2')
+        app = self.poller._apps['app_1']
+
+        for _ in range(2):
+            self.poller._update(app, self.poller._fetch(app), 0)
+        self.assertEqual(self.poller.tracked(), ['app_1'])
+        self.poller._update(app, self.poller._fetch(app), 0)
+        self.assertEqual(self.poller.tracked(), [])
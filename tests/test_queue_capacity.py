@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from mock import MagicMock
+from tests import TestCase
+
+from yarn_api_client.queue_capacity import QueueCapacityMatrix
+from yarn_api_client.scheduler import SchedulerSnapshot
+
+
+def _queue(name, partitions, usages=()):
+    return {
+        'queueName': name, 'queuePath': 'root.' + name,
+        'capacities': {'queueCapacitiesByPartition': [
+            {'partitionName': partition, 'capacity': capacity, 'absoluteCapacity': capacity,
+             'absoluteUsedCapacity': used, 'absoluteMaxCapacity': maximum}
+            for partition, capacity, used, maximum in partitions
+        ]},
+        'resources': {'resourceUsagesByPartition': [
+            {'partitionName': partition, 'used': {'memory': memory, 'vCores': 1},
+             'pending': {'memory': pending, 'vCores': 2}}
+            for partition, memory, pending in usages
+        ]},
+    }
+
+
+SCHEDULER = {'scheduler': {'schedulerInfo': {'type': 'capacityScheduler', 'queueName': 'root', 'queues': {'queue': [
+    _queue('default', [('', 50.0, 45.0, 100.0), ('gpu', 20.0, 19.0, 20.0)], [('', 4096, 1024)]),
+    _queue('etl', [('', 30.0, 10.0, 40.0)]),
+    _queue('adhoc', [('', 20.0, 90.0, 100.0), ('gpu', 80.0, 0.0, 100.0)], [('gpu', 0, 8192)]),
+]}}}}
+
+
+class QueueCapacityMatrixTestCase(TestCase):
+    def setUp(self):
+        self.matrix = QueueCapacityMatrix.from_snapshot(SchedulerSnapshot(SCHEDULER))
+
+    def test_arrays(self):
+        self.assertEqual(self.matrix.queues, ['root.default', 'root.etl', 'root.adhoc'])
+        self.assertEqual(self.matrix.partitions, ['', 'gpu'])
+        self.assertEqual(self.matrix.absolute_used_capacity.shape, (3, 2))
+        self.assertFalse(self.matrix.defined[self.matrix.row('root.etl'), self.matrix.column('gpu')])
+        self.assertTrue(np.isnan(self.matrix.capacity[1, 1]))
+        np.testing.assert_array_equal(self.matrix.pending_memory, [[1024, 0], [0, 0], [0, 8192]])
+        self.assertEqual(self.matrix.used_memory[0, 0], 4096)
+
+    def test_headroom(self):
+        np.testing.assert_array_equal(self.matrix.headroom[:, 0], [55.0, 30.0, 10.0])
+        self.assertEqual(self.matrix.with_headroom(20), [('root.default', ''), ('root.etl', ''),
+                                                         ('root.adhoc', 'gpu')])
+        self.assertEqual(self.matrix.with_headroom(20, ''), ['root.default', 'root.etl'])
+        self.assertEqual(self.matrix.with_headroom(0.5, 'gpu'), ['root.default', 'root.adhoc'])
+        self.assertEqual(self.matrix.with_headroom(0, 'missing'), [])
+
+    def test_available(self):
+        np.testing.assert_array_equal(self.matrix.available(70), [[True, True], [True, False], [False, True]])
+
+    def test_all_queues(self):
+        matrix = QueueCapacityMatrix.from_snapshot(SchedulerSnapshot(SCHEDULER), leaves_only=False)
+        self.assertEqual(matrix.queues[0], 'root')
+        self.assertFalse(matrix.defined[0].any())
+
+    def test_from_resource_manager(self):
+        rm = MagicMock()
+        rm.cluster_scheduler.return_value.data = SCHEDULER
+        matrix = QueueCapacityMatrix.from_resource_manager(rm)
+        self.assertEqual(len(matrix.queues), 3)
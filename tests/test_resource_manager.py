@@ -1,4 +1,8 @@
 # -*- coding: utf-8 -*-
+import pickle
+import threading
+import requests_mock
+
 from mock import patch
 from tests import TestCase
 
@@ -112,9 +116,25 @@ class ResourceManagerTestCase(TestCase):
             "states": 'NEW'
         })
 
+        self.rm.cluster_nodes(states=['LOST', 'UNHEALTHY'])
+        request_mock.assert_called_with('/ws/v1/cluster/nodes', params={
+            "states": 'LOST,UNHEALTHY'
+        })
+
         with self.assertRaises(IllegalArgumentError):
             self.rm.cluster_nodes(states=['ololo'])
 
+        with self.assertRaises(IllegalArgumentError):
+            self.rm.cluster_nodes(states=['ACCEPTED'])
+
+    def test_cluster_node_watcher(self, request_mock):
+        watcher = self.rm.cluster_node_watcher(states=['LOST'], interval=5)
+        self.assertIs(watcher.resource_manager, self.rm)
+        self.assertEqual((watcher.states, watcher.interval), (['LOST'], 5))
+
+        with self.assertRaises(IllegalArgumentError):
+            self.rm.cluster_node_watcher(states=['ololo'])
+
     def test_cluster_node(self, request_mock):
         self.rm.cluster_node('node_1')
         request_mock.assert_called_with('/ws/v1/cluster/nodes/node_1')
@@ -208,6 +228,24 @@ class ResourceManagerTestCase(TestCase):
     #     value = self.rm.cluster_scheduler_queue('queue_2')
     #     self.assertIsNone(value)
 
+    def test_cluster_scheduler_snapshot(self, request_mock):
+        request_mock.return_value.data = {'scheduler': {'schedulerInfo': {'queueName': 'root', 'queues': {'queue': [
+            {'queueName': 'queue_1', 'queues': {'queue': [{'queueName': 'queue_2'}]}},
+        ]}}}}
+        snapshot = self.rm.cluster_scheduler_snapshot()
+        request_mock.assert_called_once_with('/ws/v1/cluster/scheduler')
+        self.assertEqual(snapshot.get('queue_2').path, 'root.queue_1.queue_2')
+
+        self.assertEqual(self.rm.cluster_scheduler_queue('queue_2'), {'queueName': 'queue_2'})
+        self.assertIsNone(self.rm.cluster_scheduler_queue('queue_3'))
+
+    def test_cluster_scheduler_watcher(self, request_mock):
+        watcher = self.rm.cluster_scheduler_watcher(interval=5, saturation_threshold=90)
+        self.assertIs(watcher.resource_manager, self.rm)
+        self.assertEqual(watcher.interval, 5)
+        self.assertEqual(watcher.saturation_threshold, 90)
+        self.assertFalse(watcher.is_alive())
+
     def test_cluster_scheduler_queue_availability(self, request_mock):
         value = self.rm.cluster_scheduler_queue_availability({'absoluteUsedCapacity': 90}, 70)
         self.assertEqual(value, False)
@@ -380,3 +418,58 @@ class ResourceManagerTestCase(TestCase):
             "actions": "refresh,get",
             "summarize": True
         })
+
+
+@patch('yarn_api_client.resource_manager.check_is_active_rm')
+class LazyResourceManagerTestCase(TestCase):
+    def test_no_io_in_constructor(self, check_is_active_rm_mock):
+        rm = ResourceManager(['http://rm1:8088', 'http://rm2:8088'], lazy=True)
+        check_is_active_rm_mock.assert_not_called()
+        self.assertIsNone(rm.service_uri)
+
+    def test_resolve_on_first_request(self, check_is_active_rm_mock):
+        check_is_active_rm_mock.side_effect = lambda endpoint, *args: endpoint == 'http://rm2:8088'
+        rm = ResourceManager(['http://rm1:8088', 'http://rm2:8088'], lazy=True)
+
+        with requests_mock.mock() as requests_get_mock:
+            requests_get_mock.get('http://rm2:8088/ws/v1/cluster/info', text='{}')
+            rm.cluster_information()
+            rm.cluster_information()
+
+        self.assertEqual(rm.get_active_endpoint(), 'http://rm2:8088')
+        self.assertEqual(check_is_active_rm_mock.call_count, 2)
+
+    def test_retry_after_failed_resolution(self, check_is_active_rm_mock):
+        check_is_active_rm_mock.return_value = False
+        rm = ResourceManager(['http://rm1:8088'], lazy=True)
+
+        with self.assertRaisesRegex(Exception, 'No active RMs found'):
+            rm.cluster_information()
+
+        check_is_active_rm_mock.return_value = True
+        self.assertEqual(rm.get_active_endpoint(), 'http://rm1:8088')
+
+    def test_concurrent_resolution(self, check_is_active_rm_mock):
+        check_is_active_rm_mock.return_value = True
+        rm = ResourceManager(['http://rm1:8088'], lazy=True)
+
+        threads = [threading.Thread(target=rm.get_active_endpoint) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(check_is_active_rm_mock.call_count, 1)
+
+    def test_eager_failure(self, check_is_active_rm_mock):
+        check_is_active_rm_mock.return_value = False
+        with self.assertRaisesRegex(Exception, 'No active RMs found'):
+            ResourceManager(['http://rm1:8088'])
+
+    def test_pickle(self, check_is_active_rm_mock):
+        rm = ResourceManager(['http://rm1:8088'], lazy=True)
+        clone = pickle.loads(pickle.dumps(rm))
+
+        check_is_active_rm_mock.return_value = True
+        self.assertEqual(clone.get_active_endpoint(), 'http://rm1:8088')
+        self.assertIsNone(rm.service_uri)
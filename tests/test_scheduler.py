@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+from mock import MagicMock
+from tests import TestCase
+
+from yarn_api_client.errors import APIError
+from yarn_api_client.scheduler import (CONFIGURATION_FIELDS, QueueChange, SchedulerSnapshot, SchedulerWatcher,
+                                       diff_snapshots, flatten_queue)
+
+
+def _partitions(*partitions):
+    return {'queueCapacitiesByPartition': [
+        {'partitionName': name, 'capacity': capacity, 'absoluteUsedCapacity': used}
+        for name, capacity, used in partitions
+    ]}
+
+
+CAPACITY_SCHEDULER = {'scheduler': {'schedulerInfo': {
+    'type': 'capacityScheduler', 'queueName': 'root', 'capacities': _partitions(('', 100.0, 40.0)),
+    'queues': {'queue': [
+        {'queueName': 'default', 'queuePath': 'root.default',
+         'capacities': _partitions(('', 50.0, 80.0), ('gpu', 10.0, 5.0))},
+        {'queueName': 'prod', 'queuePath': 'root.prod', 'capacities': _partitions(('', 50.0, 10.0)),
+         'queues': {'queue': [
+             {'queueName': 'etl', 'queuePath': 'root.prod.etl', 'capacities': _partitions(('', 100.0, 10.0))},
+             {'queueName': 'default', 'queuePath': 'root.prod.default', 'capacities': _partitions()},
+         ]}},
+    ]},
+}}}
+
+FAIR_SCHEDULER = {'scheduler': {'schedulerInfo': {'type': 'fairScheduler', 'rootQueue': {
+    'queueName': 'root', 'childQueues': {'queue': [
+        {'queueName': 'root.default'},
+        {'queueName': 'root.users', 'childQueues': {'queue': [{'queueName': 'root.users.alice'}]}},
+    ]},
+}}}}
+
+
+class SchedulerSnapshotTestCase(TestCase):
+    def setUp(self):
+        self.snapshot = SchedulerSnapshot(CAPACITY_SCHEDULER)
+
+    def test_index_by_name_and_path(self):
+        self.assertEqual(len(self.snapshot), 5)
+        self.assertEqual(self.snapshot.get('etl').path, 'root.prod.etl')
+        self.assertEqual(self.snapshot.get('root.prod.etl').name, 'etl')
+        # Shared names resolve breadth-first, full paths are unambiguous
+        self.assertEqual(self.snapshot.get('default').path, 'root.default')
+        self.assertEqual(self.snapshot.get('root.prod.default').parent.name, 'prod')
+        self.assertIsNone(self.snapshot.queue('missing'))
+        self.assertNotIn('missing', self.snapshot)
+
+    def test_tree_links(self):
+        etl = self.snapshot.get('etl')
+        self.assertTrue(etl.is_leaf)
+        self.assertEqual([node.path for node in etl.ancestors()], ['root.prod', 'root'])
+        self.assertEqual([node.name for node in self.snapshot.root.children], ['default', 'prod'])
+        self.assertEqual([node.path for node in self.snapshot.leaf_queues()],
+                         ['root.default', 'root.prod.etl', 'root.prod.default'])
+
+    def test_partitions(self):
+        self.assertEqual(self.snapshot.partition_names(), ['', 'gpu'])
+        self.assertEqual(self.snapshot.partition('default', 'gpu')['capacity'], 10.0)
+        self.assertIsNone(self.snapshot.partition('etl', 'gpu'))
+        self.assertIsNone(self.snapshot.partition('missing'))
+
+        self.assertFalse(self.snapshot.is_available('default', 70))
+        self.assertTrue(self.snapshot.is_available('default', 70, 'gpu'))
+        self.assertTrue(self.snapshot.is_available('root.prod.etl', 70))
+        self.assertIsNone(self.snapshot.is_available('root.prod.default', 70))
+
+    def test_fair_scheduler(self):
+        snapshot = SchedulerSnapshot(FAIR_SCHEDULER)
+        self.assertEqual(snapshot.type, 'fairScheduler')
+        self.assertEqual(snapshot.get('root.users.alice').parent.path, 'root.users')
+        self.assertEqual([node.path for node in snapshot.leaf_queues()], ['root.default', 'root.users.alice'])
+
+    def test_from_resource_manager(self):
+        rm = MagicMock()
+        rm.cluster_scheduler.return_value.data = CAPACITY_SCHEDULER
+        snapshot = SchedulerSnapshot.from_resource_manager(rm)
+        self.assertEqual(snapshot.queue('etl')['queuePath'], 'root.prod.etl')
+        rm.cluster_scheduler.assert_called_once_with()
+
+
+def _scheduler(*queues):
+    return {'scheduler': {'schedulerInfo': {'queueName': 'root', 'queues': {'queue': list(queues)}}}}
+
+
+def _leaf(name, capacity=50.0, used=0.0):
+    return {'queueName': name, 'capacity': capacity, 'absoluteUsedCapacity': used,
+            'capacities': {'queueCapacitiesByPartition': [{'partitionName': '', 'capacity': capacity}]}}
+
+
+class SchedulerDiffTestCase(TestCase):
+    def test_flatten_queue(self):
+        self.assertEqual(flatten_queue(CAPACITY_SCHEDULER['scheduler']['schedulerInfo']['queues']['queue'][0]), {
+            'queueName': 'default', 'queuePath': 'root.default',
+            'capacities.queueCapacitiesByPartition[].partitionName': '',
+            'capacities.queueCapacitiesByPartition[].capacity': 50.0,
+            'capacities.queueCapacitiesByPartition[].absoluteUsedCapacity': 80.0,
+            'capacities.queueCapacitiesByPartition[gpu].partitionName': 'gpu',
+            'capacities.queueCapacitiesByPartition[gpu].capacity': 10.0,
+            'capacities.queueCapacitiesByPartition[gpu].absoluteUsedCapacity': 5.0,
+        })
+        self.assertEqual(flatten_queue(_leaf('a'), ['capacity', 'missing']), {'capacity': 50.0})
+
+    def test_diff_snapshots(self):
+        old = SchedulerSnapshot(_scheduler(_leaf('a'), _leaf('b')))
+        new = SchedulerSnapshot(_scheduler(_leaf('a', 40.0, 10.0), _leaf('c')))
+        changes = diff_snapshots(old, new)
+
+        self.assertIn(QueueChange('CHANGED', 'root.a', {
+            'capacity': (50.0, 40.0), 'absoluteUsedCapacity': (0.0, 10.0),
+            'capacities.queueCapacitiesByPartition[].capacity': (50.0, 40.0),
+        }), changes)
+        self.assertIn(QueueChange('REMOVED', 'root.b'), changes)
+        self.assertEqual([change.kind for change in changes if change.path == 'root.c'], ['ADDED'])
+        # The root queue did not change
+        self.assertEqual(len(changes), 3)
+
+        changes = diff_snapshots(old, new, fields=CONFIGURATION_FIELDS)
+        self.assertEqual(changes[0], QueueChange('CHANGED', 'root.a', {'capacity': (50.0, 40.0)}))
+
+
+class SchedulerWatcherTestCase(TestCase):
+    def setUp(self):
+        self.rm = MagicMock()
+        self.responses = []
+        self.rm.cluster_scheduler.side_effect = lambda: MagicMock(data=self.responses.pop(0))
+
+    def test_changes_between_polls(self):
+        on_change = MagicMock()
+        watcher = SchedulerWatcher(self.rm, fields=['capacity'], on_change=on_change)
+        self.responses.extend([_scheduler(_leaf('a')), _scheduler(_leaf('a', used=50.0)),
+                               _scheduler(_leaf('a', 60.0))])
+
+        self.assertEqual(watcher.poll(), [])
+        self.assertEqual(watcher.poll(), [])
+        on_change.assert_not_called()
+        changes = watcher.poll()
+        self.assertEqual(changes, [QueueChange('CHANGED', 'root.a', {'capacity': (50.0, 60.0)})])
+        on_change.assert_called_once_with(changes)
+        self.assertEqual(watcher.snapshot.get('a').info['capacity'], 60.0)
+
+    def test_sustained_saturation(self):
+        watcher = SchedulerWatcher(self.rm, fields=(), saturation_threshold=90, saturation_polls=2)
+        for used in (95.0, 50.0, 95.0, 99.0, 99.0, 10.0):
+            self.responses.append(_scheduler(_leaf('a', used=used)))
+
+        kinds = [[change.kind for change in watcher.poll()] for _ in range(6)]
+        self.assertEqual(kinds, [[], [], [], ['SATURATED'], [], ['RECOVERED']])
+
+    def test_failed_poll_keeps_snapshot(self):
+        watcher = SchedulerWatcher(self.rm)
+        self.responses.append(_scheduler(_leaf('a')))
+        watcher.poll()
+        self.rm.cluster_scheduler.side_effect = APIError('boom')
+        self.assertEqual(watcher.poll(), [])
+        self.assertIn('a', watcher.snapshot)
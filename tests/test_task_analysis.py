@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+from mock import MagicMock
+from tests import TestCase
+
+from yarn_api_client import task_analysis
+from yarn_api_client.base import Response
+
+
+def _task(task_id, task_type, elapsed, state='SUCCEEDED'):
+    return {'id': task_id, 'type': task_type, 'startTime': 1000, 'finishTime': 1000 + elapsed,
+            'elapsedTime': elapsed, 'progress': 100.0, 'state': state}
+
+
+def _attempt(attempt_id, task_type, elapsed, node, state='SUCCEEDED'):
+    return {'id': attempt_id, 'type': task_type, 'startTime': 1000, 'finishTime': 1000 + elapsed,
+            'elapsedTime': elapsed, 'nodeHttpAddress': node, 'state': state}
+
+
+TASKS = {'tasks': {'task': [
+    _task('task_m_0', 'MAP', 100),
+    _task('task_m_1', 'MAP', 110),
+    _task('task_m_2', 'MAP', 90),
+    _task('task_m_3', 'MAP', 400),
+    _task('task_r_0', 'REDUCE', 1000),
+    _task('task_r_1', 'REDUCE', 1100),
+]}}
+
+ATTEMPTS = {
+    'task_m_0': {'taskAttempts': {'taskAttempt': [_attempt('a_m_0_0', 'MAP', 100, 'node1:8042')]}},
+    'task_m_1': {'taskAttempts': {'taskAttempt': [_attempt('a_m_1_0', 'MAP', 110, 'node1:8042')]}},
+    'task_m_2': {'taskAttempts': {'taskAttempt': [_attempt('a_m_2_0', 'MAP', 90, 'node2:8042')]}},
+    'task_m_3': {'taskAttempts': {'taskAttempt': [
+        _attempt('a_m_3_0', 'MAP', 400, 'node3:8042'),
+        _attempt('a_m_3_1', 'MAP', 150, 'node2:8042', state='KILLED'),
+    ]}},
+    'task_r_0': {'taskAttempts': {'taskAttempt': [_attempt('a_r_0_0', 'REDUCE', 1000, 'node2:8042')]}},
+    'task_r_1': {'taskAttempts': None},
+}
+
+
+class TaskAnalysisTestCase(TestCase):
+    def setUp(self):
+        self.tasks = task_analysis.TaskTable.from_response(TASKS)
+        self.attempts = task_analysis.AttemptTable.from_responses(self.tasks, ATTEMPTS)
+
+    def test_tables(self):
+        self.assertEqual(len(self.tasks), 6)
+        self.assertEqual(list(self.tasks.task_type), [0, 0, 0, 0, 1, 1])
+        self.assertEqual(self.tasks.index_of('task_r_0'), 4)
+        self.assertEqual(len(self.attempts), 6)
+        self.assertEqual(self.attempts.nodes, ['node1:8042', 'node2:8042', 'node3:8042'])
+        self.assertEqual(list(self.attempts.task_index), [0, 1, 2, 3, 3, 4])
+
+    def test_empty_response(self):
+        tasks = task_analysis.TaskTable.from_response({'tasks': None})
+        self.assertEqual(len(tasks), 0)
+        self.assertEqual(task_analysis.skew_statistics(tasks), {})
+        self.assertEqual(task_analysis.find_stragglers(tasks), [])
+
+    def test_skew_statistics(self):
+        stats = task_analysis.skew_statistics(self.tasks)
+        self.assertEqual(stats['MAP']['count'], 4)
+        self.assertEqual(stats['MAP']['max'], 400)
+        self.assertEqual(stats['MAP']['p50'], 105.0)
+        self.assertAlmostEqual(stats['MAP']['skew'], 400 / 105.0)
+        self.assertEqual(stats['REDUCE']['count'], 2)
+
+    def test_find_stragglers(self):
+        stragglers = task_analysis.find_stragglers(self.tasks)
+        self.assertEqual([s['id'] for s in stragglers], ['task_m_3'])
+        self.assertEqual(stragglers[0]['type'], 'MAP')
+
+        self.assertEqual(task_analysis.find_stragglers(self.tasks, min_elapsed=500), [])
+
+    def test_node_slowness(self):
+        nodes = task_analysis.node_slowness(self.attempts)
+        self.assertEqual(nodes[0]['node'], 'node3:8042')
+        self.assertEqual(nodes[0]['attempts'], 1)
+        self.assertEqual(sum(n['attempts'] for n in nodes), 5)
+
+    def test_speculative_waste(self):
+        waste = task_analysis.speculative_waste(self.tasks, self.attempts)
+        self.assertEqual(waste['speculated_tasks'], 1)
+        self.assertEqual(waste['wasted_attempts'], 1)
+        self.assertEqual(waste['wasted_ms'], 150)
+        self.assertAlmostEqual(waste['wasted_fraction'], 150 / 1850.0)
+
+    def test_analyze_job_tasks(self):
+        def response(data):
+            result = MagicMock(spec=Response)
+            result.data = data
+            return result
+
+        history_server = MagicMock()
+        history_server.job_tasks.return_value = response(TASKS)
+        history_server.task_attempts.side_effect = lambda job_id, task_id: response(ATTEMPTS[task_id])
+
+        report = task_analysis.analyze_job_tasks(history_server, 'job_1', max_workers=2)
+        history_server.job_tasks.assert_called_with('job_1')
+        self.assertEqual(history_server.task_attempts.call_count, 6)
+        self.assertEqual(report['stragglers'][0]['id'], 'task_m_3')
+        self.assertEqual(report['speculative_waste']['wasted_ms'], 150)
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+from io import StringIO
+from mock import MagicMock, patch
+from tests import TestCase
+
+from yarn_api_client.errors import APIError
+from yarn_api_client.top import NodeManagerTop, ResourceManagerTop, Screen, leaf_queues
+
+
+def _response(data):
+    response = MagicMock()
+    response.data = data
+    return response
+
+
+def _app(app_id, memory, progress=50.0):
+    return {'id': app_id, 'user': 'alice', 'queue': 'default', 'progress': progress, 'runningContainers': 2,
+            'allocatedMB': memory, 'allocatedVCores': 2, 'elapsedTime': 3725000, 'name': 'job ' + app_id}
+
+
+SCHEDULER = {'scheduler': {'schedulerInfo': {'type': 'capacityScheduler', 'queueName': 'root', 'queues': {'queue': [
+    {'queueName': 'default', 'absoluteUsedCapacity': 12.5, 'absoluteCapacity': 50.0, 'absoluteMaxCapacity': 100.0,
+     'numApplications': 2},
+    {'queueName': 'prod', 'queues': {'queue': [
+        {'queueName': 'etl', 'absoluteUsedCapacity': 0.0, 'absoluteCapacity': 50.0,
+         'absoluteMaxCapacity': 50.0, 'numApplications': 0},
+    ]}},
+]}}}}
+
+
+class ScreenTestCase(TestCase):
+    def test_redraw_changed_lines_only(self):
+        stream = StringIO()
+        screen = Screen(stream)
+        self.assertEqual(screen.draw(['a', 'b', 'c']), 3)
+        stream.truncate(0)
+        stream.seek(0)
+
+        self.assertEqual(screen.draw(['a', 'x']), 1)
+        output = stream.getvalue()
+        self.assertIn('\x1b[2;1Hx\x1b[K', output)
+        self.assertNotIn('\x1b[1;1Ha', output)
+        # The dropped third line is cleared
+        self.assertIn('\x1b[3;1H\x1b[K', output)
+
+
+class ResourceManagerTopTestCase(TestCase):
+    def setUp(self):
+        self.rm = MagicMock()
+        self.rm.cluster_metrics.return_value = _response({'clusterMetrics': {
+            'appsRunning': 2, 'appsPending': 1, 'containersAllocated': 4, 'activeNodes': 3, 'unhealthyNodes': 0,
+            'allocatedMB': 3072, 'totalMB': 8192, 'allocatedVirtualCores': 4, 'totalVirtualCores': 12}})
+        self.rm.cluster_scheduler.return_value = _response(SCHEDULER)
+        self.rm.cluster_applications.return_value = _response({'apps': {'app': [
+            _app('application_1', 1024), _app('application_2', 2048)]}})
+        self.stream = StringIO()
+        self.top = ResourceManagerTop(self.rm, stream=self.stream, max_rows=50)
+
+    def tearDown(self):
+        self.top.stop()
+
+    @patch('yarn_api_client.top.time.strftime', return_value='12:00:00')
+    def test_refresh(self, _):
+        self.top.poll()
+        self.rm.cluster_applications.assert_called_once_with(states=['RUNNING'], de_selects=['resourceRequests'])
+
+        lines = self.top.screen.lines
+        self.assertIn('apps: 2 running, 1 pending', lines[0])
+        self.assertIn('memory: 3072/8192 MB', lines[1])
+        self.assertEqual([line.split()[0] for line in lines[4:6]], ['default', 'etl'])
+        # Applications are sorted by allocated memory
+        self.assertEqual([line.split()[0] for line in lines[8:]], ['application_2', 'application_1'])
+        self.assertIn('1:02:05', lines[8])
+
+        self.rm.cluster_applications.return_value = _response({'apps': {'app': [
+            _app('application_1', 1024, 75.0), _app('application_2', 2048)]}})
+        self.assertEqual(self.top.poll(), 1)
+
+    def test_failed_refresh(self):
+        self.top.poll()
+        self.rm.cluster_metrics.side_effect = APIError('boom')
+        self.top.poll()
+        self.assertEqual(self.top.screen.lines[-1], 'Refresh failed: boom')
+        self.assertIn('application_1', self.top.screen.lines[-2])
+
+    def test_leaf_queues(self):
+        queues = leaf_queues(SCHEDULER['scheduler']['schedulerInfo'])
+        self.assertEqual([q['queueName'] for q in queues], ['default', 'etl'])
+        fair = {'rootQueue': {'queueName': 'root', 'childQueues': {'queue': [{'queueName': 'root.a'}]}}}
+        self.assertEqual([q['queueName'] for q in leaf_queues(fair)], ['root.a'])
+
+
+class NodeManagerTopTestCase(TestCase):
+    def test_refresh(self):
+        nm = MagicMock()
+        nm.node_information.return_value = _response({'nodeInfo': {'nodeHostName': 'node1', 'nodeHealthy': True}})
+        nm.node_containers.return_value = _response({'containers': {'container': [
+            {'id': 'container_1', 'state': 'RUNNING', 'user': 'alice', 'totalMemoryNeededMB': 1024,
+             'totalVCoresNeeded': 1}]}})
+        top = NodeManagerTop(nm, stream=StringIO(), max_rows=2)
+        top.poll()
+        top.stop()
+        self.assertEqual(len(top.screen.lines), 2)
+        self.assertIn('node: node1', top.screen.lines[0])
+
+    def test_allocated_memory(self):
+        nm = MagicMock()
+        # Virtual memory is a multiple of the physical memory allocated to the containers
+        nm.node_information.return_value = _response({'nodeInfo': {
+            'totalPmemAllocatedContainersMB': 2048, 'totalVmemAllocatedContainersMB': 4300,
+            'totalVCoresAllocatedContainers': 2}})
+        nm.node_containers.return_value = _response({'containers': None})
+        lines = NodeManagerTop(nm, stream=StringIO()).fetch()
+        self.assertEqual(lines[1], 'allocated memory: 2048 MB  vcores: 2')
@@ -1,8 +1,33 @@
 # -*- coding: utf-8 -*-
+import sys
+
 __version__ = '1.0.4.dev0'
 __all__ = ['ApplicationMaster', 'HistoryServer', 'NodeManager', 'ResourceManager']
 
-from .application_master import ApplicationMaster
-from .history_server import HistoryServer
-from .node_manager import NodeManager
-from .resource_manager import ResourceManager
+_API_MODULES = {
+    'ApplicationMaster': 'application_master',
+    'HistoryServer': 'history_server',
+    'NodeManager': 'node_manager',
+    'ResourceManager': 'resource_manager',
+}
+
+if sys.version_info >= (3, 7):
+    # API clients (and requests) are imported on first access, which keeps
+    # the startup of the command line client and of `import yarn_api_client`
+    # short (PEP 562)
+    def __getattr__(name):
+        module = _API_MODULES.get(name)
+        if module is None:
+            raise AttributeError("module '{module}' has no attribute '{name}'".format(module=__name__, name=name))
+        import importlib
+        value = getattr(importlib.import_module('.' + module, __name__), name)
+        globals()[name] = value
+        return value
+
+    def __dir__():
+        return sorted(set(globals()) | set(__all__))
+else:
+    from .application_master import ApplicationMaster
+    from .history_server import HistoryServer
+    from .node_manager import NodeManager
+    from .resource_manager import ResourceManager
@@ -1,12 +1,33 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
-from .base import BaseYarnAPI, get_logger
+import re
+import threading
+import time
+
+from requests import RequestException
+
+from .base import BaseYarnAPI, Uri, get_logger
+from .constants import FAILED, FINISHED, KILLED
+from .errors import APIError, ConfigurationError
 from .hadoop_conf import get_webproxy_endpoint
 
 
 log = get_logger(__name__)
 
+PROXY_PATH_PATTERN = re.compile(r'^/proxy/(?P<appid>[^/]+)(?P<path>/.*)$')
+
+#: Path requested to check that an address serves the MapReduce AM web app
+AM_PROBE_PATH = '/ws/v1/mapreduce/info'
+
+#: States of applications whose AM is gone
+FINAL_STATES = (FINISHED, FAILED, KILLED)
+
+
+def _is_unavailable(error):
+    # Connection and server errors, as opposed to errors of the request
+    return not isinstance(error, APIError) or (error.status_code or 0) >= 500
+
 
 class ApplicationMaster(BaseYarnAPI):
     """
@@ -19,18 +40,143 @@ class ApplicationMaster(BaseYarnAPI):
     If `address` argument is `None` client will try to extract `address` and
     `port` from Hadoop configuration files.
 
-    :param str service_endpoint: ApplicationMaster HTTP(S) address
+    By default all requests go through the YARN web proxy.  When
+    `direct_routing` is enabled, requests are sent directly to the AMs whose
+    `trackingUrl`, as reported by the ResourceManager, does not go through
+    the proxy.  The ResourceManager reports the proxy URL for the AMs it
+    manages, so this only applies to unmanaged AMs and to clusters whose
+    tracking URLs skip the proxy; other applications keep using the proxy.
+
+    A direct address is checked with a request to `/ws/v1/mapreduce/info`
+    and cached for `address_ttl` seconds.  Applications routed through the
+    proxy, because of their tracking URL, a failed check or a failed lookup,
+    are cached for `unresolved_ttl` seconds, as are finished applications.
+    If a direct request fails with a connection or server error, the
+    request is retried through the proxy, which the application then uses
+    for `unresolved_ttl` seconds; other errors, e.g. for an unknown job id,
+    are raised.
+
+    :param str service_endpoint: ApplicationMaster (web proxy) HTTP(S) address,
+        or a list of equivalent web proxy addresses (or an
+        :py:class:`yarn_api_client.base.EndpointPool`) to spread requests over
     :param int timeout: API connection timeout in seconds
     :param AuthBase auth: Auth to use for requests
     :param boolean verify: Either a boolean, in which case it controls whether
         we verify the server's TLS certificate, or a string, in which case it must
         be a path to a CA bundle to use. Defaults to ``True``
+    :param ResourceManager resource_manager: ResourceManager used to resolve
+        AM addresses, required when `direct_routing` is enabled
+    :param boolean direct_routing: talk to the AMs directly instead of
+        through the web proxy. Defaults to ``False``
+    :param boolean share_session: use the process-wide session registered for
+        the same endpoint and transport settings instead of a private one,
+        see :py:func:`yarn_api_client.base.get_shared_session`. Defaults to
+        ``False``
+    :param float address_ttl: seconds a direct AM address is cached
+    :param float unresolved_ttl: seconds an application routed through the
+        proxy is cached
     """
-    def __init__(self, service_endpoint=None, timeout=30, auth=None, verify=True, proxies=None):
+    def __init__(self, service_endpoint=None, timeout=30, auth=None, verify=True, proxies=None,
+                 resource_manager=None, direct_routing=False, share_session=False, address_ttl=600,
+                 unresolved_ttl=60):
+        if direct_routing and resource_manager is None:
+            raise ConfigurationError('Direct routing requires a ResourceManager')
+
         if not service_endpoint:
             service_endpoint = get_webproxy_endpoint(timeout, auth, verify, proxies)
 
-        super(ApplicationMaster, self).__init__(service_endpoint, timeout, auth, verify, proxies)
+        super(ApplicationMaster, self).__init__(service_endpoint, timeout, auth, verify, proxies, share_session)
+
+        self.resource_manager = resource_manager
+        self.direct_routing = direct_routing
+        self.address_ttl = address_ttl
+        self.unresolved_ttl = unresolved_ttl
+        # `(address, expiration time)` keyed by application id
+        self._am_addresses = {}
+        self._am_addresses_swept = 0
+        self._am_addresses_lock = threading.Lock()
+
+    def __getstate__(self):
+        state = super(ApplicationMaster, self).__getstate__()
+        del state['_am_addresses_lock']
+        return state
+
+    def __setstate__(self, state):
+        self._am_addresses_lock = threading.Lock()
+        super(ApplicationMaster, self).__setstate__(state)
+
+    def request(self, api_path, method='GET', **kwargs):
+        match = PROXY_PATH_PATTERN.match(api_path) if self.direct_routing else None
+        if match:
+            am_uri = self.get_am_address(match.group('appid'))
+            if am_uri is not None:
+                try:
+                    return self._request(am_uri.to_url(match.group('path')), method, **kwargs)
+                except (APIError, RequestException) as e:
+                    if not _is_unavailable(e):
+                        raise
+                    log.info("Direct request to AM of '{appid}' failed, falling back to web proxy: {err}".format(
+                        appid=match.group('appid'), err=e))
+                    self._cache_am_address(match.group('appid'), None)
+
+        return super(ApplicationMaster, self).request(api_path, method, **kwargs)
+
+    def get_am_address(self, application_id):
+        """
+        Direct address of the application's AM web app, resolved from the
+        ResourceManager and checked on first use, cached afterwards.
+
+        :param str application_id: The application id
+        :returns: AM address, `None` if the AM has to be reached through the
+            web proxy
+        :rtype: :py:class:`yarn_api_client.base.Uri`
+        """
+        entry = self._am_addresses.get(application_id)
+        if entry is not None and entry[1] > time.time():
+            return entry[0]
+
+        am_uri = None
+        try:
+            app = self.resource_manager.cluster_application(application_id).data['app']
+        except (APIError, RequestException, KeyError) as e:
+            log.info("Unable to resolve AM address of '{appid}': {err}".format(appid=application_id, err=e))
+        else:
+            tracking_url = app.get('trackingUrl')
+            if tracking_url and '/proxy/' not in tracking_url and app.get('state') not in FINAL_STATES:
+                am_uri = self._probe_am(application_id, Uri(tracking_url))
+
+        self._cache_am_address(application_id, am_uri)
+        return am_uri
+
+    def _cache_am_address(self, application_id, am_uri):
+        now = time.time()
+        expiration = now + (self.unresolved_ttl if am_uri is None else self.address_ttl)
+        with self._am_addresses_lock:
+            if now - self._am_addresses_swept >= self.unresolved_ttl:
+                # Drops the applications not queried anymore, e.g. finished ones
+                self._am_addresses = dict((appid, entry) for appid, entry in self._am_addresses.items()
+                                          if entry[1] > now)
+                self._am_addresses_swept = now
+            self._am_addresses[application_id] = (am_uri, expiration)
+
+    def _probe_am(self, application_id, am_uri):
+        try:
+            self._request(am_uri.to_url(AM_PROBE_PATH))
+        except (APIError, RequestException) as e:
+            log.info("AM of '{appid}' does not answer at '{url}', using the web proxy: {err}".format(
+                appid=application_id, url=am_uri.to_url(), err=e))
+            return None
+        return am_uri
+
+    def forget_am_address(self, application_id):
+        """
+        Drops the cached AM address of an application, e.g. after a new
+        application attempt was started.
+
+        :param str application_id: The application id
+        """
+        with self._am_addresses_lock:
+            self._am_addresses.pop(application_id, None)
 
     def application_information(self, application_id):
         """
@@ -1,26 +1,369 @@
+import base64
+import copy
+import threading
+import time
+
 import requests
 
-class SimpleAuth(requests.auth.AuthBase):
-    def __init__(self, username="yarn"):
+from urllib.parse import parse_qs, urlparse
+
+from .errors import ConfigurationError
+
+HADOOP_AUTH_COOKIE = 'hadoop.auth'
+
+#: Timeout in seconds of the authentication requests of handlers used
+#: without a timeout.  Authentication runs while other threads wait for the
+#: token of the same user and endpoint, so it must not block forever.
+AUTH_TIMEOUT = 30
+
+
+def parse_hadoop_auth_expiry(token):
+    """
+    Expiration time of a `hadoop.auth` token.
+
+    The token looks like ``u=user&p=user@REALM&t=kerberos&e=1600000000000&s=...``
+    where `e` is the expiration time in milliseconds since epoch.
+
+    :param str token: `hadoop.auth` cookie value
+    :returns: expiration time in seconds since epoch, `None` if unknown
+    :rtype: float
+    """
+    if not token:
+        return None
+    try:
+        expiry = parse_qs(token.strip('"')).get('e')
+        return int(expiry[0]) / 1000.0 if expiry else None
+    except ValueError:
+        return None
+
+
+class HadoopAuthTokenCache(object):
+    """
+    Thread-safe cache of `hadoop.auth` tokens keyed by `(user, endpoint)`.
+
+    A token is fetched only once per key, even when many threads ask for it
+    concurrently, and is considered expired `margin` seconds before the
+    expiration time encoded in the token.
+
+    :param float margin: seconds before expiry at which a token is refreshed
+    """
+    def __init__(self, margin=30):
+        self.margin = margin
+        self._lock = threading.Lock()
+        self._tokens = {}
+        self._fetch_locks = {}
+
+    def get(self, key):
+        """
+        Cached, not yet expired token for the key.
+
+        :param tuple key: `(user, endpoint)`
+        :rtype: str
+        """
+        entry = self._tokens.get(key)
+        if entry is None:
+            return None
+        token, expiry = entry
+        if expiry is not None and expiry - self.margin <= time.time():
+            return None
+        return token
+
+    def set(self, key, token):
+        with self._lock:
+            self._tokens[key] = (token, parse_hadoop_auth_expiry(token))
+
+    def invalidate(self, key, token=None):
+        """
+        Drops the cached token for the key.  If `token` is given, the entry is
+        dropped only if it still holds that token, so a token refreshed by
+        another thread is kept.
+
+        :param tuple key: `(user, endpoint)`
+        :param str token: token known to be rejected
+        """
+        with self._lock:
+            entry = self._tokens.get(key)
+            if entry is not None and (token is None or entry[0] == token):
+                del self._tokens[key]
+
+    def get_or_fetch(self, key, fetch):
+        """
+        Cached token for the key, calling `fetch` to obtain a new one when
+        missing or expired.  Concurrent callers wait for a single fetch.
+
+        :param tuple key: `(user, endpoint)`
+        :param callable fetch: returns a new token, or `None` if none could be
+            obtained (`None` is not cached)
+        :rtype: str
+        """
+        token = self.get(key)
+        if token is not None:
+            return token
+
+        with self._lock:
+            # Entries are `[lock, number of waiting callers]`, dropped by the
+            # last caller so that a key does not outlive its fetch
+            entry = self._fetch_locks.get(key)
+            if entry is None:
+                entry = self._fetch_locks[key] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                token = self.get(key)
+                if token is None:
+                    token = fetch()
+                    if token is not None:
+                        self.set(key, token)
+                return token
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._fetch_locks[key]
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+
+    def __getstate__(self):
+        # Tokens are not meant to be persisted, only the configuration is
+        return {'margin': self.margin}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+
+#: Token cache shared by all auth handlers unless they are given their own
+default_token_cache = HadoopAuthTokenCache()
+
+
+def _endpoint(url):
+    parsed = urlparse(url)
+    return '{scheme}://{netloc}'.format(scheme=parsed.scheme, netloc=parsed.netloc)
+
+
+def _split_cookie_header(header):
+    cookies = []
+    for part in (header or '').split(';'):
+        name, _, value = part.strip().partition('=')
+        if name:
+            cookies.append((name, value))
+    return cookies
+
+
+def _get_hadoop_auth_cookie(request):
+    for name, value in _split_cookie_header(request.headers.get('Cookie')):
+        if name == HADOOP_AUTH_COOKIE:
+            return value
+    return None
+
+
+def _set_hadoop_auth_cookie(request, token):
+    # Borrowed from https://github.com/psf/requests/issues/2532#issuecomment-90126896
+    cookies = [(name, value) for name, value in _split_cookie_header(request.headers.get('Cookie'))
+               if name != HADOOP_AUTH_COOKIE]
+    cookies.append((HADOOP_AUTH_COOKIE, token))
+    request.headers['Cookie'] = '; '.join('{0}={1}'.format(name, value) for name, value in cookies)
+
+
+class HadoopAuthCookieAuth(requests.auth.AuthBase):
+    """
+    Base class for auth handlers against Hadoop services which issue a
+    `hadoop.auth` cookie once the client authenticated.
+
+    Subclasses implement :py:meth:`authenticate`.  Tokens are cached in a
+    :py:class:`HadoopAuthTokenCache` shared by all handlers by default, a
+    token refreshed by the server is picked up from responses, and a `401`
+    response triggers a single re-authentication and retry.
+
+    Authentication requests use the `timeout`, `verify` and `proxies` of the
+    handler.  Those left to `None` are taken from the client the handler is
+    given to, see :py:meth:`configured`.
+
+    :param str username: user the token is cached for
+    :param HadoopAuthTokenCache token_cache: cache to use, defaults to
+        :py:data:`default_token_cache`
+    :param float timeout: timeout of the authentication requests in seconds,
+        :py:data:`AUTH_TIMEOUT` if `None` here and in the client
+    :param verify: TLS verification of the authentication requests, see
+        :py:class:`yarn_api_client.base.BaseYarnAPI`
+    :param dict proxies: proxies of the authentication requests
+    """
+    def __init__(self, username, token_cache=None, timeout=None, verify=None, proxies=None):
         self.username = username
-        self.auth_token = None
-        self.auth_done = False
+        self.token_cache = token_cache or default_token_cache
+        self.timeout = timeout
+        self.verify = verify
+        self.proxies = proxies
+
+    def configured(self, timeout=None, verify=None, proxies=None):
+        """
+        Copy of the handler using the given settings for those it has none
+        of, e.g. the settings of a client.  The token cache is shared with
+        the copy.
+
+        :param float timeout: timeout of the authentication requests
+        :param verify: TLS verification of the authentication requests
+        :param dict proxies: proxies of the authentication requests
+        :rtype: :py:class:`HadoopAuthCookieAuth`
+        """
+        auth = copy.copy(self)
+        if auth.timeout is None:
+            auth.timeout = timeout
+        if auth.verify is None:
+            auth.verify = verify
+        if auth.proxies is None:
+            auth.proxies = proxies
+        return auth
+
+    def authenticate(self, url):
+        """
+        Authenticates against the service and returns a new `hadoop.auth`
+        token, or `None` if the service did not issue one.
+
+        :param str url: URL of the request being authenticated
+        :rtype: str
+        """
+        raise NotImplementedError
+
+    def _get(self, url, **kwargs):
+        # Request of the authentication round-trip
+        timeout = AUTH_TIMEOUT if self.timeout is None else self.timeout
+        return requests.get(url, allow_redirects=False, timeout=timeout, verify=self.verify, proxies=self.proxies,
+                            **kwargs)
+
+    def _key(self, url):
+        return self.username, _endpoint(url)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if state['token_cache'] is default_token_cache:
+            state['token_cache'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.token_cache = self.token_cache or default_token_cache
 
     def __call__(self, request):
-        if not self.auth_done:
-            _session = requests.Session()
-            r = _session.get(request.url, params={"user.name": self.username}, allow_redirects=False)
-            r.raise_for_status()
-
-            if 'This is standby RM.' not in r.text:
-                self.auth_token = _session.cookies.get_dict()['hadoop.auth']
-                self.auth_done = True
-
-        # Borrowed from https://github.com/psf/requests/issues/2532#issuecomment-90126896
-        if 'Cookie' in request.headers:
-            old_cookies = request.headers['Cookie']
-            all_cookies = '; '.join([old_cookies, "{0}={1}".format("hadoop.auth", self.auth_token)])
-            request.headers['Cookie'] = all_cookies
-        else:
-            request.prepare_cookies({"hadoop.auth": self.auth_token})
+        key = self._key(request.url)
+        token = self.token_cache.get_or_fetch(key, lambda: self.authenticate(request.url))
+        if token is not None:
+            _set_hadoop_auth_cookie(request, token)
+        request.register_hook('response', self.handle_response)
         return request
+
+    def handle_response(self, response, **kwargs):
+        key = self._key(response.request.url)
+        issued = response.cookies.get(HADOOP_AUTH_COOKIE)
+        if issued:
+            self.token_cache.set(key, issued)
+
+        if response.status_code != 401 or getattr(response.request, '_hadoop_auth_retried', False):
+            return response
+
+        self.token_cache.invalidate(key, _get_hadoop_auth_cookie(response.request))
+        token = self.token_cache.get_or_fetch(key, lambda: self.authenticate(response.request.url))
+        if token is None:
+            return response
+
+        # Consume the content so the connection can be released
+        response.content
+        response.close()
+
+        retry = response.request.copy()
+        retry._hadoop_auth_retried = True
+        _set_hadoop_auth_cookie(retry, token)
+        retried = response.connection.send(retry, **kwargs)
+        retried.history.append(response)
+        retried.request = retry
+        return retried
+
+
+class SimpleAuth(HadoopAuthCookieAuth):
+    """
+    Pseudo/simple authentication: the user name is sent as the `user.name`
+    query parameter and the `hadoop.auth` cookie issued in return is used
+    for all requests.
+
+    :param str username: user to authenticate as
+    :param HadoopAuthTokenCache token_cache: cache to use, defaults to the
+        process-wide cache
+    :param float timeout: timeout of the authentication request in seconds
+    :param verify: TLS verification of the authentication request
+    :param dict proxies: proxies of the authentication request
+    """
+    def __init__(self, username="yarn", token_cache=None, timeout=None, verify=None, proxies=None):
+        super(SimpleAuth, self).__init__(username, token_cache, timeout, verify, proxies)
+
+    def authenticate(self, url):
+        r = self._get(url, params={"user.name": self.username})
+        r.raise_for_status()
+
+        if 'This is standby RM.' in r.text:
+            return None
+        return r.cookies.get(HADOOP_AUTH_COOKIE)
+
+
+def gssapi_negotiate(hostname, principal=None):
+    """
+    Initial SPNEGO token for the `HTTP` service on the given host, built
+    with the `gssapi` package from the credentials in the Kerberos cache.
+
+    :param str hostname: host of the service
+    :param str principal: client principal, the default one if `None`
+    :returns: base64 encoded token
+    :rtype: str
+    """
+    import gssapi
+
+    service = gssapi.Name('HTTP@' + hostname, gssapi.NameType.hostbased_service)
+    creds = None
+    if principal:
+        creds = gssapi.Credentials(name=gssapi.Name(principal, gssapi.NameType.kerberos_principal),
+                                   usage='initiate')
+    context = gssapi.SecurityContext(name=service, creds=creds, usage='initiate',
+                                     mech=gssapi.OID.from_int_seq('1.3.6.1.5.5.2'))
+    return base64.b64encode(context.step()).decode('ascii')
+
+
+class SpnegoAuth(HadoopAuthCookieAuth):
+    """
+    Kerberos/SPNEGO authentication which negotiates once per user and
+    endpoint and then authenticates with the `hadoop.auth` cookie issued by
+    the service, until it expires or the service answers with `401`.
+
+    The SPNEGO token is produced by `negotiate`, which defaults to
+    :py:func:`gssapi_negotiate` and requires the optional `gssapi` package
+    (``pip install yarn-api-client[kerberos]``).  A valid Kerberos ticket must
+    be available (run kinit before).
+
+    :param str principal: client principal, the default one if `None`
+    :param callable negotiate: called with the host name and the principal,
+        returns the base64 encoded SPNEGO token
+    :param HadoopAuthTokenCache token_cache: cache to use, defaults to the
+        process-wide cache
+    :param float timeout: timeout of the negotiation request in seconds
+    :param verify: TLS verification of the negotiation request, see
+        :py:class:`yarn_api_client.base.BaseYarnAPI`
+    :param dict proxies: proxies of the negotiation request
+    """
+    def __init__(self, principal=None, negotiate=None, token_cache=None, timeout=None, verify=None, proxies=None):
+        if negotiate is None:
+            try:
+                import gssapi  # NOQA
+            except ImportError:
+                raise ConfigurationError("SPNEGO authentication requires the 'gssapi' package")
+            negotiate = gssapi_negotiate
+
+        super(SpnegoAuth, self).__init__(principal or '', token_cache, timeout, verify, proxies)
+        self.principal = principal
+        self.negotiate = negotiate
+
+    def authenticate(self, url):
+        token = self.negotiate(urlparse(url).hostname, self.principal)
+        r = self._get(url, headers={'Authorization': 'Negotiate ' + token})
+        if r.status_code == 401:
+            return None
+        r.raise_for_status()
+        return r.cookies.get(HADOOP_AUTH_COOKIE)
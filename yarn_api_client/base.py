@@ -3,11 +3,19 @@ from __future__ import unicode_literals
 
 import logging
 import os
+import random
+import ssl
+import threading
+import time
 import requests
 
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
+from requests.adapters import HTTPAdapter
 from urllib.parse import urlparse, urlunparse
 
+from .auth import HadoopAuthCookieAuth
 from .errors import APIError, ConfigurationError
 
 
@@ -55,21 +63,455 @@ class Uri(object):
         return result_url
 
 
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
+
+LEAST_OUTSTANDING_REQUESTS = 'least_outstanding_requests'
+POWER_OF_TWO_CHOICES = 'power_of_two_choices'
+
+
+class EndpointPool(object):
+    """
+    Pool of equivalent endpoints serving the same API, e.g. several YARN
+    Router or web proxy instances, across which requests are spread.
+
+    With the `least_outstanding_requests` policy a request goes to the
+    endpoint with the fewest requests in flight, with
+    `power_of_two_choices` to the least loaded of two endpoints picked at
+    random, which spreads the load as well for large pools while avoiding
+    that all clients pick the same endpoint.  Ties are broken at random.
+
+    An endpoint is ejected for `ejection_time` seconds after
+    `max_failures` consecutive failures (connection errors and 5xx
+    responses).  Once re-admitted, a single failure ejects it again while a
+    success makes it healthy.  If all endpoints are ejected, the one
+    re-admitted first is used.
+
+    :param List[str] endpoints: HTTP(S) addresses
+    :param str policy: `least_outstanding_requests` (default) or
+        `power_of_two_choices`
+    :param int max_failures: consecutive failures after which an endpoint
+        is ejected
+    :param float ejection_time: seconds during which an ejected endpoint
+        is not used
+    """
+    def __init__(self, endpoints, policy=LEAST_OUTSTANDING_REQUESTS, max_failures=3, ejection_time=30):
+        if not endpoints:
+            raise ConfigurationError('Endpoint pool is empty')
+        if policy not in (LEAST_OUTSTANDING_REQUESTS, POWER_OF_TWO_CHOICES):
+            raise ConfigurationError("Unknown endpoint selection policy '{policy}'".format(policy=policy))
+
+        self.endpoints = list(endpoints)
+        self.uris = [Uri(endpoint) for endpoint in self.endpoints]
+        self.policy = policy
+        self.max_failures = max_failures
+        self.ejection_time = ejection_time
+        self._reset()
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._outstanding = [0] * len(self.uris)
+        self._failures = [0] * len(self.uris)
+        self._ejected_until = [0.0] * len(self.uris)
+
+    def __len__(self):
+        return len(self.uris)
+
+    def __getstate__(self):
+        return dict((key, value) for key, value in self.__dict__.items() if not key.startswith('_'))
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._reset()
+
+    def is_ejected(self, index):
+        return self._ejected_until[index] > time.time()
+
+    def acquire(self, exclude=()):
+        """
+        Selects the endpoint for a new request, which is counted as in
+        flight until :py:meth:`release` is called.
+
+        :param exclude: indexes of endpoints not to select if possible
+        :returns: index of the endpoint in :py:attr:`uris`
+        :rtype: int
+        """
+        with self._lock:
+            now = time.time()
+            indexes = [i for i in range(len(self.uris)) if i not in exclude] or list(range(len(self.uris)))
+            candidates = [i for i in indexes if self._ejected_until[i] <= now]
+            if not candidates:
+                candidates = [min(indexes, key=lambda i: self._ejected_until[i])]
+            elif self.policy == POWER_OF_TWO_CHOICES and len(candidates) > 2:
+                candidates = random.sample(candidates, 2)
+
+            lowest = min(self._outstanding[i] for i in candidates)
+            index = random.choice([i for i in candidates if self._outstanding[i] == lowest])
+            self._outstanding[index] += 1
+            return index
+
+    def release(self, index, failed=False):
+        """
+        Records the end of a request.
+
+        :param int index: index returned by :py:meth:`acquire`
+        :param bool failed: whether the endpoint failed to serve the request
+        """
+        with self._lock:
+            self._outstanding[index] -= 1
+            if not failed:
+                self._failures[index] = 0
+                return
+
+            self._failures[index] += 1
+            if self._failures[index] >= self.max_failures:
+                log.warning("Ejecting endpoint '{endpoint}' for {delay}s after {failures} failures".format(
+                    endpoint=self.endpoints[index], delay=self.ejection_time, failures=self._failures[index]))
+                self._ejected_until[index] = time.time() + self.ejection_time
+                # A single failure ejects the endpoint again once re-admitted
+                self._failures[index] = self.max_failures - 1
+
+
+def _is_hedgeable(error):
+    # Connection errors, timeouts and server errors may not happen again on
+    # another attempt, client errors would
+    if isinstance(error, requests.RequestException):
+        return True
+    return isinstance(error, APIError) and (error.status_code or 0) >= 500
+
+
+class HedgePolicy(object):
+    """
+    Hedging of idempotent requests to cut their tail latency.
+
+    When a request did not answer within the `percentile` of the recent
+    request latencies, a second, identical request is sent to another
+    endpoint of the client's :py:class:`EndpointPool`, or to the same
+    endpoint over another connection, and the first answer wins.  The
+    losing request is cancelled if it did not start yet, otherwise its
+    answer is discarded.  A request which fails before the delay with a
+    connection error, a timeout or a server error is hedged immediately,
+    other errors such as `404 Not Found` are raised without hedging.
+
+    Until `min_samples` latencies were observed, `max_delay` is used.  The
+    policy can be shared by several clients, its requests run on a thread
+    pool of `max_workers` threads and the delay starts when a request
+    leaves the queue of the pool.
+
+    :param float percentile: latency percentile after which a request is
+        hedged
+    :param float min_delay: shortest hedging delay in seconds
+    :param float max_delay: longest hedging delay in seconds
+    :param int window: number of recent latencies the percentile is
+        computed on
+    :param int min_samples: latencies observed before the percentile is used
+    :param int max_workers: size of the thread pool running the requests
+    """
+    def __init__(self, percentile=95, min_delay=0.005, max_delay=1.0, window=1000, min_samples=20,
+                 max_workers=16):
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.window = window
+        self.min_samples = min_samples
+        self.max_workers = max_workers
+        self._reset()
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=self.window)
+        self._observed = 0
+        self._delay = None
+        self._executor = None
+        self._pid = os.getpid()
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def __getstate__(self):
+        return dict((key, getattr(self, key)) for key in (
+            'percentile', 'min_delay', 'max_delay', 'window', 'min_samples', 'max_workers'))
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._reset()
+
+    def executor(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Worker threads do not survive a fork
+                self._executor = None
+                self._pid = os.getpid()
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def delay(self):
+        """
+        Current hedging delay in seconds.
+
+        :rtype: float
+        """
+        with self._lock:
+            if self._delay is None:
+                if len(self._latencies) < self.min_samples:
+                    return self.max_delay
+                latencies = sorted(self._latencies)
+                position = int(round((len(latencies) - 1) * self.percentile / 100.0))
+                self._delay = min(max(latencies[position], self.min_delay), self.max_delay)
+            return self._delay
+
+    def observe(self, latency):
+        """
+        Records the latency of a successful request.
+
+        :param float latency: latency in seconds
+        """
+        with self._lock:
+            self._latencies.append(latency)
+            self._observed += 1
+            # The percentile is recomputed after a few new observations
+            if self._observed % 16 == 0:
+                self._delay = None
+
+    def record(self, hedged, hedge_won=False):
+        with self._lock:
+            self.requests += 1
+            if hedged:
+                self.hedged += 1
+            if hedge_won:
+                self.hedge_wins += 1
+
+    def stats(self):
+        """
+        Hedging statistics.
+
+        :returns: `requests`, `hedged` and `hedge_wins` counts, `hedge_rate`
+            (hedged / requests), `win_rate` (hedge wins / hedged) and the
+            current `delay`
+        :rtype: dict
+        """
+        delay = self.delay()
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'hedged': self.hedged,
+                'hedge_wins': self.hedge_wins,
+                'hedge_rate': float(self.hedged) / self.requests if self.requests else 0.0,
+                'win_rate': float(self.hedge_wins) / self.hedged if self.hedged else 0.0,
+                'delay': delay,
+            }
+
+
+class SSLContextAdapter(HTTPAdapter):
+    """
+    Transport adapter which uses a given, already initialised SSLContext for
+    all HTTPS connections instead of loading the CA bundle per connection.
+
+    With requests >= 2.32, each request uses the context of the `verify`
+    value requests resolved for it, e.g. the CA bundle set by the
+    `REQUESTS_CA_BUNDLE` environment variable, see :py:func:`get_ssl_context`.
+
+    :param ssl.SSLContext ssl_context: context used for TLS connections
+    """
+    def __init__(self, ssl_context, **kwargs):
+        self.ssl_context = ssl_context
+        super(SSLContextAdapter, self).__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['ssl_context'] = self.ssl_context
+        return super(SSLContextAdapter, self).init_poolmanager(*args, **kwargs)
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        proxy_kwargs['ssl_context'] = self.ssl_context
+        return super(SSLContextAdapter, self).proxy_manager_for(proxy, **proxy_kwargs)
+
+    def build_connection_pool_key_attributes(self, request, verify, cert=None):
+        # Only called by requests >= 2.32
+        host_params, pool_kwargs = super(SSLContextAdapter, self).build_connection_pool_key_attributes(
+            request, verify, cert)
+        if verify is not False:
+            pool_kwargs.pop('ca_certs', None)
+            pool_kwargs.pop('ca_cert_dir', None)
+            pool_kwargs['ssl_context'] = get_ssl_context(True if verify is None else verify)
+        return host_params, pool_kwargs
+
+    def cert_verify(self, conn, url, verify, cert):
+        super(SSLContextAdapter, self).cert_verify(conn, url, verify, cert)
+        if verify is not False:
+            # CA certificates are already loaded into the shared context
+            conn.ca_certs = None
+            conn.ca_cert_dir = None
+
+
+_shared_lock = threading.Lock()
+_shared_ssl_contexts = {}
+_shared_sessions = {}
+_shared_pid = os.getpid()
+
+
+def _reset_shared_sessions_after_fork():
+    global _shared_lock, _shared_pid
+    # Pooled connections belong to the parent process, they must be
+    # neither used nor closed by the child
+    _shared_lock = threading.Lock()
+    _shared_sessions.clear()
+    _shared_pid = os.getpid()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_shared_sessions_after_fork)
+
+
+def get_ssl_context(verify=True):
+    """
+    Process-wide SSLContext for the given `verify` value.  The CA bundle is
+    parsed only once, when the context is created.
+
+    :param verify: ``True`` to use the default CA bundle, or a path to a CA
+        bundle file or directory
+    :rtype: ssl.SSLContext
+    """
+    context = _shared_ssl_contexts.get(verify)
+    if context is not None:
+        return context
+    with _shared_lock:
+        context = _shared_ssl_contexts.get(verify)
+        if context is None:
+            ca_location = requests.utils.DEFAULT_CA_BUNDLE_PATH if verify is True else verify
+            if os.path.isdir(ca_location):
+                context = ssl.create_default_context(capath=ca_location)
+            else:
+                context = ssl.create_default_context(cafile=ca_location)
+            _shared_ssl_contexts[verify] = context
+        return context
+
+
+def _environment_verify(verify):
+    # Like requests, a CA bundle set in the environment replaces the default one
+    if verify is True:
+        return os.environ.get('REQUESTS_CA_BUNDLE') or os.environ.get('CURL_CA_BUNDLE') or True
+    return verify
+
+
+def get_shared_session(service_uri, verify=True, proxies=None):
+    """
+    Process-wide session for the given endpoint and transport settings.
+
+    Sessions are keyed by `(scheme, host, port, verify, proxies)`, so all API
+    instances talking to the same endpoint share one connection pool and
+    reuse its open (and already TLS negotiated) connections.  HTTPS
+    connections use the SSLContext returned by :py:func:`get_ssl_context`.
+
+    :param Uri service_uri: endpoint of the service
+    :param verify: TLS verification setting, see :py:class:`BaseYarnAPI`
+    :param dict proxies: proxies used by the session
+    :rtype: requests.Session
+    """
+    if _shared_pid != os.getpid():
+        _reset_shared_sessions_after_fork()
+
+    key = (service_uri.scheme, service_uri.hostname, service_uri.port, verify,
+           tuple(sorted(proxies.items())) if proxies else None)
+
+    session = _shared_sessions.get(key)
+    if session is None:
+        ssl_context = None
+        if service_uri.is_https and verify is not False:
+            ssl_context = get_ssl_context(_environment_verify(verify))
+        with _shared_lock:
+            session = _shared_sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                session.verify = verify
+                session.proxies = proxies
+                if ssl_context is not None:
+                    session.mount('https://', SSLContextAdapter(ssl_context))
+                _shared_sessions[key] = session
+    return session
+
+
+def clear_shared_sessions():
+    """
+    Closes and forgets all shared sessions and SSL contexts.
+    """
+    with _shared_lock:
+        sessions = list(_shared_sessions.values())
+        _shared_sessions.clear()
+        _shared_ssl_contexts.clear()
+    for session in sessions:
+        session.close()
+
+
 class BaseYarnAPI(object):
+    """
+    Base class of the REST API clients.
+
+    `service_endpoint` is either the address of the service, or a list of
+    addresses of equivalent instances (or an :py:class:`EndpointPool`)
+    across which requests are spread.  Idempotent requests failing on one
+    instance with a connection error or a 5xx response are retried on
+    another one.
+
+    Idempotent requests are hedged when :py:attr:`hedge_policy` is set to a
+    :py:class:`HedgePolicy`.
+
+    Clients are fork-safe: when used in a process other than the one which
+    created their session (e.g. after a `fork()` in a pre-fork server or a
+    `multiprocessing` pool), the session and its connection pool are
+    rebuilt before the next request.  Clients can also be pickled, only
+    their configuration is serialized and the session is rebuilt on
+    unpickling.
+    """
     response_class = Response
+    #: :py:class:`HedgePolicy` applied to idempotent requests, none by default
+    hedge_policy = None
 
-    def __init__(self, service_endpoint=None, timeout=None, auth=None, verify=True, proxies=None):
+    def __init__(self, service_endpoint=None, timeout=None, auth=None, verify=True, proxies=None,
+                 share_session=False):
         self.timeout = timeout
 
-        if service_endpoint:
+        if isinstance(service_endpoint, (list, tuple)):
+            service_endpoint = EndpointPool(service_endpoint)
+
+        self.endpoint_pool = None
+        if isinstance(service_endpoint, EndpointPool):
+            self.endpoint_pool = service_endpoint
+            self.service_uri = service_endpoint.uris[0]
+        elif service_endpoint:
             self.service_uri = Uri(service_endpoint)
         else:
             self.service_uri = None
 
-        self.session = requests.Session()
-        self.session.auth = auth
-        self.session.verify = verify
-        self.session.proxies = proxies
+        self.auth = auth
+        self.verify = verify
+        self.proxies = proxies
+        self.share_session = share_session
+        self._init_session()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for name in ('session', 'shared_session', '_pid', '_session_auth'):
+            state.pop(name, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_session()
+
+    def _init_session(self):
+        self._pid = os.getpid()
+        self._session_auth = self.auth
+        if isinstance(self.auth, HadoopAuthCookieAuth):
+            # Authentication requests follow the transport settings of the client
+            self._session_auth = self.auth.configured(self.timeout, self.verify, self.proxies)
+        self.shared_session = bool(self.share_session and self.service_uri)
+        if self.shared_session:
+            self.session = get_shared_session(self.service_uri, self.verify, self.proxies)
+        else:
+            self.session = requests.Session()
+            self.session.auth = self._session_auth
+            self.session.verify = self.verify
+            self.session.proxies = self.proxies
 
     def _validate_configuration(self):
         if not self.service_uri:
@@ -77,15 +519,104 @@ class BaseYarnAPI(object):
 
     def request(self, api_path, method='GET', **kwargs):
         self._validate_configuration()
+        if self.hedge_policy is not None and method in IDEMPOTENT_METHODS:
+            return self._hedged_request(api_path, method, **kwargs)
+        if self.endpoint_pool is not None:
+            return self._pooled_request(api_path, method, **kwargs)
+
         api_endpoint = self.service_uri.to_url(api_path)
 
+        return self._request(api_endpoint, method, **kwargs)
+
+    def _pooled_request(self, api_path, method='GET', **kwargs):
+        pool = self.endpoint_pool
+        tried = []
+        while True:
+            index = pool.acquire(exclude=tried)
+            try:
+                response = self._request(pool.uris[index].to_url(api_path), method, **kwargs)
+            except (APIError, requests.RequestException) as e:
+                failed = not isinstance(e, APIError) or (e.status_code or 0) >= 500
+                pool.release(index, failed)
+                tried.append(index)
+                if not failed or method not in IDEMPOTENT_METHODS or len(tried) >= len(pool):
+                    raise
+                log.info("Request to '{endpoint}' failed, retrying on another endpoint: {err}".format(
+                    endpoint=pool.endpoints[index], err=e))
+            else:
+                pool.release(index)
+                return response
+
+    def _hedged_request(self, api_path, method='GET', **kwargs):
+        policy = self.hedge_policy
+        pool = self.endpoint_pool
+        executor = policy.executor()
+
+        def attempt(index, started=None):
+            if started is not None:
+                started.set()
+            uri = self.service_uri if index is None else pool.uris[index]
+            begin = time.time()
+            try:
+                response = self._request(uri.to_url(api_path), method, **kwargs)
+            except (APIError, requests.RequestException) as e:
+                if index is not None:
+                    pool.release(index, not isinstance(e, APIError) or (e.status_code or 0) >= 500)
+                raise
+            if index is not None:
+                pool.release(index)
+            policy.observe(time.time() - begin)
+            return response
+
+        first_index = pool.acquire() if pool is not None else None
+        first_started = threading.Event()
+        first = executor.submit(attempt, first_index, first_started)
+        # The delay runs from the start of the attempt, not from its queuing
+        # behind the requests of other threads
+        first_started.wait()
+        wait([first], timeout=policy.delay())
+        if first.done() and not _is_hedgeable(first.exception()):
+            # Succeeded, or failed in a way another attempt would repeat
+            policy.record(hedged=False)
+            return first.result()
+
+        second_index = pool.acquire(exclude=[first_index]) if pool is not None else None
+        second = executor.submit(attempt, second_index)
+        indexes = {first: first_index, second: second_index}
+        log.debug("Hedging '{method}' request to '{path}'".format(method=method, path=api_path))
+
+        pending = set([first, second])
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for loser in pending:
+                        if loser.cancel() and pool is not None:
+                            # Never started, so it did not release its endpoint
+                            pool.release(indexes[loser])
+                    policy.record(hedged=True, hedge_won=future is second)
+                    return future.result()
+
+        policy.record(hedged=True)
+        raise first.exception()
+
+    def _request(self, api_endpoint, method='GET', **kwargs):
+        if self._pid != os.getpid():
+            log.debug("Process changed since the session was created, rebuilding it")
+            self._init_session()
+
         if method == 'GET':
             headers = {}
         else:
             headers = {"Content-Type": "application/json"}
 
-        if 'headers' in kwargs and kwargs['headers']:
-            headers.update(kwargs['headers'])
+        extra_headers = kwargs.pop('headers', None)
+        if extra_headers:
+            headers.update(extra_headers)
+
+        if self.shared_session:
+            # Shared sessions are used by clients with different credentials
+            kwargs.setdefault('auth', self._session_auth)
 
         begin = datetime.now()
         response = self.session.request(method=method, url=api_endpoint, headers=headers, timeout=self.timeout, **kwargs)
@@ -105,7 +636,7 @@ class BaseYarnAPI(object):
                 status=response.status_code, 
                 msg=response.text
             )
-            raise APIError(msg)
+            raise APIError(msg, status_code=response.status_code)
 
     def construct_parameters(self, arguments):
         params = dict((key, value) for key, value in arguments if value is not None)
@@ -24,6 +24,12 @@ REBOOT = 'REBOOT'
 OUTPUT_THREAD_DUMP = 'OUTPUT_THREAD_DUMP'
 GRACEFUL_SHUTDOWN = 'GRACEFUL_SHUTDOWN'
 FORCEFUL_SHUTDOWN = 'FORCEFUL_SHUTDOWN'
+UNHEALTHY = 'UNHEALTHY'
+DECOMMISSIONING = 'DECOMMISSIONING'
+DECOMMISSIONED = 'DECOMMISSIONED'
+LOST = 'LOST'
+REBOOTED = 'REBOOTED'
+SHUTDOWN = 'SHUTDOWN'
 
 YarnApplicationState = (
     (ACCEPTED, 'Application has been accepted by the scheduler.'),
@@ -72,6 +78,17 @@ JobStateInternal = (
     (REBOOT, REBOOT),
 )
 
+NodeState = (
+    (NEW, 'New node.'),
+    (RUNNING, 'Running node.'),
+    (UNHEALTHY, 'Node which failed its health check.'),
+    (DECOMMISSIONING, 'Node which is being decommissioned.'),
+    (DECOMMISSIONED, 'Node which is out of service.'),
+    (LOST, 'Node which stopped sending heartbeats.'),
+    (REBOOTED, 'Node which has rebooted.'),
+    (SHUTDOWN, 'Node which has shut down.'),
+)
+
 ClusterContainerSignal = (
     (OUTPUT_THREAD_DUMP, OUTPUT_THREAD_DUMP),
     (GRACEFUL_SHUTDOWN, GRACEFUL_SHUTDOWN),
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+from .base import get_logger
+from .errors import APIError
+from .poller import Poller
+
+log = get_logger(__name__)
+
+
+def _seconds(milliseconds):
+    return int(milliseconds) / 1000.0 if milliseconds is not None else None
+
+
+class DelegationToken(object):
+    """
+    ResourceManager delegation token.
+
+    :param str token: encoded token, as sent in the
+        `Hadoop-YARN-RM-Delegation-Token` header
+    :param str renewer: user allowed to renew the token
+    :param float expiration: expiration time in seconds since epoch
+    :param float max_validity: time in seconds since epoch after which the
+        token cannot be renewed anymore
+    :param str owner: owner of the token
+    :param str kind: kind of the token
+    """
+    __slots__ = ('token', 'renewer', 'expiration', 'max_validity', 'owner', 'kind')
+
+    def __init__(self, token, renewer, expiration, max_validity=None, owner=None, kind=None):
+        self.token = token
+        self.renewer = renewer
+        self.expiration = expiration
+        self.max_validity = max_validity
+        self.owner = owner
+        self.kind = kind
+
+    @classmethod
+    def from_response(cls, data):
+        """
+        Builds the token from the JSON data of
+        :py:meth:`yarn_api_client.resource_manager.ResourceManager.cluster_new_delegation_token`.
+
+        :param dict data: `Response.data` of the delegation token API
+        :rtype: :py:class:`DelegationToken`
+        """
+        return cls(data['token'], data.get('renewer'), _seconds(data.get('expiration-time')),
+                   _seconds(data.get('max-validity')), data.get('owner'), data.get('kind'))
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**dict((key, data.get(key)) for key in cls.__slots__))
+
+    def to_dict(self):
+        return dict((key, getattr(self, key)) for key in self.__slots__)
+
+    def expires_within(self, seconds, now=None):
+        """
+        Whether the token expires in less than the given number of seconds.
+
+        :param float seconds: delay in seconds
+        :param float now: current time, `time.time()` if `None`
+        :rtype: bool
+        """
+        now = time.time() if now is None else now
+        return self.expiration is not None and self.expiration - seconds <= now
+
+    def renewable(self, now=None):
+        now = time.time() if now is None else now
+        return self.max_validity is None or self.max_validity > now
+
+
+class DelegationTokenManager(Poller):
+    """
+    Obtains a ResourceManager delegation token once and keeps it valid.
+
+    The token is fetched on the first call to :py:meth:`token` and shared by
+    all threads.  Once :py:meth:`start` is called, it is renewed in the
+    background when `renew_fraction` of its remaining lifetime elapsed,
+    shortened by a random jitter so that many processes started together do
+    not renew at the same time.  A new token is requested when the current
+    one reached its maximum validity.
+
+    With `cache_path`, the token is stored in that file (readable by its
+    owner only) and reused by other processes using the same file, instead
+    of requesting one token per process.
+
+    :py:meth:`stop` cancels the token when `cancel_on_stop` is true, which
+    also removes the cache file.  It is false by default when `cache_path`
+    is given, since other processes may still use the cached token.  A token
+    replaced by a new one, once expiring or past its maximum validity, is
+    cancelled.
+
+    :param ResourceManager resource_manager: client used to manage the token,
+        it must be authenticated with Kerberos
+    :param str renewer: user allowed to renew the token
+    :param str cache_path: file in which the token is cached
+    :param float renew_fraction: fraction of the remaining lifetime after
+        which the token is renewed
+    :param float jitter: maximum fraction by which the renewal is brought
+        forward
+    :param float margin: seconds before expiry at which a token is not
+        used anymore
+    :param float retry_interval: delay in seconds before retrying a failed
+        renewal
+    :param bool cancel_on_stop: cancel the token when the manager is stopped,
+        only without `cache_path` if `None`
+    """
+    def __init__(self, resource_manager, renewer, cache_path=None, renew_fraction=0.75, jitter=0.1,
+                 margin=60, retry_interval=30, cancel_on_stop=None):
+        super(DelegationTokenManager, self).__init__(retry_interval)
+        self.resource_manager = resource_manager
+        self.renewer = renewer
+        self.cache_path = cache_path
+        self.renew_fraction = renew_fraction
+        self.jitter = jitter
+        self.margin = margin
+        self.retry_interval = retry_interval
+        self.cancel_on_stop = not cache_path if cancel_on_stop is None else cancel_on_stop
+        self._lock = threading.RLock()
+        self._token = None
+        self._renew_at = None
+
+    def token(self):
+        """
+        Current delegation token, fetched or loaded from the cache file if
+        there is no usable one yet.
+
+        :returns: encoded token
+        :rtype: str
+        """
+        return self.delegation_token().token
+
+    def delegation_token(self):
+        """
+        Current delegation token, see :py:meth:`token`.
+
+        :rtype: :py:class:`DelegationToken`
+        """
+        token = self._token
+        if token is not None and not token.expires_within(self.margin):
+            return token
+
+        with self._lock:
+            token = self._token
+            if token is None or token.expires_within(self.margin):
+                token = self._load() or self._fetch()
+            return token
+
+    def poll(self):
+        """
+        Renews the token if it is due, requesting a new one if it cannot be
+        renewed anymore.
+        """
+        with self._lock:
+            now = time.time()
+            if self._token is None or self._renew_at > now:
+                return
+
+            # Another process may have renewed the shared token already
+            cached = self._load()
+            if cached is not None and self._renew_at > now:
+                return
+
+            token = self._token
+            if not token.renewable(now + self.margin):
+                self._replace(now)
+                return
+
+            try:
+                data = self.resource_manager.cluster_renew_delegation_token(token.token).data
+            except (APIError, IOError) as e:
+                log.warning("Failed to renew delegation token: {err}".format(err=e))
+                if token.expires_within(self.margin, now):
+                    self._replace(now)
+                else:
+                    self._renew_at = now + self.retry_interval
+                return
+
+            token.expiration = _seconds(data['expiration-time'])
+            self._set(token)
+
+    def next_delay(self):
+        with self._lock:
+            if self._renew_at is None:
+                return self.retry_interval
+            return max(self._renew_at - time.time(), 0)
+
+    def stop(self, timeout=None):
+        super(DelegationTokenManager, self).stop(timeout)
+        if self.cancel_on_stop:
+            self.cancel()
+
+    def cancel(self):
+        """
+        Cancels the current token and removes the cache file.
+        """
+        with self._lock:
+            token, self._token, self._renew_at = self._token, None, None
+            if token is None:
+                return
+            self._cancel(token)
+            if self.cache_path:
+                try:
+                    os.remove(self.cache_path)
+                except OSError:
+                    pass
+
+    def _cancel(self, token):
+        try:
+            self.resource_manager.cluster_cancel_delegation_token(token.token)
+        except (APIError, IOError) as e:
+            log.warning("Failed to cancel delegation token: {err}".format(err=e))
+
+    def _replace(self, now):
+        # Requests a new token from poll(), retrying later if it fails
+        try:
+            self._fetch()
+        except (APIError, IOError) as e:
+            log.warning("Failed to request a new delegation token: {err}".format(err=e))
+            self._renew_at = now + self.retry_interval
+
+    def _fetch(self):
+        log.info("Requesting a new delegation token for renewer '{renewer}'".format(renewer=self.renewer))
+        previous = self._token
+        token = DelegationToken.from_response(
+            self.resource_manager.cluster_new_delegation_token(self.renewer).data)
+        self._set(token)
+        if previous is not None and previous.token != token.token:
+            self._cancel(previous)
+        return token
+
+    def _set(self, token):
+        self._schedule(token)
+        self._store(token)
+
+    def _schedule(self, token):
+        now = time.time()
+        lifetime = max((token.expiration or now) - now, 0)
+        self._token = token
+        self._renew_at = now + lifetime * self.renew_fraction * (1 - random.uniform(0, self.jitter))
+
+    def _load(self):
+        if not self.cache_path:
+            return None
+        try:
+            with open(self.cache_path) as f:
+                token = DelegationToken.from_dict(json.load(f))
+        except (IOError, OSError, ValueError, TypeError) as e:
+            log.debug("No usable delegation token in '{path}': {err}".format(path=self.cache_path, err=e))
+            return None
+
+        if token.renewer != self.renewer or token.expires_within(self.margin):
+            return None
+        current = self._token
+        if current is None or current.token != token.token or current.expiration != token.expiration:
+            self._schedule(token)
+        return token
+
+    def _store(self, token):
+        if not self.cache_path:
+            return
+        directory = os.path.dirname(os.path.abspath(self.cache_path))
+        fd, path = tempfile.mkstemp(dir=directory, prefix='.delegation-token-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(token.to_dict(), f)
+            os.replace(path, self.cache_path)
+        except (IOError, OSError) as e:
+            log.warning("Failed to cache delegation token in '{path}': {err}".format(path=self.cache_path, err=e))
+            try:
+                os.remove(path)
+            except OSError:
+                pass
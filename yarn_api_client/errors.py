@@ -2,7 +2,10 @@
 
 
 class APIError(Exception):
-    pass
+    def __init__(self, *args, **kwargs):
+        #: HTTP status of the failed response, if any
+        self.status_code = kwargs.pop('status_code', None)
+        super(APIError, self).__init__(*args, **kwargs)
 
 
 class ConfigurationError(APIError):
@@ -11,3 +14,7 @@ class ConfigurationError(APIError):
 
 class IllegalArgumentError(APIError):
     pass
+
+
+class DeadlineExceededError(APIError):
+    pass
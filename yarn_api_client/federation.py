@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import threading
+import time
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from .base import get_logger
+from .errors import DeadlineExceededError, IllegalArgumentError
+from .output import iter_records
+from .resource_manager import ResourceManager
+
+log = get_logger(__name__)
+
+#: ResourceManager methods which can be run across clusters
+READ_METHODS = frozenset([
+    'cluster_information',
+    'cluster_metrics',
+    'cluster_scheduler',
+    'cluster_applications',
+    'cluster_application_statistics',
+    'cluster_application',
+    'cluster_application_attempts',
+    'cluster_application_attempt_info',
+    'cluster_application_attempt_containers',
+    'cluster_application_attempt_container_info',
+    'cluster_application_state',
+    'cluster_nodes',
+    'cluster_node',
+    'cluster_get_application_queue',
+    'cluster_get_application_priority',
+    'cluster_scheduler_queue',
+    'cluster_reservations',
+    'cluster_application_timeouts',
+    'cluster_application_timeout',
+    'cluster_scheduler_conf_mutation',
+    'scheduler_activities',
+    'application_activities',
+])
+
+
+class FederatedResult(object):
+    """
+    Results of a call run across clusters.
+
+    :param OrderedDict results: return value of the call keyed by cluster
+        label, for the clusters which answered
+    :param OrderedDict errors: exception keyed by cluster label, for the
+        clusters which failed or missed the deadline
+    """
+    def __init__(self, results, errors):
+        self.results = results
+        self.errors = errors
+
+    @property
+    def partial(self):
+        """
+        Whether some clusters did not answer.
+        """
+        return bool(self.errors)
+
+    def records(self, label='cluster'):
+        """
+        Records of all the answers (applications, nodes, ...), each labelled
+        with the cluster it comes from, see
+        :py:func:`yarn_api_client.output.iter_records`.
+
+        :param str label: name of the field holding the cluster label
+        :returns: iterator over the labelled records
+        """
+        for cluster, result in self.results.items():
+            data = getattr(result, 'data', result)
+            for record in iter_records(data):
+                record = dict(record)
+                record[label] = cluster
+                yield record
+
+
+class MultiClusterClient(object):
+    """
+    Runs ResourceManager read methods concurrently across several clusters.
+
+    Each cluster is given by its label and either a ResourceManager address,
+    the list of addresses of its HA ResourceManagers, or a
+    :py:class:`yarn_api_client.resource_manager.ResourceManager` instance.
+    Clients are created lazily, so that the active ResourceManager of each
+    cluster is looked up concurrently, on the first call.
+
+    Any method of :py:data:`READ_METHODS` is available on the client and
+    returns a :py:class:`FederatedResult`::
+
+        client = MultiClusterClient({'east': ['rm1:8088', 'rm2:8088'], 'west': 'rm3:8088'}, deadline=5)
+        running = client.cluster_applications(states=['RUNNING'], user='alice')
+        total = sum(1 for _ in running.records())
+
+    A cluster which fails, or does not answer within `deadline` seconds, is
+    reported in :py:attr:`FederatedResult.errors` and does not fail the
+    call.
+
+    :param dict clusters: cluster definitions keyed by label
+    :param deadline: seconds to wait for each cluster, either one value for
+        all clusters or a dictionary keyed by cluster label, no limit if
+        `None`
+    :param int timeout: API connection timeout in seconds of the clients
+    :param int max_workers: number of concurrent requests, four per cluster
+        by default
+    :param AuthBase auth: Auth to use for requests
+    :param verify: TLS verification, see
+        :py:class:`yarn_api_client.base.BaseYarnAPI`
+    :param dict proxies: proxies used by the clients
+    """
+    def __init__(self, clusters, deadline=None, timeout=30, auth=None, verify=True, proxies=None,
+                 max_workers=None):
+        self.deadline = deadline
+        self.clients = OrderedDict()
+        for cluster, definition in clusters.items():
+            if isinstance(definition, ResourceManager):
+                client = definition
+            else:
+                endpoints = [definition] if isinstance(definition, str) else list(definition)
+                client = ResourceManager(endpoints, timeout=timeout, auth=auth, verify=verify, proxies=proxies,
+                                         lazy=True)
+            self.clients[cluster] = client
+
+        self.max_workers = max_workers or 4 * max(len(self.clients), 1)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def call(self, method, *args, **kwargs):
+        """
+        Runs a ResourceManager read method on all or some of the clusters.
+
+        :param str method: name of the method, see :py:data:`READ_METHODS`
+        :param List[str] clusters: keyword only, labels of the clusters to
+            query, all of them if `None`
+        :param deadline: keyword only, overrides the deadline of the client
+            for this call
+        :rtype: :py:class:`FederatedResult`
+        :raises yarn_api_client.errors.IllegalArgumentError: if the method
+            is not a read method
+        """
+        clusters = kwargs.pop('clusters', None)
+        deadline = kwargs.pop('deadline', self.deadline)
+        if method not in READ_METHODS:
+            raise IllegalArgumentError("'{method}' cannot be run across clusters".format(method=method))
+
+        labels = list(self.clients) if clusters is None else list(clusters)
+        executor = self._get_executor()
+        futures = OrderedDict(
+            (label, executor.submit(getattr(self.clients[label], method), *args, **kwargs)) for label in labels)
+
+        begin = time.time()
+        limits = dict((label, deadline.get(label) if isinstance(deadline, dict) else deadline) for label in labels)
+        done = {}
+        # Clusters are waited for in deadline order, each until its own deadline
+        for label in sorted(labels, key=lambda label: (limits[label] is None, limits[label])):
+            limit = limits[label]
+            timeout = None if limit is None else max(begin + limit - time.time(), 0)
+            wait([futures[label]], timeout=timeout)
+            done[label] = futures[label].done()
+
+        results, errors = OrderedDict(), OrderedDict()
+        for label, future in futures.items():
+            if not done[label]:
+                future.cancel()
+                errors[label] = DeadlineExceededError("Cluster '{cluster}' did not answer within {deadline}s".format(
+                    cluster=label, deadline=limits[label]))
+            elif future.exception() is not None:
+                errors[label] = future.exception()
+            else:
+                results[label] = future.result()
+
+        for label, error in errors.items():
+            log.warning("'{method}' failed on cluster '{cluster}': {err}".format(method=method, cluster=label,
+                                                                                 err=error))
+        log.debug("'{method}' across {count} clusters took {duration} ms".format(
+            method=method, count=len(labels), duration=round((time.time() - begin) * 1000, 3)))
+        return FederatedResult(results, errors)
+
+    def __getattr__(self, name):
+        if name not in READ_METHODS:
+            raise AttributeError(name)
+
+        def method(*args, **kwargs):
+            return self.call(name, *args, **kwargs)
+        method.__name__ = name
+        return method
+
+    def find_application(self, application_id, deadline=None):
+        """
+        Looks for an application on all clusters.
+
+        :param str application_id: The application id
+        :param deadline: overrides the deadline of the client
+        :returns: `(cluster label, application)`, `(None, None)` if no
+            cluster knows the application
+        :rtype: tuple
+        """
+        result = self.call('cluster_application', application_id,
+                           deadline=self.deadline if deadline is None else deadline)
+        for cluster, response in result.results.items():
+            app = response.data.get('app')
+            if app:
+                return cluster, app
+        return None, None
+
+    def close(self):
+        """
+        Stops the worker threads, requests in progress are not waited for.
+        """
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
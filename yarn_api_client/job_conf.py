@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import hashlib
+import sys
+import threading
+
+from operator import itemgetter
+
+from .base import get_logger
+
+log = get_logger(__name__)
+
+
+def _properties(data):
+    conf = data.get('conf') if data else None
+    if not conf:
+        return []
+    return conf.get('property') or []
+
+
+def _intern(table, value):
+    # Entries are `[value, number of references]`
+    entry = table.get(value)
+    if entry is None:
+        entry = table[value] = [value, 0]
+    entry[1] += 1
+    return entry[0]
+
+
+def _unintern(table, value):
+    entry = table[value]
+    entry[1] -= 1
+    if not entry[1]:
+        del table[value]
+
+
+class JobConf(object):
+    """
+    Compact, immutable representation of a MapReduce job configuration.
+
+    Property names are interned and kept sorted, so a lookup is a dictionary
+    access and a diff between two configurations is a single linear merge.
+    `digest` identifies the whole configuration, two configurations are
+    equal when their digests are equal.
+
+    :param tuple keys: sorted property names
+    :param tuple values: property values in the same order as `keys`
+    :param str digest: precomputed digest of `keys` and `values`
+    """
+    __slots__ = ('keys', 'values', 'digest', '_index')
+
+    def __init__(self, keys, values, digest=None):
+        self.keys = keys
+        self.values = values
+        self.digest = digest or self.compute_digest(keys, values)
+        self._index = None
+
+    @staticmethod
+    def compute_digest(keys, values):
+        sha = hashlib.sha1()
+        for key, value in zip(keys, values):
+            sha.update(key.encode('utf-8'))
+            sha.update(b'\x00')
+            sha.update((value or '').encode('utf-8'))
+            sha.update(b'\x01' if value is None else b'\x00')
+        return sha.hexdigest()
+
+    @classmethod
+    def from_response(cls, data):
+        """
+        Builds the configuration from the JSON data of a `job_conf` call of
+        either :py:class:`yarn_api_client.history_server.HistoryServer` or
+        :py:class:`yarn_api_client.application_master.ApplicationMaster`.
+
+        :param dict data: `Response.data` of the job configuration API
+        :rtype: :py:class:`JobConf`
+        """
+        items = sorted(((sys.intern(p['name']), p.get('value')) for p in _properties(data)), key=itemgetter(0))
+        return cls(tuple(k for k, _ in items), tuple(v for _, v in items))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self._lookup()
+
+    def __getitem__(self, key):
+        return self.values[self._lookup()[key]]
+
+    def __eq__(self, other):
+        return isinstance(other, JobConf) and self.digest == other.digest
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.digest)
+
+    def _lookup(self):
+        if self._index is None:
+            self._index = dict((key, i) for i, key in enumerate(self.keys))
+        return self._index
+
+    def get(self, key, default=None):
+        """
+        Value of the given property.
+
+        :param str key: property name
+        :param default: value returned if the property is not set
+        :rtype: str
+        """
+        position = self._lookup().get(key)
+        if position is None:
+            return default
+        return self.values[position]
+
+    def items(self):
+        return zip(self.keys, self.values)
+
+    def diff(self, other):
+        """
+        Properties which differ between this and the other configuration.
+
+        :param JobConf other: configuration to compare with
+        :returns: `(name, this value, other value)` tuples sorted by name,
+            a missing property is reported with value `None`
+        :rtype: List[tuple]
+        """
+        return diff_job_conf(self, other)
+
+
+def diff_job_conf(left, right):
+    """
+    Properties which differ between two job configurations in O(n).
+
+    :param JobConf left: first configuration
+    :param JobConf right: second configuration
+    :returns: `(name, left value, right value)` tuples sorted by name, a
+        missing property is reported with value `None`
+    :rtype: List[tuple]
+    """
+    if left.digest == right.digest:
+        return []
+
+    result = []
+    lkeys, lvalues, rkeys, rvalues = left.keys, left.values, right.keys, right.values
+    i = j = 0
+    while i < len(lkeys) and j < len(rkeys):
+        if lkeys[i] == rkeys[j]:
+            if lvalues[i] != rvalues[j]:
+                result.append((lkeys[i], lvalues[i], rvalues[j]))
+            i += 1
+            j += 1
+        elif lkeys[i] < rkeys[j]:
+            result.append((lkeys[i], lvalues[i], None))
+            i += 1
+        else:
+            result.append((rkeys[j], None, rvalues[j]))
+            j += 1
+
+    result.extend((lkeys[k], lvalues[k], None) for k in range(i, len(lkeys)))
+    result.extend((rkeys[k], None, rvalues[k]) for k in range(j, len(rkeys)))
+    return result
+
+
+class JobConfStore(object):
+    """
+    Cache of job configurations keyed by job id.
+
+    Identical configurations are stored only once, whatever the number of
+    jobs referring to them.  Property name tuples and values are shared
+    between configurations as well, and dropped with the last configuration
+    using them.  The store is safe to use from multiple threads.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._confs = {}
+        self._refs = {}
+        self._key_tuples = {}
+        self._values = {}
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def __contains__(self, job_id):
+        return job_id in self._jobs
+
+    def unique_count(self):
+        """
+        Number of distinct configurations held by the store.
+
+        :rtype: int
+        """
+        return len(self._confs)
+
+    def add(self, job_id, conf):
+        """
+        Stores the configuration of a job.
+
+        :param str job_id: The job id
+        :param JobConf conf: job configuration
+        :returns: the instance kept by the store, which may be a previously
+            stored equal configuration
+        :rtype: :py:class:`JobConf`
+        """
+        with self._lock:
+            stored = self._confs.get(conf.digest)
+            if stored is None:
+                keys = _intern(self._key_tuples, conf.keys)
+                values = tuple(_intern(self._values, v) for v in conf.values)
+                stored = JobConf(keys, values, conf.digest)
+                self._confs[conf.digest] = stored
+                self._refs[conf.digest] = 0
+
+            previous = self._jobs.get(job_id)
+            if previous is not stored:
+                if previous is not None:
+                    self._release(previous)
+                self._jobs[job_id] = stored
+                self._refs[stored.digest] += 1
+            return stored
+
+    def _release(self, conf):
+        self._refs[conf.digest] -= 1
+        if not self._refs[conf.digest]:
+            del self._refs[conf.digest]
+            del self._confs[conf.digest]
+            _unintern(self._key_tuples, conf.keys)
+            for value in conf.values:
+                _unintern(self._values, value)
+
+    def add_response(self, job_id, data):
+        """
+        Stores the configuration from the JSON data of a `job_conf` call.
+
+        :param str job_id: The job id
+        :param dict data: `Response.data` of the job configuration API
+        :rtype: :py:class:`JobConf`
+        """
+        return self.add(job_id, JobConf.from_response(data))
+
+    def get(self, job_id):
+        """
+        Configuration of a job, `None` if not stored.
+
+        :param str job_id: The job id
+        :rtype: :py:class:`JobConf`
+        """
+        return self._jobs.get(job_id)
+
+    def remove(self, job_id):
+        """
+        Forgets the configuration of a job.  The configuration itself is
+        dropped once no other job refers to it.
+
+        :param str job_id: The job id
+        """
+        with self._lock:
+            conf = self._jobs.pop(job_id, None)
+            if conf is not None:
+                self._release(conf)
+
+    def fetch_from_history_server(self, history_server, job_id):
+        """
+        Returns the stored configuration of a finished job, fetching it from
+        the History Server on a cache miss.
+
+        :param HistoryServer history_server: History Server client
+        :param str job_id: The job id
+        :rtype: :py:class:`JobConf`
+        """
+        conf = self._jobs.get(job_id)
+        if conf is None:
+            conf = self.add_response(job_id, history_server.job_conf(job_id).data)
+        return conf
+
+    def fetch_from_application_master(self, application_master, application_id, job_id):
+        """
+        Returns the stored configuration of a running job, fetching it from
+        its Application Master on a cache miss.
+
+        :param ApplicationMaster application_master: Application Master client
+        :param str application_id: The application id
+        :param str job_id: The job id
+        :rtype: :py:class:`JobConf`
+        """
+        conf = self._jobs.get(job_id)
+        if conf is None:
+            conf = self.add_response(job_id, application_master.job_conf(application_id, job_id).data)
+        return conf
+
+    def diff(self, job_id, other_job_id):
+        """
+        Properties which differ between the configurations of two stored
+        jobs, see :py:func:`diff_job_conf`.
+
+        :param str job_id: The first job id
+        :param str other_job_id: The second job id
+        :rtype: List[tuple]
+        """
+        return diff_job_conf(self._jobs[job_id], self._jobs[other_job_id])
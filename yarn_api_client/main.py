@@ -1,35 +1,91 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 import argparse
+import importlib
+import logging
+import os
+import shlex
+import sys
+import threading
+from collections import deque, OrderedDict
 from pprint import pprint
 
-from .base import get_logger
+# Only lightweight modules are imported here: the API client modules (and
+# with them requests) are imported once the command line was parsed, see
+# get_api_class()
 from .constants import (YarnApplicationState, FinalApplicationStatus,
                         ApplicationState, JobStateInternal)
-from . import ResourceManager, NodeManager, HistoryServer, ApplicationMaster
 
-log = get_logger(__name__)
+log = logging.getLogger(__name__)
 
+OUTPUT_FORMATS = ('pprint', 'csv', 'json', 'jsonl', 'tsv')
 
-def get_parser():
-    parser = argparse.ArgumentParser(
-        description='Client for Hadoop® YARN API')
 
+def add_global_arguments(parser):
     parser.add_argument('--endpoint', help='API endpoint (https://test.cluster.com:8090)')
+    parser.add_argument('--output', default='pprint', choices=OUTPUT_FORMATS,
+                        help='output format, records are streamed with json, jsonl, csv and tsv')
+    parser.add_argument('--fields', help='comma separated fields of the records to output (id,state,...)')
+
+
+def get_parser(service=None):
+    """
+    Command line parser.
+
+    :param str service: when given, only the sub-commands of this service
+        (`rm`, `nm`, `am` or `hs`) are built, the other services are listed
+        without their sub-commands
+    :rtype: argparse.ArgumentParser
+    """
+    parser = argparse.ArgumentParser(
+        description='Client for Hadoop® YARN API')
+    add_global_arguments(parser)
 
     subparsers = parser.add_subparsers()
-    populate_resource_manager_arguments(subparsers)
-    populate_node_manager_arguments(subparsers)
-    populate_application_master_arguments(subparsers)
-    populate_history_server_arguments(subparsers)
+    for name, (description, populate) in SERVICES.items():
+        if service is None or service == name:
+            populate(subparsers)
+        else:
+            subparsers.add_parser(name, help=description)
 
     return parser
 
 
+def get_selected_service(argv):
+    """
+    Service selected on the command line, without building the full parser.
+
+    :param List[str] argv: command line arguments
+    :rtype: str
+    """
+    parser = argparse.ArgumentParser(add_help=False)
+    add_global_arguments(parser)
+    try:
+        _, remaining = parser.parse_known_args(argv)
+    except SystemExit:
+        # Let the full parser report the error
+        return None
+    for arg in remaining:
+        if arg in SERVICES:
+            return arg
+    return None
+
+
+def get_api_class(path):
+    """
+    API client class, imported on first use.
+
+    :param str path: `module.ClassName` relative to this package
+    :rtype: type
+    """
+    module, _, name = path.rpartition('.')
+    return getattr(importlib.import_module('.' + module, __package__), name)
+
+
 def populate_resource_manager_arguments(subparsers):
     rm_parser = subparsers.add_parser(
-        'rm', help='ResourceManager REST API\'s')
-    rm_parser.set_defaults(api_class=ResourceManager)
+        'rm', help=SERVICES['rm'][0])
+    rm_parser.set_defaults(api_class='resource_manager.ResourceManager')
 
     rm_subparsers = rm_parser.add_subparsers()
 
@@ -90,11 +146,14 @@ def populate_resource_manager_arguments(subparsers):
     cn_parser.set_defaults(method='cluster_node')
     cn_parser.set_defaults(method_args=['node_id'])
 
+    populate_top_arguments(rm_subparsers, 'ResourceManagerTop',
+                           'Live view of cluster metrics, queues and running applications')
+
 
 def populate_node_manager_arguments(subparsers):
     nm_parser = subparsers.add_parser(
-        'nm', help='NodeManager REST API\'s')
-    nm_parser.set_defaults(api_class=NodeManager)
+        'nm', help=SERVICES['nm'][0])
+    nm_parser.set_defaults(api_class='node_manager.NodeManager')
 
     nm_subparsers = nm_parser.add_subparsers()
 
@@ -128,11 +187,22 @@ def populate_node_manager_arguments(subparsers):
     nc_parser.set_defaults(method='node_container')
     nc_parser.set_defaults(method_args=['container_id'])
 
+    populate_top_arguments(nm_subparsers, 'NodeManagerTop', 'Live view of the node and its containers')
+
+
+def populate_top_arguments(subparsers, top_class, description):
+    top_parser = subparsers.add_parser('top', help=description)
+    top_parser.add_argument('--interval', type=float, default=2,
+                            help='refresh interval in seconds')
+    top_parser.add_argument('--rows', type=int,
+                            help='number of lines displayed (default: terminal height)')
+    top_parser.set_defaults(top=top_class)
+
 
 def populate_application_master_arguments(subparsers):
     am_parser = subparsers.add_parser(
-        'am', help='MapReduce Application Master REST API\'s')
-    am_parser.set_defaults(api_class=ApplicationMaster)
+        'am', help=SERVICES['am'][0])
+    am_parser.set_defaults(api_class='application_master.ApplicationMaster')
     am_parser.add_argument('application_id')
 
     # TODO: not implemented
@@ -140,8 +210,8 @@ def populate_application_master_arguments(subparsers):
 
 def populate_history_server_arguments(subparsers):
     hs_parser = subparsers.add_parser(
-        'hs', help='History Server REST API\'s')
-    hs_parser.set_defaults(api_class=HistoryServer)
+        'hs', help=SERVICES['hs'][0])
+    hs_parser.set_defaults(api_class='history_server.HistoryServer')
 
     hs_subparsers = hs_parser.add_subparsers()
 
@@ -238,21 +308,31 @@ def populate_history_server_arguments(subparsers):
     htac_parser.set_defaults(method_args=['job_id', 'task_id', 'attempt_id'])
 
 
-def main():
-    parser = get_parser()
-    opts = parser.parse_args()
+def populate_batch_arguments(subparsers):
+    batch_parser = subparsers.add_parser(
+        'batch', help=SERVICES['batch'][0],
+        description='Runs one command per input line (e.g. "rm app application_1") concurrently over a '
+                    'single client per service and writes the results in input order. With --command, '
+                    'each line holds the arguments appended to that command (e.g. application ids).')
+    batch_parser.add_argument('--file', default='-',
+                              help='file to read the commands from, - for stdin (default)')
+    batch_parser.add_argument('--command',
+                              help='command run for each input line, e.g. "rm app"')
+    batch_parser.add_argument('--workers', type=int, default=8,
+                              help='number of concurrent requests')
+    batch_parser.set_defaults(batch=True)
 
-    class_kwargs = {}
-    if not hasattr(opts, 'api_class'):
-        raise Exception("Please provide api class - rm, hs, nm, am")
-    # Only ResourceManager supports HA
-    elif opts.endpoint:
-        if opts.api_class == ResourceManager:
-            class_kwargs['service_endpoints'] = opts.endpoint.split(",")
-        else:
-            class_kwargs['service_endpoint'] = opts.endpoint
 
-    api = opts.api_class(**class_kwargs)
+SERVICES = OrderedDict([
+    ('rm', ('ResourceManager REST API\'s', populate_resource_manager_arguments)),
+    ('nm', ('NodeManager REST API\'s', populate_node_manager_arguments)),
+    ('am', ('MapReduce Application Master REST API\'s', populate_application_master_arguments)),
+    ('hs', ('History Server REST API\'s', populate_history_server_arguments)),
+    ('batch', ('Run commands read from a file or stdin', populate_batch_arguments)),
+])
+
+
+def get_method_arguments(opts):
     # Construct positional arguments for method
     if 'method_args' in opts:
         method_args = [getattr(opts, arg) for arg in opts.method_args]
@@ -263,5 +343,234 @@ def main():
         method_kwargs = dict((key, getattr(opts, key)) for key in opts.method_kwargs)
     else:
         method_kwargs = {}
+    return method_args, method_kwargs
+
+
+def create_api(api_class_path, endpoint=None, output='pprint', pool_size=None):
+    """
+    API client for the command line.
+
+    :param str api_class_path: client class, see :py:func:`get_api_class`
+    :param str endpoint: API endpoint, comma separated endpoints for the
+        ResourceManager
+    :param str output: output format, responses are decoded record by
+        record for all formats but `pprint`
+    :param int pool_size: number of connections kept open per host
+    """
+    class_kwargs = {}
+    # Only ResourceManager supports HA
+    if endpoint:
+        if api_class_path == 'resource_manager.ResourceManager':
+            class_kwargs['service_endpoints'] = endpoint.split(",")
+        else:
+            # Several endpoints are equivalent instances, see BaseYarnAPI
+            endpoints = endpoint.split(",")
+            class_kwargs['service_endpoint'] = endpoints if len(endpoints) > 1 else endpoint
+
+    api = get_api_class(api_class_path)(**class_kwargs)
+    if output != 'pprint':
+        from .output import StreamingResponse
+        api.response_class = StreamingResponse
+    if pool_size:
+        from requests.adapters import HTTPAdapter
+        for prefix in ('http://', 'https://'):
+            api.session.mount(prefix, HTTPAdapter(pool_maxsize=pool_size))
+    return api
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    parser = get_parser(get_selected_service(argv))
+    opts = parser.parse_args(argv)
+
+    if getattr(opts, 'batch', False):
+        if run_batch(opts):
+            sys.exit(1)
+        return
+
+    if not hasattr(opts, 'api_class'):
+        raise Exception("Please provide api class - rm, hs, nm, am")
+
+    if getattr(opts, 'top', None):
+        run_top(opts)
+        return
+
+    from .output import parse_fields
+    api = create_api(opts.api_class, opts.endpoint, opts.output)
+    method_args, method_kwargs = get_method_arguments(opts)
     response = getattr(api, opts.method)(*method_args, **method_kwargs)
-    pprint(response.data)
+    try:
+        write_response(response, opts.output, parse_fields(opts.fields))
+    except BrokenPipeError:
+        # The output was piped to a command which exited early (e.g. head),
+        # discard what is left to flush
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
+
+
+def write_response(response, output, fields=None, stream=None):
+    from .output import get_writer, project, response_records
+
+    stream = stream or sys.stdout
+    if output == 'pprint':
+        if fields is None:
+            pprint(response.data, stream=stream)
+        else:
+            pprint([project(record, fields) for record in response_records(response)], stream=stream)
+        return
+
+    get_writer(output, stream, fields).write_all(response_records(response))
+
+
+def run_top(opts):
+    from . import top
+
+    api = create_api(opts.api_class, opts.endpoint)
+    view = getattr(top, opts.top)(api, opts.interval, max_rows=opts.rows)
+    try:
+        view.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        view.stop()
+
+
+class BatchRunner(object):
+    """
+    Runs command lines concurrently over one API client per service.
+
+    Commands are executed by `workers` threads, at most ``2 * workers``
+    commands are in flight, and results are produced in input order.
+
+    :param str endpoint: API endpoint, see :py:func:`create_api`
+    :param str output: output format
+    :param int workers: number of concurrent requests
+    :param str command: command prepended to each line
+    """
+    def __init__(self, endpoint=None, output='pprint', workers=8, command=None):
+        self.endpoint = endpoint
+        self.output = output
+        self.workers = workers
+        self.command = shlex.split(command) if command else []
+        self._parsers = {}
+        self._apis = {}
+        self._lock = threading.Lock()
+
+    def parse(self, line):
+        """
+        Parses an input line.
+
+        :param str line: command line, or arguments of `command`
+        :returns: parsed options, `None` for blank and comment lines
+        :raises ValueError: if the line is not a valid command
+        """
+        argv = shlex.split(line, comments=True)
+        if not argv:
+            return None
+        argv = self.command + argv
+        service = argv[0]
+        if service not in SERVICES or service == 'batch':
+            raise ValueError("unknown service '{service}'".format(service=service))
+
+        parser = self._parsers.get(service)
+        if parser is None:
+            parser = self._parsers[service] = get_parser(service)
+        try:
+            opts = parser.parse_args(argv)
+        except SystemExit:
+            raise ValueError("invalid command '{command}'".format(command=' '.join(argv)))
+        if not hasattr(opts, 'method'):
+            raise ValueError("incomplete command '{command}'".format(command=' '.join(argv)))
+        return opts
+
+    def api(self, api_class_path):
+        with self._lock:
+            api = self._apis.get(api_class_path)
+            if api is None:
+                api = create_api(api_class_path, self.endpoint, self.output, pool_size=self.workers)
+                self._apis[api_class_path] = api
+            return api
+
+    def execute(self, opts):
+        method_args, method_kwargs = get_method_arguments(opts)
+        return getattr(self.api(opts.api_class), opts.method)(*method_args, **method_kwargs)
+
+    def run(self, lines):
+        """
+        Runs the commands of the given lines.
+
+        :param lines: iterable over the input lines
+        :returns: iterator over `(line number, line, response, error)`
+            tuples in input order, exactly one of `response` and `error`
+            is `None`
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for number, line in enumerate(lines, 1):
+                line = line.strip()
+                try:
+                    opts = self.parse(line)
+                except ValueError as e:
+                    pending.append((number, line, None, e))
+                else:
+                    if opts is None:
+                        continue
+                    pending.append((number, line, executor.submit(self.execute, opts), None))
+
+                while len(pending) > 2 * self.workers or (pending and self._done(pending[0])):
+                    yield self._result(pending.popleft())
+
+            while pending:
+                yield self._result(pending.popleft())
+
+    @staticmethod
+    def _done(entry):
+        return entry[2] is None or entry[2].done()
+
+    @staticmethod
+    def _result(entry):
+        number, line, future, error = entry
+        if future is None:
+            return number, line, None, error
+        try:
+            return number, line, future.result(), None
+        except Exception as e:
+            return number, line, None, e
+
+
+def run_batch(opts, stream=None, error_stream=None):
+    """
+    Runs the `batch` command.
+
+    :returns: number of failed commands
+    :rtype: int
+    """
+    from .output import get_writer, parse_fields, response_records
+
+    stream = stream or sys.stdout
+    error_stream = error_stream or sys.stderr
+    fields = parse_fields(opts.fields)
+    writer = get_writer(opts.output, stream, fields) if opts.output != 'pprint' else None
+    runner = BatchRunner(opts.endpoint, opts.output, opts.workers, opts.command)
+
+    failures = 0
+    lines = sys.stdin if opts.file == '-' else open(opts.file)
+    try:
+        for number, line, response, error in runner.run(lines):
+            if error is not None:
+                failures += 1
+                error_stream.write('line {number}: {line}: {error}\n'.format(number=number, line=line, error=error))
+            elif writer is None:
+                write_response(response, 'pprint', fields, stream)
+            else:
+                for record in response_records(response):
+                    writer.write(record)
+                stream.flush()
+    finally:
+        if lines is not sys.stdin:
+            lines.close()
+    if writer is not None:
+        writer.close()
+    return failures
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import threading
+
+from collections import OrderedDict
+
+from requests import RequestException
+
+from .base import get_logger
+from .errors import APIError
+
+log = get_logger(__name__)
+
+APPLICATION_MASTER = 'APPLICATION_MASTER'
+HISTORY_SERVER = 'HISTORY_SERVER'
+
+
+def application_to_job_id(application_id):
+    """
+    Id of the MapReduce job run by the given application.
+
+    :param str application_id: The application id
+    :rtype: str
+    """
+    return application_id.replace('application_', 'job_', 1)
+
+
+class MapReduceJobClient(object):
+    """
+    MapReduce job client which serves requests from the Application Master
+    while the application runs and from the History Server once it finished.
+
+    The first request for an application goes to the Application Master.
+    When the AM does not answer anymore (connection error, timeout, server
+    error, or the web proxy redirects to the History Server web UI or
+    answers `404 Not Found` once the application finished), the request is
+    served by the History Server and all later requests for that
+    application go straight to it.  A `404` is only attributed to a finished
+    application if the AM does not answer its info resource either, other
+    errors, e.g. for an unknown job or task id, are raised.
+
+    Methods mirror :py:class:`yarn_api_client.application_master.ApplicationMaster`
+    and return the same JSON structures.
+
+    :param ApplicationMaster application_master: Application Master client
+    :param HistoryServer history_server: History Server client
+    :param int max_applications: number of applications whose server is
+        remembered, the least recently queried ones are forgotten first
+    """
+    def __init__(self, application_master, history_server, max_applications=10000):
+        self.application_master = application_master
+        self.history_server = history_server
+        self.max_applications = max_applications
+        self._served_by = OrderedDict()
+        self._lock = threading.Lock()
+
+    def served_by(self, application_id):
+        """
+        Which server answered the last request for the application.
+
+        :param str application_id: The application id
+        :returns: `APPLICATION_MASTER`, `HISTORY_SERVER` or `None` if the
+            application was not queried yet
+        :rtype: str
+        """
+        return self._served_by.get(application_id)
+
+    def _set_served_by(self, application_id, server):
+        with self._lock:
+            self._served_by.pop(application_id, None)
+            self._served_by[application_id] = server
+            while len(self._served_by) > self.max_applications:
+                self._served_by.popitem(last=False)
+
+    def _am_gone(self, application_id, error):
+        # Redirects to the History Server web UI are not JSON (ValueError)
+        if not isinstance(error, APIError):
+            return True
+        status = error.status_code or 0
+        if status >= 500 or 300 <= status < 400:
+            return True
+        if status != 404:
+            return False
+        # Either the proxy lost the AM, or the AM does not know the resource
+        try:
+            self.application_master.application_information(application_id)
+        except (APIError, RequestException, ValueError):
+            return True
+        return False
+
+    def _call(self, application_id, am_call, hs_call):
+        if self._served_by.get(application_id) != HISTORY_SERVER:
+            try:
+                response = am_call()
+            except (APIError, RequestException, ValueError) as e:
+                if not self._am_gone(application_id, e):
+                    raise
+                log.debug("Application master of '{appid}' unavailable, trying history server: {err}".format(
+                    appid=application_id, err=e))
+            else:
+                self._set_served_by(application_id, APPLICATION_MASTER)
+                return response
+
+        response = hs_call()
+        self._set_served_by(application_id, HISTORY_SERVER)
+        return response
+
+    def jobs(self, application_id):
+        """
+        The jobs of the application.  Once the application finished, its
+        job is fetched from the History Server and returned in the structure
+        of the Application Master jobs resource.
+
+        :param str application_id: The application id
+        :returns: API response object with JSON data
+        :rtype: :py:class:`yarn_api_client.base.Response`
+        """
+        def from_history_server():
+            response = self.history_server.job(application_to_job_id(application_id))
+            job = response.data.get('job')
+            response.data = {'jobs': {'job': [job] if job else []}}
+            return response
+
+        return self._call(
+            application_id,
+            lambda: self.application_master.jobs(application_id),
+            from_history_server)
+
+    def job(self, application_id, job_id):
+        """
+        :param str application_id: The application id
+        :param str job_id: The job id
+        :returns: API response object with JSON data
+        :rtype: :py:class:`yarn_api_client.base.Response`
+        """
+        return self._call(
+            application_id,
+            lambda: self.application_master.job(application_id, job_id),
+            lambda: self.history_server.job(job_id))
+
+    def job_attempts(self, application_id, job_id):
+        """
+        :param str application_id: The application id
+        :param str job_id: The job id
+        :returns: API response object with JSON data
+        :rtype: :py:class:`yarn_api_client.base.Response`
+        """
+        return self._call(
+            application_id,
+            lambda: self.application_master.job_attempts(application_id, job_id),
+            lambda: self.history_server.job_attempts(job_id))
+
+    def job_counters(self, application_id, job_id):
+        """
+        :param str application_id: The application id
+        :param str job_id: The job id
+        :returns: API response object with JSON data
+        :rtype: :py:class:`yarn_api_client.base.Response`
+        """
+        return self._call(
+            application_id,
+            lambda: self.application_master.job_counters(application_id, job_id),
+            lambda: self.history_server.job_counters(job_id))
+
+    def job_conf(self, application_id, job_id):
+        """
+        :param str application_id: The application id
+        :param str job_id: The job id
+        :returns: API response object with JSON data
+        :rtype: :py:class:`yarn_api_client.base.Response`
+        """
+        return self._call(
+            application_id,
+            lambda: self.application_master.job_conf(application_id, job_id),
+            lambda: self.history_server.job_conf(job_id))
+
+    def job_tasks(self, application_id, job_id):
+        """
+        :param str application_id: The application id
+        :param str job_id: The job id
+        :returns: API response object with JSON data
+        :rtype: :py:class:`yarn_api_client.base.Response`
+        """
+        return self._call(
+            application_id,
+            lambda: self.application_master.job_tasks(application_id, job_id),
+            lambda: self.history_server.job_tasks(job_id))
+
+    def job_task(self, application_id, job_id, task_id):
+        """
+        :param str application_id: The application id
+        :param str job_id: The job id
+        :param str task_id: The task id
+        :returns: API response object with JSON data
+        :rtype: :py:class:`yarn_api_client.base.Response`
+        """
+        return self._call(
+            application_id,
+            lambda: self.application_master.job_task(application_id, job_id, task_id),
+            lambda: self.history_server.job_task(job_id, task_id))
+
+    def task_counters(self, application_id, job_id, task_id):
+        """
+        :param str application_id: The application id
+        :param str job_id: The job id
+        :param str task_id: The task id
+        :returns: API response object with JSON data
+        :rtype: :py:class:`yarn_api_client.base.Response`
+        """
+        return self._call(
+            application_id,
+            lambda: self.application_master.task_counters(application_id, job_id, task_id),
+            lambda: self.history_server.task_counters(job_id, task_id))
+
+    def task_attempts(self, application_id, job_id, task_id):
+        """
+        :param str application_id: The application id
+        :param str job_id: The job id
+        :param str task_id: The task id
+        :returns: API response object with JSON data
+        :rtype: :py:class:`yarn_api_client.base.Response`
+        """
+        return self._call(
+            application_id,
+            lambda: self.application_master.task_attempts(application_id, job_id, task_id),
+            lambda: self.history_server.task_attempts(job_id, task_id))
+
+    def task_attempt(self, application_id, job_id, task_id, attempt_id):
+        """
+        :param str application_id: The application id
+        :param str job_id: The job id
+        :param str task_id: The task id
+        :param str attempt_id: The attempt id
+        :returns: API response object with JSON data
+        :rtype: :py:class:`yarn_api_client.base.Response`
+        """
+        return self._call(
+            application_id,
+            lambda: self.application_master.task_attempt(application_id, job_id, task_id, attempt_id),
+            lambda: self.history_server.task_attempt(job_id, task_id, attempt_id))
+
+    def task_attempt_counters(self, application_id, job_id, task_id, attempt_id):
+        """
+        :param str application_id: The application id
+        :param str job_id: The job id
+        :param str task_id: The task id
+        :param str attempt_id: The attempt id
+        :returns: API response object with JSON data
+        :rtype: :py:class:`yarn_api_client.base.Response`
+        """
+        return self._call(
+            application_id,
+            lambda: self.application_master.task_attempt_counters(application_id, job_id, task_id, attempt_id),
+            lambda: self.history_server.task_attempt_counters(job_id, task_id, attempt_id))
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""
+Time series of the cluster metrics of a ResourceManager.
+
+:py:class:`MetricsSampler` polls
+:py:meth:`yarn_api_client.resource_manager.ResourceManager.cluster_metrics`
+and stores the numeric fields in preallocated NumPy ring buffers at several
+resolutions, so that memory does not grow with the sampling duration and
+rates and deltas are computed locally.  This module requires ``numpy``
+which can be installed with ``pip install yarn-api-client[analysis]``.
+"""
+from __future__ import unicode_literals
+
+import threading
+import time
+
+import numpy as np
+
+from .base import get_logger
+from .constants import YarnApplicationState
+from .errors import APIError
+from .poller import Poller
+
+log = get_logger(__name__)
+
+#: Numeric fields of `clusterMetrics` sampled by default
+CLUSTER_METRICS_FIELDS = (
+    'appsSubmitted', 'appsCompleted', 'appsPending', 'appsRunning', 'appsFailed', 'appsKilled',
+    'reservedMB', 'availableMB', 'allocatedMB', 'totalMB',
+    'reservedVirtualCores', 'availableVirtualCores', 'allocatedVirtualCores', 'totalVirtualCores',
+    'containersAllocated', 'containersReserved', 'containersPending',
+    'totalNodes', 'activeNodes', 'lostNodes', 'unhealthyNodes', 'decommissioningNodes', 'decommissionedNodes',
+    'rebootedNodes', 'shutdownNodes',
+)
+
+#: Fields holding the number of applications per state, sampled from the
+#: application statistics
+APPLICATION_STATISTICS_FIELDS = tuple('apps.{state}'.format(state=state) for state, _ in YarnApplicationState)
+
+#: `(seconds per sample, number of samples)` of each resolution: one hour
+#: at one second, one day at one minute and thirty days at one hour
+RESOLUTIONS = ((1, 3600), (60, 1440), (3600, 720))
+
+
+class RingBuffer(object):
+    """
+    Fixed size time series of several fields, the oldest samples are
+    overwritten once it is full.
+
+    :param int capacity: number of samples kept
+    :param int width: number of fields of a sample
+    """
+    def __init__(self, capacity, width):
+        self.capacity = capacity
+        self.timestamps = np.zeros(capacity)
+        self.values = np.full((capacity, width), np.nan)
+        self.count = 0
+        self._next = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, timestamp, values):
+        self.timestamps[self._next] = timestamp
+        self.values[self._next] = values
+        self._next = (self._next + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def series(self):
+        """
+        Samples in chronological order.
+
+        :returns: timestamps and values, of shape `(n,)` and `(n, width)`
+        :rtype: tuple
+        """
+        if self.count < self.capacity:
+            return self.timestamps[:self.count], self.values[:self.count]
+        order = np.r_[self._next:self.capacity, 0:self._next]
+        return self.timestamps[order], self.values[order]
+
+
+class _Level(object):
+    # Ring buffer of one resolution, with the bucket being filled
+
+    def __init__(self, resolution, capacity, width):
+        self.resolution = resolution
+        self.buffer = RingBuffer(capacity, width)
+        self.bucket = None
+        self.sums = np.zeros(width)
+        self.counts = np.zeros(width)
+
+    @property
+    def span(self):
+        return self.resolution * self.buffer.capacity
+
+    def add(self, timestamp, values):
+        bucket = timestamp - timestamp % self.resolution
+        if self.bucket is not None and bucket != self.bucket:
+            self.buffer.append(self.bucket, self._mean())
+            self.sums[:] = 0
+            self.counts[:] = 0
+        self.bucket = bucket
+        present = ~np.isnan(values)
+        self.sums[present] += values[present]
+        self.counts[present] += 1
+
+    def _mean(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.counts > 0, self.sums / self.counts, np.nan)
+
+    def series(self):
+        timestamps, values = self.buffer.series()
+        if self.bucket is None:
+            return timestamps, values
+        return np.append(timestamps, self.bucket), np.vstack([values, self._mean()])
+
+
+class MetricsSampler(Poller):
+    """
+    Samples the cluster metrics, and optionally the number of applications
+    per state, at a fixed interval.
+
+    Every sample is added to each resolution of `resolutions`: samples
+    falling into the same interval of a resolution are averaged, so that
+    counters such as `appsSubmitted` keep their trend and gauges such as
+    `allocatedMB` are smoothed.  The interval being filled is included in
+    queries.  Fields missing from a response are `NaN`.
+
+    Queries pick the finest resolution covering the requested window.
+
+    :param ResourceManager resource_manager: ResourceManager client
+    :param float interval: delay between two polls in seconds
+    :param fields: `clusterMetrics` fields sampled
+    :param bool application_statistics: also sample the number of
+        applications per state, see :py:data:`APPLICATION_STATISTICS_FIELDS`
+    :param resolutions: `(seconds per sample, number of samples)` tuples
+    """
+    def __init__(self, resource_manager, interval=5, fields=CLUSTER_METRICS_FIELDS, application_statistics=False,
+                 resolutions=RESOLUTIONS):
+        super(MetricsSampler, self).__init__(interval)
+        self.resource_manager = resource_manager
+        self.metrics_fields = tuple(fields)
+        self.application_statistics = application_statistics
+        self.fields = self.metrics_fields + (APPLICATION_STATISTICS_FIELDS if application_statistics else ())
+        self._columns = dict((field, column) for column, field in enumerate(self.fields))
+        self._levels = [_Level(resolution, capacity, len(self.fields))
+                        for resolution, capacity in sorted(resolutions)]
+        self._lock = threading.Lock()
+
+    def poll(self):
+        """
+        Fetches the metrics and records them.
+        """
+        timestamp = time.time()
+        try:
+            metrics = self.resource_manager.cluster_metrics().data.get('clusterMetrics') or {}
+            values = dict((field, metrics.get(field)) for field in self.metrics_fields)
+            if self.application_statistics:
+                statistics = self.resource_manager.cluster_application_statistics().data
+                for item in ((statistics or {}).get('appStatInfo') or {}).get('statItem') or []:
+                    field = 'apps.{state}'.format(state=item.get('state'))
+                    values[field] = (values.get(field) or 0) + (item.get('count') or 0)
+        except (APIError, IOError) as e:
+            log.warning("Failed to sample cluster metrics: {err}".format(err=e))
+            return
+        self.record(values, timestamp)
+
+    def record(self, values, timestamp=None):
+        """
+        Records a sample.
+
+        :param dict values: sampled values keyed by field, other fields are
+            ignored
+        :param float timestamp: time of the sample, now if `None`
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        sample = np.full(len(self.fields), np.nan)
+        for field, value in values.items():
+            column = self._columns.get(field)
+            if column is not None and value is not None:
+                sample[column] = value
+        with self._lock:
+            for level in self._levels:
+                level.add(timestamp, sample)
+
+    def _level(self, window, resolution):
+        if resolution is not None:
+            for level in self._levels:
+                if level.resolution == resolution:
+                    return level
+            raise ValueError('Unknown resolution {resolution}'.format(resolution=resolution))
+        for level in self._levels:
+            if window is None or level.span >= window:
+                return level
+        return self._levels[-1]
+
+    def series(self, field, window=None, resolution=None):
+        """
+        Time series of a field.
+
+        :param str field: sampled field
+        :param float window: duration in seconds up to the latest sample,
+            everything kept at the resolution if `None`
+        :param int resolution: seconds per sample, the finest covering the
+            window if `None`
+        :returns: timestamps and values
+        :rtype: tuple
+        """
+        column = self._columns[field]
+        with self._lock:
+            timestamps, values = self._level(window, resolution).series()
+            values = values[:, column]
+        if window is not None and len(timestamps):
+            start = np.searchsorted(timestamps, timestamps[-1] - window)
+            timestamps, values = timestamps[start:], values[start:]
+        return timestamps, values
+
+    def latest(self, field):
+        """
+        Latest value of a field, `None` if nothing was sampled.
+
+        :param str field: sampled field
+        :rtype: float
+        """
+        _, values = self.series(field, resolution=self._levels[0].resolution)
+        return float(values[-1]) if len(values) else None
+
+    def delta(self, field, window, resolution=None):
+        """
+        Change of a field over the window, e.g. applications submitted in
+        the last hour from `appsSubmitted`.
+
+        :param str field: sampled field
+        :param float window: duration in seconds
+        :param int resolution: seconds per sample, the finest covering the
+            window if `None`
+        :returns: `None` with less than two samples in the window
+        :rtype: float
+        """
+        timestamps, values = self._valid(field, window, resolution)
+        if len(values) < 2:
+            return None
+        return float(values[-1] - values[0])
+
+    def rate(self, field, window, resolution=None):
+        """
+        Change of a field per second over the window.
+
+        :param str field: sampled field
+        :param float window: duration in seconds
+        :param int resolution: seconds per sample, the finest covering the
+            window if `None`
+        :returns: `None` with less than two samples in the window
+        :rtype: float
+        """
+        timestamps, values = self._valid(field, window, resolution)
+        if len(values) < 2 or timestamps[-1] == timestamps[0]:
+            return None
+        return float((values[-1] - values[0]) / (timestamps[-1] - timestamps[0]))
+
+    def _valid(self, field, window, resolution):
+        timestamps, values = self.series(field, window, resolution)
+        present = ~np.isnan(values)
+        return timestamps[present], values[present]
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+Columnar inventory of the nodes of a cluster.
+
+The nodes returned by
+:py:meth:`yarn_api_client.resource_manager.ResourceManager.cluster_nodes`
+are stored column-wise in a single NumPy buffer, with node states, racks and
+labels interned as integer codes, so that filters, sorted views and
+per rack or label aggregates are vectorised operations.  The buffer is
+reused when the inventory is refreshed.  This module requires ``numpy``
+which can be installed with ``pip install yarn-api-client[analysis]``.
+"""
+from __future__ import unicode_literals
+
+import numpy as np
+
+from .base import get_logger
+
+log = get_logger(__name__)
+
+#: Columns holding codes of interned strings
+STRING_COLUMNS = ('state', 'rack', 'label')
+
+#: Numeric columns, with the node field they are read from
+NUMERIC_COLUMNS = (
+    ('used_memory', 'usedMemoryMB'),
+    ('avail_memory', 'availMemoryMB'),
+    ('used_vcores', 'usedVirtualCores'),
+    ('avail_vcores', 'availableVirtualCores'),
+    ('num_containers', 'numContainers'),
+    ('last_health_update', 'lastHealthUpdate'),
+)
+
+_COLUMNS = STRING_COLUMNS + tuple(name for name, _ in NUMERIC_COLUMNS)
+
+
+def _label(node):
+    # A node belongs to a single partition
+    labels = node.get('nodeLabels')
+    return labels[0] if labels else ''
+
+
+class StringTable(object):
+    """
+    Interned strings, each distinct value is stored once and referred to by
+    its integer code.  Codes are stable for the lifetime of the table.
+    """
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+
+    def __len__(self):
+        return len(self.values)
+
+    def code(self, value):
+        """
+        Code of a value, added to the table if needed.
+
+        :param str value: value to intern
+        :rtype: int
+        """
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def codes(self, values):
+        """
+        Codes of the given values, values never interned are skipped.
+
+        :param values: values to look up
+        :rtype: numpy.ndarray
+        """
+        return np.array([self._codes[value] for value in values if value in self._codes], dtype=np.int64)
+
+
+class NodeInventory(object):
+    """
+    Nodes of a cluster stored column-wise.
+
+    Column properties (``state``, ``rack``, ``label`` codes and the
+    :py:data:`NUMERIC_COLUMNS`) are views of length ``len(inventory)`` into
+    a buffer which is only reallocated when a refresh returns more nodes
+    than it can hold, a view is therefore only valid until the next refresh.
+
+    :param int capacity: number of nodes the buffer initially holds
+    """
+    def __init__(self, capacity=0):
+        self.capacity = capacity
+        self.node_ids = []
+        self.hosts = []
+        self.strings = dict((name, StringTable()) for name in STRING_COLUMNS)
+        self._buffer = np.zeros((capacity, len(_COLUMNS)), dtype=np.int64)
+        self._index = None
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __getattr__(self, name):
+        if name in _COLUMNS:
+            return self._buffer[:self._size, _COLUMNS.index(name)]
+        raise AttributeError("'{cls}' object has no attribute '{name}'".format(
+            cls=self.__class__.__name__, name=name))
+
+    @classmethod
+    def from_response(cls, data):
+        """
+        Builds the inventory from the JSON data of a `cluster_nodes` call.
+
+        :param dict data: `Response.data` of the nodes API
+        :rtype: :py:class:`NodeInventory`
+        """
+        inventory = cls()
+        inventory.load(data)
+        return inventory
+
+    @classmethod
+    def from_resource_manager(cls, resource_manager, states=None):
+        """
+        Fetches the nodes and builds their inventory.
+
+        :param ResourceManager resource_manager: ResourceManager client
+        :param List[str] states: states of the nodes fetched, all if `None`
+        :rtype: :py:class:`NodeInventory`
+        """
+        inventory = cls()
+        inventory.refresh(resource_manager, states)
+        return inventory
+
+    def refresh(self, resource_manager, states=None):
+        """
+        Replaces the nodes of the inventory with the current ones.
+
+        :param ResourceManager resource_manager: ResourceManager client
+        :param List[str] states: states of the nodes fetched, all if `None`
+        """
+        self.load(resource_manager.cluster_nodes(states=states).data)
+
+    def load(self, data):
+        """
+        Replaces the nodes of the inventory with the ones of a
+        `cluster_nodes` response, reusing the buffer when it is large
+        enough.
+
+        :param dict data: `Response.data` of the nodes API
+        """
+        nodes = ((data or {}).get('nodes') or {}).get('node') or []
+        count = len(nodes)
+        if count > self.capacity:
+            self.capacity = max(count, self.capacity * 2)
+            log.debug("Growing node inventory to {capacity} nodes".format(capacity=self.capacity))
+            self._buffer = np.zeros((self.capacity, len(_COLUMNS)), dtype=np.int64)
+
+        state, rack, label = (self.strings[name].code for name in STRING_COLUMNS)
+        buffer = self._buffer
+        for row, node in enumerate(nodes):
+            codes = (state(node.get('state') or ''), rack(node.get('rack') or ''), label(_label(node)))
+            buffer[row] = codes + tuple(node.get(key) or 0 for _, key in NUMERIC_COLUMNS)
+
+        self.node_ids = [node.get('id') for node in nodes]
+        self.hosts = [node.get('nodeHostName') for node in nodes]
+        self._size = count
+        self._index = None
+
+    def index_of(self, node_id):
+        """
+        Row of the given node.
+
+        :param str node_id: The node id
+        :rtype: int
+        """
+        if self._index is None:
+            self._index = dict((node_id, row) for row, node_id in enumerate(self.node_ids))
+        return self._index[node_id]
+
+    def mask(self, states=None, racks=None, labels=None, min_memory=None, min_vcores=None):
+        """
+        Rows of the nodes matching all the given criteria.
+
+        :param List[str] states: node states
+        :param List[str] racks: node racks
+        :param List[str] labels: node labels, `''` for nodes without label
+        :param int min_memory: minimum available memory in MB
+        :param int min_vcores: minimum available vcores
+        :returns: boolean array
+        :rtype: numpy.ndarray
+        """
+        result = np.ones(self._size, dtype=bool)
+        for name, values in (('state', states), ('rack', racks), ('label', labels)):
+            if values is not None:
+                result &= np.isin(getattr(self, name), self.strings[name].codes(values))
+        if min_memory is not None:
+            result &= self.avail_memory >= min_memory
+        if min_vcores is not None:
+            result &= self.avail_vcores >= min_vcores
+        return result
+
+    def filter(self, **criteria):
+        """
+        Ids of the nodes matching the criteria of :py:meth:`mask`.
+
+        :rtype: List[str]
+        """
+        return [self.node_ids[row] for row in np.flatnonzero(self.mask(**criteria))]
+
+    def top(self, count, by='avail_memory', mask=None):
+        """
+        Nodes with the largest values of a numeric column, in descending
+        order.
+
+        :param int count: maximum number of nodes returned
+        :param str by: name of a numeric column
+        :param numpy.ndarray mask: rows considered, all if `None`
+        :rtype: List[str]
+        """
+        values = getattr(self, by)
+        rows = np.arange(self._size) if mask is None else np.flatnonzero(mask)
+        if count < len(rows):
+            rows = rows[np.argpartition(-values[rows], count)[:count]]
+        rows = rows[np.argsort(-values[rows], kind='stable')]
+        return [self.node_ids[row] for row in rows]
+
+    def group_by(self, key='rack', column='avail_memory', mask=None):
+        """
+        Sum of a numeric column per rack, label or state.
+
+        :param str key: one of `rack`, `label` or `state`
+        :param str column: name of a numeric column
+        :param numpy.ndarray mask: rows considered, all if `None`
+        :returns: sums keyed by rack, label or state, groups without node are
+            omitted
+        :rtype: dict
+        """
+        codes = getattr(self, key)
+        values = getattr(self, column)
+        if mask is not None:
+            codes, values = codes[mask], values[mask]
+        table = self.strings[key]
+        sums = np.bincount(codes, weights=values, minlength=len(table))
+        counts = np.bincount(codes, minlength=len(table))
+        return dict((table.values[code], int(sums[code])) for code in np.flatnonzero(counts))
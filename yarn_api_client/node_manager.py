@@ -28,18 +28,25 @@ class NodeManager(BaseYarnAPI):
     If `service_endpoint` argument is `None` client will try to extract it from
     Hadoop configuration files.
 
-    :param str service_endpoint: NodeManager HTTP(S) address
+    :param str service_endpoint: NodeManager HTTP(S) address, or a list of
+        equivalent addresses (or an
+        :py:class:`yarn_api_client.base.EndpointPool`) to spread requests over
     :param int timeout: API connection timeout in seconds
     :param AuthBase auth: Auth to use for requests
     :param boolean verify: Either a boolean, in which case it controls whether
         we verify the server's TLS certificate, or a string, in which case it must
         be a path to a CA bundle to use. Defaults to ``True``
+    :param boolean share_session: use the process-wide session registered for
+        the same endpoint and transport settings instead of a private one,
+        see :py:func:`yarn_api_client.base.get_shared_session`. Defaults to
+        ``False``
     """
-    def __init__(self, service_endpoint=None, timeout=30, auth=None, verify=True, proxies=None):
+    def __init__(self, service_endpoint=None, timeout=30, auth=None, verify=True, proxies=None,
+                 share_session=False):
         if not service_endpoint:
             service_endpoint = get_nodemanager_endpoint()
 
-        super(NodeManager, self).__init__(service_endpoint, timeout, auth, verify, proxies)
+        super(NodeManager, self).__init__(service_endpoint, timeout, auth, verify, proxies, share_session)
 
     def node_information(self):
         """
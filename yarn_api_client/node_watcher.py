@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from .base import get_logger
+from .constants import DECOMMISSIONED, DECOMMISSIONING, LOST, REBOOTED, SHUTDOWN, UNHEALTHY
+from .errors import APIError
+from .poller import Poller
+
+log = get_logger(__name__)
+
+#: Node states reported for nodes already in them on the first poll
+PROBLEM_STATES = (UNHEALTHY, DECOMMISSIONING, DECOMMISSIONED, LOST, REBOOTED, SHUTDOWN)
+
+#: Kind of the :py:class:`NodeEvent` of a node which is not reported anymore
+NODE_REMOVED = 'REMOVED'
+#: Kind of the :py:class:`NodeEvent` of a node whose health report changed
+#: while it stayed in the same state
+NODE_HEALTH_CHANGED = 'HEALTH_CHANGED'
+
+
+def _reason(node):
+    if node.get('state') == DECOMMISSIONING and node.get('decommissioningTimeout') is not None:
+        return 'decommissioning timeout {timeout}s'.format(timeout=node['decommissioningTimeout'])
+    return node.get('healthReport') or None
+
+
+class NodeEvent(object):
+    """
+    Transition of a node.
+
+    :param str kind: new state of the node, `HEALTH_CHANGED` when only its
+        health report changed, or `REMOVED` when the node is not reported
+        anymore, e.g. because it left the polled states
+    :param str node_id: The node id
+    :param str old_state: previous state, `None` for a node not seen before
+    :param str new_state: current state, `None` for `REMOVED`
+    :param str reason: health report or decommissioning timeout of the node
+    :param dict node: node resource as returned by the nodes API, the last
+        known one for `REMOVED`
+    """
+    __slots__ = ('kind', 'node_id', 'old_state', 'new_state', 'reason', 'node')
+
+    def __init__(self, kind, node_id, old_state, new_state, reason=None, node=None):
+        self.kind = kind
+        self.node_id = node_id
+        self.old_state = old_state
+        self.new_state = new_state
+        self.reason = reason
+        self.node = node
+
+    def __repr__(self):
+        return 'NodeEvent({kind!r}, {node_id!r}, {old!r} -> {new!r}, {reason!r})'.format(
+            kind=self.kind, node_id=self.node_id, old=self.old_state, new=self.new_state, reason=self.reason)
+
+
+class NodeWatcher(Poller):
+    """
+    Polls the nodes of the cluster and reports their state transitions,
+    e.g. a node which was lost, became unhealthy or is being
+    decommissioned, with the reason given by the ResourceManager.
+
+    The last known nodes are indexed by node id.  A node whose state and
+    `lastHealthUpdate` did not change since the previous poll is skipped
+    without further comparison, otherwise a change of its health report is
+    reported as `HEALTH_CHANGED`.  On the first poll, nodes in one of the
+    :py:data:`PROBLEM_STATES` are reported with no previous state.
+
+    With `states`, only nodes in those states are fetched, which keeps each
+    poll cheap on large clusters, e.g. ``[LOST, UNHEALTHY]``; a node leaving
+    these states is then reported as `REMOVED`.
+
+    :param ResourceManager resource_manager: ResourceManager client
+    :param List[str] states: node states polled, all if `None`
+    :param float interval: delay between two polls in seconds
+    :param callable on_event: called with each event
+    """
+    def __init__(self, resource_manager, states=None, interval=30, on_event=None):
+        super(NodeWatcher, self).__init__(interval)
+        self.resource_manager = resource_manager
+        self.states = list(states) if states else None
+        self.on_event = on_event
+        self.nodes = None
+
+    def poll(self):
+        """
+        Fetches the nodes and reports the transitions since the previous
+        poll.
+
+        :returns: events
+        :rtype: List[:py:class:`NodeEvent`]
+        """
+        try:
+            data = self.resource_manager.cluster_nodes(states=self.states).data
+        except (APIError, IOError) as e:
+            log.warning("Failed to poll nodes: {err}".format(err=e))
+            return []
+
+        previous = self.nodes
+        nodes = {}
+        events = []
+        for node in ((data or {}).get('nodes') or {}).get('node') or []:
+            node_id = node.get('id')
+            nodes[node_id] = node
+            state = node.get('state')
+            last = previous.get(node_id) if previous is not None else None
+            if last is not None:
+                if last.get('state') == state and last.get('lastHealthUpdate') == node.get('lastHealthUpdate'):
+                    continue
+                if last.get('state') != state:
+                    events.append(NodeEvent(state, node_id, last.get('state'), state, _reason(node), node))
+                elif last.get('healthReport') != node.get('healthReport'):
+                    events.append(NodeEvent(NODE_HEALTH_CHANGED, node_id, state, state, _reason(node), node))
+            elif previous is not None or state in PROBLEM_STATES:
+                events.append(NodeEvent(state, node_id, None, state, _reason(node), node))
+
+        for node_id, node in (previous or {}).items():
+            if node_id not in nodes:
+                events.append(NodeEvent(NODE_REMOVED, node_id, node.get('state'), None, None, node))
+        self.nodes = nodes
+
+        if self.on_event is not None:
+            for event in events:
+                self.on_event(event)
+        return events
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import csv
+import json
+import re
+
+from requests.utils import guess_json_utf
+
+from .base import Response
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_decoder = json.JSONDecoder()
+
+
+def _skip_whitespace(text, position):
+    return _WHITESPACE.match(text, position).end()
+
+
+def iter_records(data):
+    """
+    Records held by the JSON data of an API response.
+
+    YARN wraps collections in single key objects, e.g.
+    ``{"apps": {"app": [...]}}``: the records are the elements of the first
+    list found by descending through the first key of nested objects.  When
+    an object is reached whose first value is neither an object nor a list,
+    e.g. ``{"app": {"id": ...}}``, that object is the single record.
+
+    :param dict data: `Response.data` of an API call
+    :returns: iterator over the records
+    """
+    while isinstance(data, dict) and data:
+        value = next(iter(data.values()))
+        if isinstance(value, list):
+            data = value
+            break
+        if not isinstance(value, dict):
+            if value is not None or len(data) > 1:
+                yield data
+            return
+        data = value
+
+    if isinstance(data, list):
+        for record in data:
+            yield record
+
+
+def iter_json_records(text):
+    """
+    Same as :py:func:`iter_records`, but decodes the records one after the
+    other from the JSON text of the response, so that the first records are
+    available before the whole document is decoded and a record can be
+    released as soon as it was consumed.
+
+    :param str text: JSON text of an API response
+    :returns: iterator over the records
+    """
+    position = _skip_whitespace(text, 0)
+    while position < len(text) and text[position] == '{':
+        start = position
+        position = _skip_whitespace(text, position + 1)
+        if text[position] == '}':
+            return
+        _, position = _decoder.raw_decode(text, position)
+        position = _skip_whitespace(text, _skip_whitespace(text, position) + 1)
+        if text[position] == '[':
+            break
+        if text[position] != '{':
+            record, _ = _decoder.raw_decode(text, start)
+            value = next(iter(record.values()))
+            if value is not None or len(record) > 1:
+                yield record
+            return
+
+    if position >= len(text) or text[position] != '[':
+        return
+    position = _skip_whitespace(text, position + 1)
+    if text[position] == ']':
+        return
+    while True:
+        record, position = _decoder.raw_decode(text, position)
+        yield record
+        position = _skip_whitespace(text, position)
+        if text[position] != ',':
+            return
+        position = _skip_whitespace(text, position + 1)
+
+
+class StreamingResponse(Response):
+    """
+    Response which keeps the JSON text and decodes it only on demand, either
+    entirely through :py:attr:`data` or record by record through
+    :py:meth:`records`.
+
+    :param requests.Response response: Response for call via requests lib
+    """
+    def __init__(self, response):
+        content = response.content
+        self.text = content.decode(guess_json_utf(content) or 'utf-8') if content else ''
+        self._data = None
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = json.loads(self.text) if self.text else {}
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+
+    def records(self):
+        """
+        Iterator over the records of the response, see
+        :py:func:`iter_json_records`.
+        """
+        if self._data is not None:
+            return iter_records(self._data)
+        return iter_json_records(self.text)
+
+
+def response_records(response):
+    """
+    Iterator over the records of a response, decoded one at a time for a
+    :py:class:`StreamingResponse`.
+
+    :param Response response: API response
+    """
+    if isinstance(response, StreamingResponse):
+        return response.records()
+    return iter_records(response.data)
+
+
+def parse_fields(fields):
+    """
+    Field selection from a comma separated list of field names, nested
+    fields are addressed with dots, e.g. ``resourceInfo.memory``.
+
+    :param str fields: comma separated field names
+    :returns: `(name, path)` tuples, `None` if no field is selected
+    :rtype: List[tuple]
+    """
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(',') if name.strip()]
+    return [(name, tuple(name.split('.'))) for name in names] or None
+
+
+def project(record, fields):
+    """
+    Record reduced to the selected fields, missing fields are `None`.
+
+    :param dict record: record to project
+    :param List[tuple] fields: fields as returned by :py:func:`parse_fields`
+    :rtype: dict
+    """
+    result = {}
+    for name, path in fields:
+        value = record
+        for key in path:
+            value = value.get(key) if isinstance(value, dict) else None
+        result[name] = value
+    return result
+
+
+class RecordWriter(object):
+    """
+    Base class of the streaming record writers.
+
+    :param stream: text stream written to
+    :param List[tuple] fields: fields as returned by :py:func:`parse_fields`,
+        all fields of the records if `None`
+    """
+    def __init__(self, stream, fields=None):
+        self.stream = stream
+        self.fields = fields
+        self.count = 0
+
+    def write(self, record):
+        if self.fields is not None:
+            record = project(record, self.fields)
+        self._write(record)
+        self.count += 1
+
+    def write_all(self, records):
+        """
+        Writes all the records.
+
+        :returns: number of records written
+        :rtype: int
+        """
+        for record in records:
+            self.write(record)
+        self.close()
+        return self.count
+
+    def close(self):
+        self.stream.flush()
+
+    def _write(self, record):
+        raise NotImplementedError
+
+
+class JsonLinesWriter(RecordWriter):
+    """
+    Writes one JSON document per record and line.
+    """
+    def _write(self, record):
+        self.stream.write(json.dumps(record, separators=(',', ':')))
+        self.stream.write('\n')
+
+
+class JsonWriter(RecordWriter):
+    """
+    Writes the records as a JSON array, one record per line.
+    """
+    def _write(self, record):
+        self.stream.write(',\n' if self.count else '[\n')
+        self.stream.write(json.dumps(record, separators=(',', ':')))
+
+    def close(self):
+        self.stream.write('\n]\n' if self.count else '[]\n')
+        super(JsonWriter, self).close()
+
+
+class DelimitedWriter(RecordWriter):
+    """
+    Writes the records as delimiter separated values with a header line.
+
+    The columns are the selected fields or, without selection, the fields
+    of the first record.  Nested values are written as JSON.
+
+    :param str delimiter: column delimiter
+    """
+    def __init__(self, stream, fields=None, delimiter=','):
+        super(DelimitedWriter, self).__init__(stream, fields)
+        self.writer = csv.writer(stream, delimiter=delimiter, lineterminator='\n')
+        self.columns = [name for name, _ in fields] if fields else None
+
+    def _write(self, record):
+        if self.columns is None:
+            self.columns = list(record)
+        if not self.count:
+            self.writer.writerow(self.columns)
+        self.writer.writerow([self._format(record.get(column)) for column in self.columns])
+
+    def close(self):
+        if not self.count and self.columns:
+            self.writer.writerow(self.columns)
+        super(DelimitedWriter, self).close()
+
+    @staticmethod
+    def _format(value):
+        if value is None:
+            return ''
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, separators=(',', ':'))
+        return value
+
+
+WRITERS = {
+    'json': JsonWriter,
+    'jsonl': JsonLinesWriter,
+    'csv': lambda stream, fields=None: DelimitedWriter(stream, fields, ','),
+    'tsv': lambda stream, fields=None: DelimitedWriter(stream, fields, '\t'),
+}
+
+
+def get_writer(output_format, stream, fields=None):
+    """
+    Writer for the given output format.
+
+    :param str output_format: one of `json`, `jsonl`, `csv` or `tsv`
+    :param stream: text stream written to
+    :param List[tuple] fields: fields as returned by :py:func:`parse_fields`
+    :rtype: :py:class:`RecordWriter`
+    """
+    return WRITERS[output_format](stream, fields)
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+Placement feasibility of containers, estimated from snapshots of the nodes
+and of the queue capacities of a cluster.
+
+Containers are packed onto the free resources of the running nodes of a
+partition, largest containers first, and bounded by the headroom of the
+queue they are submitted to.  Every step is a vectorised operation over
+all nodes, so that the estimate can run before every submission.  This
+module requires ``numpy`` which can be installed with
+``pip install yarn-api-client[analysis]``.
+"""
+from __future__ import unicode_literals
+
+import numpy as np
+
+from .constants import RUNNING
+from .node_inventory import NodeInventory
+from .queue_capacity import QueueCapacityMatrix
+from .scheduler import DEFAULT_PARTITION
+
+
+class PlacementResult(object):
+    """
+    Outcome of a placement simulation.
+
+    :param list requests: `(count, memory, vcores)` tuples simulated
+    :param list placed: number of containers placed for each request
+    :param tuple headroom: `(memory, vcores)` the queue could still
+        allocate before the simulation, `None` without queue limit
+    :param str reason: why not all containers could be placed
+    """
+    __slots__ = ('requests', 'placed', 'headroom', 'reason')
+
+    def __init__(self, requests, placed, headroom=None, reason=None):
+        self.requests = requests
+        self.placed = placed
+        self.headroom = headroom
+        self.reason = reason
+
+    def __repr__(self):
+        return 'PlacementResult(fits={fits!r}, placed={placed!r}, reason={reason!r})'.format(
+            fits=self.fits, placed=self.placed, reason=self.reason)
+
+    @property
+    def fits(self):
+        return all(placed == count for placed, (count, _, _) in zip(self.placed, self.requests))
+
+
+class PlacementSimulator(object):
+    """
+    Answers whether containers can be placed right now.
+
+    Containers are placed on the running nodes of the requested partition,
+    largest memory first, each request filling the nodes with the most room
+    for it first.  A queue can allocate up to its absolute maximum capacity
+    of the partition, less what it uses and, with `include_pending`, less
+    what its pending requests ask for.  Percentages are converted to
+    resources with the total memory and vcores of the running nodes of the
+    partition, a queue without absolute maximum capacity is limited by the
+    partition only.
+
+    This is an estimate: the scheduler may place containers differently,
+    and user limits, reservations and preemption are not taken into
+    account.
+
+    :param NodeInventory nodes: nodes of the cluster
+    :param QueueCapacityMatrix queues: queue capacities, queues are not
+        limited if `None`
+    :param int max_memory: maximum allocation of a container in MB, e.g.
+        :py:meth:`yarn_api_client.resource_manager.ResourceManager.cluster_node_container_memory`
+    :param int max_vcores: maximum allocation of a container in vcores
+    :param bool include_pending: whether pending requests of the queue
+        reduce its headroom
+    """
+    def __init__(self, nodes, queues=None, max_memory=None, max_vcores=None, include_pending=False):
+        self.nodes = nodes
+        self.queues = queues
+        self.max_memory = max_memory
+        self.max_vcores = max_vcores
+        self.include_pending = include_pending
+
+    @classmethod
+    def from_resource_manager(cls, resource_manager, **kwargs):
+        """
+        Fetches the running nodes and the scheduler and builds a simulator
+        from them.
+
+        :param ResourceManager resource_manager: ResourceManager client
+        :rtype: :py:class:`PlacementSimulator`
+        """
+        return cls(NodeInventory.from_resource_manager(resource_manager, states=[RUNNING]),
+                   QueueCapacityMatrix.from_resource_manager(resource_manager), **kwargs)
+
+    def fits(self, count, memory, vcores=1, queue=None, label=DEFAULT_PARTITION):
+        """
+        Whether `count` containers of `memory` MB and `vcores` vcores can be
+        placed.
+
+        :param int count: number of containers
+        :param int memory: memory of a container in MB
+        :param int vcores: vcores of a container
+        :param str queue: queue name or full path, not limited if `None`
+        :param str label: partition (node label), `''` for the default one
+        :rtype: bool
+        """
+        return self.simulate([(count, memory, vcores)], queue, label).fits
+
+    def simulate(self, requests, queue=None, label=DEFAULT_PARTITION):
+        """
+        Places containers of several sizes at once.
+
+        :param list requests: `(count, memory, vcores)` tuples
+        :param str queue: queue name or full path, not limited if `None`
+        :param str label: partition (node label), `''` for the default one
+        :rtype: :py:class:`PlacementResult`
+        """
+        requests = [tuple(request) for request in requests]
+        placed = [0] * len(requests)
+        for count, memory, vcores in requests:
+            if memory <= 0 or vcores <= 0:
+                raise ValueError('Containers need a positive memory and vcores')
+            if self._exceeds_maximum(memory, vcores):
+                reason = 'Container of {memory} MB and {vcores} vcores exceeds the maximum allocation'.format(
+                    memory=memory, vcores=vcores)
+                return PlacementResult(requests, placed, reason=reason)
+
+        mask = self.nodes.mask(states=[RUNNING], labels=[label])
+        free_memory = self.nodes.avail_memory[mask].copy()
+        free_vcores = self.nodes.avail_vcores[mask].copy()
+
+        headroom = None
+        if queue is not None and self.queues is not None:
+            headroom = self._headroom(queue, label, mask)
+            if headroom is None:
+                reason = "Queue '{queue}' has no capacity in partition '{label}'".format(queue=queue, label=label)
+                return PlacementResult(requests, placed, reason=reason)
+        queue_memory, queue_vcores = headroom if headroom is not None else (None, None)
+
+        reasons = []
+        for index in sorted(range(len(requests)), key=lambda i: -requests[i][1]):
+            count, memory, vcores = requests[index]
+            if queue_memory is not None:
+                allowed = int(min(queue_memory // memory, queue_vcores // vcores))
+                if allowed < count:
+                    reasons.append('queue headroom')
+                count = min(count, max(allowed, 0))
+
+            slots = np.minimum(free_memory // memory, free_vcores // vcores)
+            order = np.argsort(-slots, kind='stable')
+            before = np.cumsum(slots[order]) - slots[order]
+            taken = np.clip(count - before, 0, slots[order])
+            free_memory[order] -= taken * memory
+            free_vcores[order] -= taken * vcores
+
+            placed[index] = int(taken.sum())
+            if placed[index] < count:
+                reasons.append('node resources')
+            if queue_memory is not None:
+                queue_memory -= placed[index] * memory
+                queue_vcores -= placed[index] * vcores
+
+        reason = None
+        if reasons:
+            reason = 'Not enough {what}'.format(what=' and '.join(sorted(set(reasons))))
+        return PlacementResult(requests, placed, headroom, reason)
+
+    def _exceeds_maximum(self, memory, vcores):
+        return ((self.max_memory is not None and memory > self.max_memory) or
+                (self.max_vcores is not None and vcores > self.max_vcores))
+
+    def _headroom(self, queue, label, mask):
+        queues = self.queues
+        try:
+            row = queues.row(queue)
+        except KeyError:
+            rows = [i for i, path in enumerate(queues.queues) if path.endswith('.' + queue)]
+            if not rows:
+                return None
+            row = rows[0]
+        try:
+            column = queues.column(label)
+        except KeyError:
+            return None
+        if not queues.defined[row, column]:
+            return None
+
+        # A missing maximum does not limit the queue beyond the partition,
+        # a missing usage counts as none
+        max_capacity = np.nan_to_num(queues.absolute_max_capacity[row, column], nan=100.0)
+        used_capacity = np.nan_to_num(queues.absolute_used_capacity[row, column], nan=0.0)
+        fraction = min(max(max_capacity - used_capacity, 0), 100) / 100.0
+        total_memory = (self.nodes.avail_memory[mask] + self.nodes.used_memory[mask]).sum()
+        total_vcores = (self.nodes.avail_vcores[mask] + self.nodes.used_vcores[mask]).sum()
+        memory, vcores = total_memory * fraction, total_vcores * fraction
+        if self.include_pending:
+            memory -= queues.pending_memory[row, column]
+            vcores -= queues.pending_vcores[row, column]
+        return max(int(memory), 0), max(int(vcores), 0)
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import threading
+
+from .base import get_logger
+
+log = get_logger(__name__)
+
+
+class Poller(object):
+    """
+    Base class for helpers which periodically poll a YARN REST API.
+
+    Subclasses implement :py:meth:`poll`.  It can be called directly, or the
+    poller can run it on a daemon thread with :py:meth:`start`, or on the
+    calling thread with :py:meth:`run`, until :py:meth:`stop` is called.
+    Exceptions raised by :py:meth:`poll` on the background thread are
+    logged and do not stop the poller.
+
+    :param float interval: delay between two polls in seconds
+    """
+    def __init__(self, interval):
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def poll(self):
+        """
+        Performs a single poll.
+        """
+        raise NotImplementedError
+
+    def next_delay(self):
+        """
+        Delay in seconds before the next poll, `interval` by default.
+
+        :rtype: float
+        """
+        return self.interval
+
+    def start(self):
+        """
+        Starts polling on a background daemon thread.
+        """
+        if self.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.run, name=self.__class__.__name__)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """
+        Stops the background thread and waits for it to finish.
+
+        :param float timeout: maximum time to wait in seconds
+        """
+        self._stop_event.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def stopped(self):
+        return self._stop_event.is_set()
+
+    def run(self):
+        """
+        Polls on the calling thread until :py:meth:`stop` is called.
+        """
+        while not self._stop_event.is_set():
+            try:
+                self.poll()
+            except Exception:
+                log.exception("{name} poll failed, continuing...".format(name=self.__class__.__name__))
+            self._stop_event.wait(max(self.next_delay(), 0))
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from .base import get_logger
+from .constants import FAILED, KILLED, SUCCEEDED, ERROR, FINISHED
+from .errors import APIError
+from .poller import Poller
+
+log = get_logger(__name__)
+
+TERMINAL_JOB_STATES = {SUCCEEDED, FAILED, KILLED, ERROR}
+TERMINAL_APPLICATION_STATES = {FINISHED, FAILED, KILLED}
+
+
+class _TrackedApplication(object):
+    __slots__ = ('application_id', 'interval', 'due', 'failures', 'jobs', 'updated')
+
+    def __init__(self, application_id, interval):
+        self.application_id = application_id
+        self.interval = interval
+        self.due = 0.0
+        self.failures = 0
+        self.jobs = []
+        self.updated = None
+
+
+def _job_progress(jobs):
+    return [(job.get('mapProgress'), job.get('reduceProgress')) for job in jobs]
+
+
+class ProgressPoller(Poller):
+    """
+    Tracks the progress of many running MapReduce applications.
+
+    Due applications are polled concurrently through
+    :py:meth:`yarn_api_client.application_master.ApplicationMaster.jobs`.
+    Each application is polled at its own rate: the interval is halved when
+    the progress moved since the previous poll and doubled when it did not,
+    within `min_interval` and `max_interval`.  Applications are dropped once
+    all their jobs reached a terminal state or, if a ResourceManager is
+    given, once the AM stopped answering and the ResourceManager reports the
+    application as finished.  Without a ResourceManager, an application is
+    dropped after `max_failures` consecutive failed polls.
+
+    :param ApplicationMaster application_master: client used to poll AMs
+    :param List[str] application_ids: applications to track initially
+    :param ResourceManager resource_manager: optional client used to confirm
+        that an application finished
+    :param float min_interval: shortest per application interval in seconds
+    :param float max_interval: longest per application interval in seconds
+    :param int max_workers: number of concurrent AM requests
+    :param int max_failures: consecutive failures before an application is
+        dropped when no ResourceManager is given
+    :param callable on_finished: called with the application id and its last
+        known jobs when an application is dropped
+    """
+    def __init__(self, application_master, application_ids=None, resource_manager=None,
+                 min_interval=1, max_interval=30, max_workers=16, max_failures=3, on_finished=None):
+        super(ProgressPoller, self).__init__(min_interval)
+        self.application_master = application_master
+        self.resource_manager = resource_manager
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_workers = max_workers
+        self.max_failures = max_failures
+        self.on_finished = on_finished
+        self._lock = threading.Lock()
+        self._apps = {}
+        self._executor = None
+
+        for application_id in application_ids or ():
+            self.track(application_id)
+
+    def track(self, application_id):
+        """
+        Starts tracking an application, it is polled on the next cycle.
+
+        :param str application_id: The application id
+        """
+        with self._lock:
+            if application_id not in self._apps:
+                self._apps[application_id] = _TrackedApplication(application_id, self.min_interval)
+
+    def untrack(self, application_id):
+        """
+        Stops tracking an application.
+
+        :param str application_id: The application id
+        """
+        with self._lock:
+            self._apps.pop(application_id, None)
+
+    def tracked(self):
+        """
+        Ids of the currently tracked applications.
+
+        :rtype: List[str]
+        """
+        with self._lock:
+            return list(self._apps)
+
+    def snapshot(self):
+        """
+        Consolidated progress of all tracked applications.
+
+        :returns: dictionary keyed by application id, each value contains
+            `jobs` (as returned by the AM), `map_progress` and
+            `reduce_progress` averaged over the jobs, and `updated`, the
+            time of the last successful poll
+        :rtype: dict
+        """
+        with self._lock:
+            apps = list(self._apps.values())
+
+        result = {}
+        for app in apps:
+            progress = _job_progress(app.jobs)
+            result[app.application_id] = {
+                'jobs': app.jobs,
+                'map_progress': sum(m or 0 for m, _ in progress) / len(progress) if progress else 0.0,
+                'reduce_progress': sum(r or 0 for _, r in progress) / len(progress) if progress else 0.0,
+                'updated': app.updated,
+            }
+        return result
+
+    def poll(self):
+        """
+        Polls all applications which are due.
+
+        :returns: ids of the applications polled
+        :rtype: List[str]
+        """
+        now = time.time()
+        with self._lock:
+            due = [app for app in self._apps.values() if app.due <= now]
+        if not due:
+            return []
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        for app, result in zip(due, self._executor.map(self._fetch, due)):
+            self._update(app, result, time.time())
+
+        return [app.application_id for app in due]
+
+    def next_delay(self):
+        with self._lock:
+            if not self._apps:
+                return self.max_interval
+            next_due = min(app.due for app in self._apps.values())
+        return min(max(next_due - time.time(), 0), self.max_interval)
+
+    def stop(self, timeout=None):
+        super(ProgressPoller, self).stop(timeout)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _fetch(self, app):
+        try:
+            data = self.application_master.jobs(app.application_id).data
+        except (APIError, IOError) as e:
+            log.debug("Failed to poll AM of '{appid}': {err}".format(appid=app.application_id, err=e))
+            return None
+        jobs = data.get('jobs') if data else None
+        return (jobs or {}).get('job') or []
+
+    def _is_finished(self, app):
+        if self.resource_manager is None:
+            return app.failures >= self.max_failures
+        try:
+            state = self.resource_manager.cluster_application(app.application_id).data['app']['state']
+        except (APIError, IOError, KeyError):
+            return app.failures >= self.max_failures
+        return state in TERMINAL_APPLICATION_STATES
+
+    def _update(self, app, jobs, now):
+        if jobs is None:
+            app.failures += 1
+            finished = self._is_finished(app)
+        else:
+            app.failures = 0
+            moved = _job_progress(jobs) != _job_progress(app.jobs)
+            app.interval = app.interval / 2.0 if moved else app.interval * 2.0
+            app.interval = min(max(app.interval, self.min_interval), self.max_interval)
+            app.jobs = jobs
+            app.updated = now
+            finished = bool(jobs) and all(job.get('state') in TERMINAL_JOB_STATES for job in jobs)
+
+        if finished:
+            with self._lock:
+                self._apps.pop(app.application_id, None)
+            if self.on_finished is not None:
+                self.on_finished(app.application_id, app.jobs)
+        else:
+            app.due = now + app.interval
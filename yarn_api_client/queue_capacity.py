@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Vectorised capacity and headroom evaluation of scheduler queues.
+
+The capacities of the leaf queues of a
+:py:class:`yarn_api_client.scheduler.SchedulerSnapshot` are loaded into
+NumPy arrays with one row per queue and one column per partition, so that
+every queue and partition is evaluated against a threshold with a single
+comparison.  This module requires ``numpy`` which can be installed with
+``pip install yarn-api-client[analysis]``.
+"""
+from __future__ import unicode_literals
+
+import numpy as np
+
+from .scheduler import SchedulerSnapshot
+
+#: `queueCapacitiesByPartition` fields loaded, with their attribute names
+CAPACITY_FIELDS = (
+    ('capacity', 'capacity'),
+    ('used_capacity', 'usedCapacity'),
+    ('max_capacity', 'maxCapacity'),
+    ('absolute_capacity', 'absoluteCapacity'),
+    ('absolute_used_capacity', 'absoluteUsedCapacity'),
+    ('absolute_max_capacity', 'absoluteMaxCapacity'),
+)
+
+#: `resourceUsagesByPartition` resources loaded, with their attribute names
+USAGE_FIELDS = (
+    ('used_memory', 'used', 'memory'),
+    ('used_vcores', 'used', 'vCores'),
+    ('pending_memory', 'pending', 'memory'),
+    ('pending_vcores', 'pending', 'vCores'),
+)
+
+
+def _usages(info):
+    resources = info.get('resources')
+    if not isinstance(resources, dict):
+        return []
+    return resources.get('resourceUsagesByPartition') or []
+
+
+class QueueCapacityMatrix(object):
+    """
+    Capacities of queues by partition as 2-D arrays of shape
+    `(len(queues), len(partitions))`.
+
+    Capacities are percentages as reported by the Capacity Scheduler,
+    `used_*` and `pending_*` are in MB and vcores.  Cells of queues without
+    capacity in a partition are `NaN` and `False` in :py:attr:`defined`, so
+    that they never satisfy a comparison.
+
+    :param list queues: full paths of the queues, one per row
+    :param list partitions: partition names, one per column
+    """
+    def __init__(self, queues, partitions):
+        self.queues = list(queues)
+        self.partitions = list(partitions)
+        self._rows = dict((queue, row) for row, queue in enumerate(self.queues))
+        self._columns = dict((partition, column) for column, partition in enumerate(self.partitions))
+        shape = (len(self.queues), len(self.partitions))
+        self.defined = np.zeros(shape, dtype=bool)
+        for name, _ in CAPACITY_FIELDS:
+            setattr(self, name, np.full(shape, np.nan))
+        for name, _, _ in USAGE_FIELDS:
+            setattr(self, name, np.zeros(shape))
+
+    @classmethod
+    def from_snapshot(cls, snapshot, leaves_only=True):
+        """
+        Loads the capacities of the queues of a scheduler snapshot.
+
+        :param SchedulerSnapshot snapshot: scheduler snapshot
+        :param bool leaves_only: load the leaf queues only, the queues
+            applications are submitted to
+        :rtype: :py:class:`QueueCapacityMatrix`
+        """
+        nodes = snapshot.leaf_queues() if leaves_only else list(snapshot)
+        matrix = cls([node.path for node in nodes], snapshot.partition_names())
+        for row, node in enumerate(nodes):
+            for partition, capacities in node.partitions.items():
+                column = matrix._columns[partition]
+                matrix.defined[row, column] = True
+                for name, key in CAPACITY_FIELDS:
+                    value = capacities.get(key)
+                    if value is not None:
+                        getattr(matrix, name)[row, column] = value
+            for usage in _usages(node.info):
+                column = matrix._columns.get(usage.get('partitionName', ''))
+                if column is None:
+                    continue
+                for name, resource, key in USAGE_FIELDS:
+                    value = (usage.get(resource) or {}).get(key)
+                    if value is not None:
+                        getattr(matrix, name)[row, column] = value
+        return matrix
+
+    @classmethod
+    def from_resource_manager(cls, resource_manager, leaves_only=True):
+        """
+        Fetches the scheduler resource and loads the capacities of its
+        queues.
+
+        :param ResourceManager resource_manager: ResourceManager client
+        :param bool leaves_only: load the leaf queues only
+        :rtype: :py:class:`QueueCapacityMatrix`
+        """
+        return cls.from_snapshot(SchedulerSnapshot.from_resource_manager(resource_manager), leaves_only)
+
+    def row(self, queue):
+        return self._rows[queue]
+
+    def column(self, partition):
+        return self._columns[partition]
+
+    @property
+    def headroom(self):
+        """
+        Capacity, in percent of the partition, a queue can still grow by
+        before reaching its absolute maximum capacity.
+
+        :rtype: numpy.ndarray
+        """
+        return self.absolute_max_capacity - self.absolute_used_capacity
+
+    def available(self, availability_threshold):
+        """
+        Same as
+        :py:meth:`yarn_api_client.resource_manager.ResourceManager.cluster_scheduler_queue_availability`
+        for every queue and partition at once.
+
+        :param float availability_threshold: value can range between 0 - 100
+        :returns: boolean array, `False` for undefined cells
+        :rtype: numpy.ndarray
+        """
+        return self.defined & (self.absolute_used_capacity <= availability_threshold)
+
+    def with_headroom(self, minimum, partition=None):
+        """
+        Queues whose :py:attr:`headroom` exceeds the given value.
+
+        :param float minimum: headroom in percent of the partition
+        :param str partition: partition name, all partitions if `None`
+        :returns: queue paths if a partition is given, `(queue, partition)`
+            tuples otherwise
+        :rtype: list
+        """
+        if partition is not None:
+            column = self._columns.get(partition)
+            if column is None:
+                return []
+            rows = np.flatnonzero(self.defined[:, column] & (self.headroom[:, column] > minimum))
+            return [self.queues[row] for row in rows]
+        rows, columns = np.nonzero(self.defined & (self.headroom > minimum))
+        return [(self.queues[row], self.partitions[column]) for row, column in zip(rows, columns)]
@@ -1,15 +1,19 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
-from .base import BaseYarnAPI, get_logger
-from .constants import YarnApplicationState, FinalApplicationStatus, ClusterContainerSignal
+import threading
+
+from .base import BaseYarnAPI, EndpointPool, Uri, get_logger
+from .constants import YarnApplicationState, FinalApplicationStatus, ClusterContainerSignal, NodeState
 from .errors import IllegalArgumentError
 from .hadoop_conf import get_resource_manager_endpoint, check_is_active_rm, CONF_DIR, _get_maximum_container_memory
-from collections import deque
+from .node_watcher import NodeWatcher
+from .scheduler import SchedulerSnapshot, SchedulerWatcher
 
 log = get_logger(__name__)
 LEGAL_STATES = {s for s, _ in YarnApplicationState}
 LEGAL_FINAL_STATUSES = {s for s, _ in FinalApplicationStatus}
 LEGAL_CLUSTER_CONTAINER_STATUSES = {s for s, _ in ClusterContainerSignal}
+LEGAL_NODE_STATES = {s for s, _ in NodeState}
 
 
 def validate_yarn_application_state(state, required=False):
@@ -41,6 +45,20 @@ def validate_yarn_application_states(states, required=False):
             raise IllegalArgumentError(msg)
 
 
+def validate_node_states(states):
+    if states:
+        if not isinstance(states, list):
+            msg = "States should be list"
+            raise IllegalArgumentError(msg)
+
+        illegal_states = set(states) - LEGAL_NODE_STATES
+        if illegal_states:
+            msg = 'Node States %s are illegal' % (
+                ",".join(illegal_states),
+            )
+            raise IllegalArgumentError(msg)
+
+
 def validate_final_application_status(final_status, required=False):
     if final_status:
         if final_status not in LEGAL_FINAL_STATUSES:
@@ -76,27 +94,77 @@ class ResourceManager(BaseYarnAPI):
     be used.
 
     :param List[str] service_endpoints: List of ResourceManager HTTP(S)
-        addresses
+        addresses, or an :py:class:`yarn_api_client.base.EndpointPool` of
+        equivalent endpoints (e.g. YARN Routers) to spread requests over, in
+        which case no active ResourceManager lookup is performed
     :param int timeout: API connection timeout in seconds
     :param AuthBase auth: Auth to use for requests configurations
     :param boolean verify: Either a boolean, in which case it controls whether
         we verify the server's TLS certificate, or a string, in which case it must
         be a path to a CA bundle to use. Defaults to ``True``
+    :param boolean share_session: use the process-wide session registered for
+        the same endpoint and transport settings instead of a private one,
+        see :py:func:`yarn_api_client.base.get_shared_session`. Defaults to
+        ``False``
+    :param boolean lazy: do not look for the active ResourceManager in the
+        constructor, but on the first request. The constructor then performs
+        no network I/O and a failed lookup is retried by the next request.
+        Defaults to ``False``
     """
-    def __init__(self, service_endpoints=None, timeout=30, auth=None, verify=True, proxies=None):
+    def __init__(self, service_endpoints=None, timeout=30, auth=None, verify=True, proxies=None,
+                 share_session=False, lazy=False):
+        self.service_endpoints = service_endpoints
+        self.lazy = lazy
+        self._resolve_lock = threading.Lock()
+
         active_service_endpoint = None
+        if isinstance(service_endpoints, EndpointPool):
+            active_service_endpoint = service_endpoints
+        elif not lazy:
+            active_service_endpoint = self._find_active_endpoint(service_endpoints, timeout, auth, verify)
+            if not active_service_endpoint:
+                raise Exception("No active RMs found")
+
+        super(ResourceManager, self).__init__(active_service_endpoint, timeout, auth, verify, proxies,
+                                              share_session)
+
+    def __getstate__(self):
+        state = super(ResourceManager, self).__getstate__()
+        del state['_resolve_lock']
+        return state
+
+    def __setstate__(self, state):
+        self._resolve_lock = threading.Lock()
+        super(ResourceManager, self).__setstate__(state)
+
+    @staticmethod
+    def _find_active_endpoint(service_endpoints, timeout, auth, verify):
         if not service_endpoints:
-            active_service_endpoint = get_resource_manager_endpoint(timeout, auth, verify)
-        else:
-            for endpoint in service_endpoints:
-                if check_is_active_rm(endpoint, timeout, auth, verify):
-                    active_service_endpoint = endpoint
-                    break
-
-        if active_service_endpoint:
-            super(ResourceManager, self).__init__(active_service_endpoint, timeout, auth, verify, proxies)
-        else:
-            raise Exception("No active RMs found")
+            return get_resource_manager_endpoint(timeout, auth, verify)
+
+        for endpoint in service_endpoints:
+            if check_is_active_rm(endpoint, timeout, auth, verify):
+                return endpoint
+        return None
+
+    def _resolve_active_endpoint(self):
+        with self._resolve_lock:
+            # Another thread may have resolved the endpoint in the meantime
+            if self.service_uri is not None:
+                return
+
+            endpoint = self._find_active_endpoint(self.service_endpoints, self.timeout, self.auth, self.verify)
+            if not endpoint:
+                raise Exception("No active RMs found")
+
+            self.service_uri = Uri(endpoint)
+            if self.share_session:
+                self._init_session()
+
+    def _validate_configuration(self):
+        if self.service_uri is None and self.lazy:
+            self._resolve_active_endpoint()
+        super(ResourceManager, self)._validate_configuration()
 
     def get_active_endpoint(self):
         """
@@ -104,6 +172,7 @@ class ResourceManager(BaseYarnAPI):
         :return: str service_endpoint: Service endpoint URL corresponding to
         the active address of RM
         """
+        self._validate_configuration()
         return self.service_uri.to_url()
 
     def cluster_information(self):
@@ -368,7 +437,7 @@ class ResourceManager(BaseYarnAPI):
         """
         path = '/ws/v1/cluster/nodes'
 
-        validate_yarn_application_states(states)
+        validate_node_states(states)
 
         loc_args = (
             ('states', ','.join(states) if states else None),
@@ -377,6 +446,22 @@ class ResourceManager(BaseYarnAPI):
 
         return self.request(path, params=params)
 
+    def cluster_node_watcher(self, states=None, interval=30, on_event=None):
+        """
+        Watcher reporting the state transitions of the nodes between two
+        polls, see :py:class:`yarn_api_client.node_watcher.NodeWatcher`.
+        Call `start()` on it to poll in the background.
+
+        :param List[str] states: node states polled, all if `None`
+        :param float interval: delay between two polls in seconds
+        :param callable on_event: called with each event
+        :rtype: :py:class:`yarn_api_client.node_watcher.NodeWatcher`
+        :raises yarn_api_client.errors.IllegalArgumentError: if `states`
+            incorrect
+        """
+        validate_node_states(states)
+        return NodeWatcher(self, states, interval, on_event)
+
     def cluster_node(self, node_id):
         """
         A node resource contains information about a node in the cluster.
@@ -538,31 +623,50 @@ class ResourceManager(BaseYarnAPI):
 
         return _get_maximum_container_memory(CONF_DIR)
 
+    def cluster_scheduler_snapshot(self):
+        """
+        Fetches the scheduler resource once and indexes its queue tree, for
+        any number of queue and partition lookups without further requests.
+
+        :returns: indexed queue tree
+        :rtype: :py:class:`yarn_api_client.scheduler.SchedulerSnapshot`
+        """
+        return SchedulerSnapshot.from_resource_manager(self)
+
+    def cluster_scheduler_watcher(self, interval=30, fields=None, saturation_threshold=None, saturation_polls=3,
+                                  on_change=None):
+        """
+        Watcher reporting the scheduler queues which changed between two
+        polls, see :py:class:`yarn_api_client.scheduler.SchedulerWatcher`.
+        Call `start()` on it to poll in the background.
+
+        :param float interval: delay between two polls in seconds
+        :param fields: top level queue fields compared, all fields if `None`
+        :param float saturation_threshold: absolute used capacity, in percent,
+            from which a queue is saturated, disabled if `None`
+        :param int saturation_polls: consecutive polls after which a queue is
+            reported saturated
+        :param callable on_change: called with the list of changes of each
+            poll which found any
+        :rtype: :py:class:`yarn_api_client.scheduler.SchedulerWatcher`
+        """
+        return SchedulerWatcher(self, interval, fields, saturation_threshold, saturation_polls, on_change)
+
     def cluster_scheduler_queue(self, yarn_queue_name):
         """
         Given a queue name, this function tries to locate the given queue in
         the object returned by scheduler endpoint.
 
-        The queue can be present inside a multilevel structure. This solution
-        tries to locate the queue using breadth-first-search algorithm.
+        The queue can be present inside a multilevel structure, a name shared
+        by several queues resolves to the first one in breadth-first order.
+        Each call fetches the scheduler resource, use
+        :py:meth:`cluster_scheduler_snapshot` to look up several queues.
 
-        :param str yarn_queue_name: case sensitive queue name
+        :param str yarn_queue_name: case sensitive queue name or full path
         :return: queue, None if not found
         :rtype: dict
         """
-        scheduler = self.cluster_scheduler().data
-        scheduler_info = scheduler['scheduler']['schedulerInfo']
-
-        bfs_deque = deque([scheduler_info])
-        while bfs_deque:
-            vertex = bfs_deque.popleft()
-            if vertex['queueName'] == yarn_queue_name:
-                return vertex
-            elif 'queues' in vertex:
-                for queue in vertex['queues']['queue']:
-                    bfs_deque.append(queue)
-
-        return None
+        return self.cluster_scheduler_snapshot().queue(yarn_queue_name)
 
     def cluster_scheduler_queue_availability(self, candidate_partition, availability_threshold):
         """
@@ -585,7 +689,8 @@ class ResourceManager(BaseYarnAPI):
         """
         A queue can be divided into multiple partitions having different node labels.
         Given the candidate queue and parition node label, this extracts the partition
-        we are interested in.
+        we are interested in. :py:meth:`yarn_api_client.scheduler.SchedulerSnapshot.partition`
+        looks partitions up by name without scanning them.
 
         :param dict candidate_queue: queue dictionary
         :param str cluster_node_label: case sensitive node label name
@@ -0,0 +1,409 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import time
+
+from collections import deque
+
+from .base import get_logger
+from .errors import APIError
+from .poller import Poller
+
+log = get_logger(__name__)
+
+#: Name of the default partition, i.e. nodes without label
+DEFAULT_PARTITION = ''
+
+
+def _child_queues(info):
+    # Capacity Scheduler nests children in 'queues', Fair Scheduler in 'childQueues'
+    children = info.get('queues') or info.get('childQueues')
+    if isinstance(children, dict):
+        children = children.get('queue')
+    return children or []
+
+
+def _partitions(info):
+    capacities = info.get('capacities')
+    if not isinstance(capacities, dict):
+        return {}
+    return dict((partition.get('partitionName', DEFAULT_PARTITION), partition)
+                for partition in capacities.get('queueCapacitiesByPartition') or [])
+
+
+class QueueNode(object):
+    """
+    Queue of a :py:class:`SchedulerSnapshot`.
+
+    :param str name: queue name
+    :param str path: full queue path, e.g. `root.prod.etl`
+    :param QueueNode parent: parent queue, `None` for the root queue
+    :param dict info: queue resource as returned by the scheduler API
+    """
+    __slots__ = ('name', 'path', 'parent', 'children', 'info', 'partitions')
+
+    def __init__(self, name, path, parent, info):
+        self.name = name
+        self.path = path
+        self.parent = parent
+        self.children = []
+        self.info = info
+        #: capacities of the queue keyed by partition name
+        self.partitions = _partitions(info)
+
+    def __repr__(self):
+        return 'QueueNode({path!r})'.format(path=self.path)
+
+    @property
+    def is_leaf(self):
+        return not self.children
+
+    def partition(self, partition=DEFAULT_PARTITION):
+        """
+        Capacities of the queue in the given partition.
+
+        :param str partition: partition (node label) name
+        :returns: partition resource, `None` if the queue has no capacity
+            in that partition
+        :rtype: dict
+        """
+        return self.partitions.get(partition)
+
+    def ancestors(self):
+        """
+        Parent queues, from the parent up to the root queue.
+
+        :rtype: List[QueueNode]
+        """
+        result = []
+        node = self.parent
+        while node is not None:
+            result.append(node)
+            node = node.parent
+        return result
+
+
+class SchedulerSnapshot(object):
+    """
+    Queue tree of the scheduler, built once from a `cluster_scheduler`
+    response and indexed by queue name and full path, so that any number
+    of queue and partition lookups run against a single fetch.
+
+    Queues of the Capacity and Fair Schedulers are supported.  A queue name
+    shared by several queues resolves, like
+    :py:meth:`yarn_api_client.resource_manager.ResourceManager.cluster_scheduler_queue`,
+    to the first one in breadth-first order.
+
+    :param dict data: `Response.data` of the scheduler API
+    :param float fetched: time of the fetch, now if `None`
+    """
+    def __init__(self, data, fetched=None):
+        scheduler_info = ((data or {}).get('scheduler') or {}).get('schedulerInfo') or {}
+        self.type = scheduler_info.get('type')
+        self.fetched = time.time() if fetched is None else fetched
+        self._by_name = {}
+        self._by_path = {}
+        self._queues = []
+        self.root = self._build(scheduler_info.get('rootQueue') or scheduler_info)
+
+    @classmethod
+    def from_resource_manager(cls, resource_manager):
+        """
+        Fetches the scheduler resource and builds its snapshot.
+
+        :param ResourceManager resource_manager: ResourceManager client
+        :rtype: :py:class:`SchedulerSnapshot`
+        """
+        return cls(resource_manager.cluster_scheduler().data)
+
+    def _build(self, root_info):
+        root_name = root_info.get('queueName') or 'root'
+        root = QueueNode(root_name, root_info.get('queuePath') or root_name, None, root_info)
+        pending = deque([root])
+        while pending:
+            node = pending.popleft()
+            self._queues.append(node)
+            self._by_name.setdefault(node.name, node)
+            self._by_path[node.path] = node
+            for info in _child_queues(node.info):
+                name = info.get('queueName')
+                path = info.get('queuePath')
+                if not path:
+                    # Fair Scheduler queue names already are full paths
+                    path = name if name.startswith(node.path + '.') else node.path + '.' + name
+                child = QueueNode(name, path, node, info)
+                node.children.append(child)
+                pending.append(child)
+        return root
+
+    def __len__(self):
+        return len(self._queues)
+
+    def __iter__(self):
+        return iter(self._queues)
+
+    def __contains__(self, name_or_path):
+        return self.get(name_or_path) is not None
+
+    def get(self, name_or_path):
+        """
+        Queue with the given full path or, failing that, name.
+
+        :param str name_or_path: queue name or full path
+        :returns: queue, `None` if not found
+        :rtype: :py:class:`QueueNode`
+        """
+        node = self._by_path.get(name_or_path)
+        if node is None:
+            node = self._by_name.get(name_or_path)
+        return node
+
+    def queue(self, name_or_path):
+        """
+        Queue resource with the given full path or name, as returned by the
+        scheduler API.
+
+        :param str name_or_path: queue name or full path
+        :returns: queue, `None` if not found
+        :rtype: dict
+        """
+        node = self.get(name_or_path)
+        return node.info if node is not None else None
+
+    def leaf_queues(self):
+        """
+        Leaf queues in breadth-first order.
+
+        :rtype: List[QueueNode]
+        """
+        return [node for node in self._queues if node.is_leaf]
+
+    def partition_names(self):
+        """
+        Names of the partitions queues have capacity in.
+
+        :rtype: List[str]
+        """
+        names = set()
+        for node in self._queues:
+            names.update(node.partitions)
+        return sorted(names)
+
+    def partition(self, name_or_path, partition=DEFAULT_PARTITION):
+        """
+        Capacities of a queue in the given partition.
+
+        :param str name_or_path: queue name or full path
+        :param str partition: partition (node label) name
+        :returns: partition resource, `None` if the queue or the partition
+            is not found
+        :rtype: dict
+        """
+        node = self.get(name_or_path)
+        return node.partition(partition) if node is not None else None
+
+    def is_available(self, name_or_path, availability_threshold, partition=DEFAULT_PARTITION):
+        """
+        Whether the absolute used capacity of a queue in a partition does
+        not exceed the threshold, see
+        :py:meth:`yarn_api_client.resource_manager.ResourceManager.cluster_scheduler_queue_availability`.
+
+        :param str name_or_path: queue name or full path
+        :param float availability_threshold: value can range between 0 - 100
+        :param str partition: partition (node label) name
+        :returns: `None` if the queue or the partition is not found
+        :rtype: bool
+        """
+        capacities = self.partition(name_or_path, partition)
+        if capacities is None:
+            return None
+        return capacities.get('absoluteUsedCapacity', 0) <= availability_threshold
+
+
+#: Kinds of :py:class:`QueueChange`
+QUEUE_ADDED = 'ADDED'
+QUEUE_REMOVED = 'REMOVED'
+QUEUE_CHANGED = 'CHANGED'
+QUEUE_SATURATED = 'SATURATED'
+QUEUE_RECOVERED = 'RECOVERED'
+
+#: Queue fields describing the configuration rather than the usage of a
+#: queue, e.g. to watch for capacity reconfiguration only
+CONFIGURATION_FIELDS = (
+    'capacity', 'maxCapacity', 'absoluteCapacity', 'absoluteMaxCapacity', 'state', 'userLimit',
+    'userLimitFactor', 'maxApplications', 'maxApplicationsPerUser', 'defaultPriority', 'preemptionDisabled',
+    'intraQueuePreemptionDisabled', 'orderingPolicyInfo', 'nodeLabels', 'defaultNodeLabelExpression',
+    'minResources', 'maxResources', 'weight', 'schedulingPolicy',
+)
+
+
+class QueueChange(object):
+    """
+    Change of a queue between two scheduler snapshots.
+
+    :param str kind: one of `ADDED`, `REMOVED`, `CHANGED`, `SATURATED` or
+        `RECOVERED`
+    :param str path: full queue path
+    :param dict fields: changed fields mapped to `(old, new)` tuples, nested
+        fields are addressed with dots and list items by partition name or
+        index, e.g. ``capacities.queueCapacitiesByPartition[gpu].capacity``
+    """
+    __slots__ = ('kind', 'path', 'fields')
+
+    def __init__(self, kind, path, fields=None):
+        self.kind = kind
+        self.path = path
+        self.fields = fields or {}
+
+    def __repr__(self):
+        return 'QueueChange({kind!r}, {path!r}, {fields!r})'.format(
+            kind=self.kind, path=self.path, fields=self.fields)
+
+    def __eq__(self, other):
+        return isinstance(other, QueueChange) and (self.kind, self.path, self.fields) == (
+            other.kind, other.path, other.fields)
+
+    def __ne__(self, other):
+        return not self == other
+
+
+def _flatten(value, prefix, result):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            _flatten(item, prefix + '.' + key if prefix else key, result)
+    elif isinstance(value, list):
+        for index, item in enumerate(value):
+            key = item.get('partitionName', index) if isinstance(item, dict) else index
+            _flatten(item, '{prefix}[{key}]'.format(prefix=prefix, key=key), result)
+    else:
+        result[prefix] = value
+
+
+def flatten_queue(info, fields=None):
+    """
+    Fields of a queue resource without its child queues, flattened to a
+    single level dictionary.
+
+    :param dict info: queue resource as returned by the scheduler API
+    :param fields: top level fields to keep, all fields if `None`
+    :rtype: dict
+    """
+    result = {}
+    for key in (info if fields is None else fields):
+        if key in info and key not in ('queues', 'childQueues'):
+            _flatten(info[key], key, result)
+    return result
+
+
+def _flatten_snapshot(snapshot, fields):
+    return dict((node.path, flatten_queue(node.info, fields)) for node in snapshot)
+
+
+def _diff(old, new):
+    changes = []
+    for path, fields in new.items():
+        previous = old.get(path)
+        if previous is None:
+            changes.append(QueueChange(QUEUE_ADDED, path, dict((key, (None, value)) for key, value in fields.items())))
+        elif previous != fields:
+            changed = {}
+            for key in set(previous) | set(fields):
+                before, after = previous.get(key), fields.get(key)
+                if before != after:
+                    changed[key] = (before, after)
+            changes.append(QueueChange(QUEUE_CHANGED, path, changed))
+    for path in old:
+        if path not in new:
+            changes.append(QueueChange(QUEUE_REMOVED, path))
+    return changes
+
+
+def diff_snapshots(old, new, fields=None):
+    """
+    Queues added, removed or changed between two scheduler snapshots, in
+    linear time over the number of queues.
+
+    :param SchedulerSnapshot old: previous snapshot
+    :param SchedulerSnapshot new: current snapshot
+    :param fields: top level queue fields compared, all fields if `None`,
+        e.g. :py:data:`CONFIGURATION_FIELDS`
+    :rtype: List[:py:class:`QueueChange`]
+    """
+    return _diff(_flatten_snapshot(old, fields), _flatten_snapshot(new, fields))
+
+
+class SchedulerWatcher(Poller):
+    """
+    Polls the scheduler at a fixed interval and reports the queues which
+    changed since the previous poll.
+
+    Every queue is flattened once per poll and compared to its previous
+    version as a whole, so that only changed queues are diffed field by
+    field.  Restricting `fields`, e.g. to :py:data:`CONFIGURATION_FIELDS`,
+    ignores usage changes and keeps polls of large queue trees cheap.
+
+    With `saturation_threshold`, a `SATURATED` change is reported for a leaf
+    queue whose absolute used capacity stayed at or above the threshold for
+    `saturation_polls` consecutive polls, and a `RECOVERED` change once it
+    dropped below it again.
+
+    :param ResourceManager resource_manager: ResourceManager client
+    :param float interval: delay between two polls in seconds
+    :param fields: top level queue fields compared, all fields if `None`
+    :param float saturation_threshold: absolute used capacity, in percent,
+        from which a queue is saturated, disabled if `None`
+    :param int saturation_polls: consecutive polls after which a queue is
+        reported saturated
+    :param callable on_change: called with the list of changes of each
+        poll which found any
+    """
+    def __init__(self, resource_manager, interval=30, fields=None, saturation_threshold=None, saturation_polls=3,
+                 on_change=None):
+        super(SchedulerWatcher, self).__init__(interval)
+        self.resource_manager = resource_manager
+        self.fields = tuple(fields) if fields is not None else None
+        self.saturation_threshold = saturation_threshold
+        self.saturation_polls = saturation_polls
+        self.on_change = on_change
+        self.snapshot = None
+        self._flattened = None
+        self._saturated = {}
+
+    def poll(self):
+        """
+        Fetches the scheduler and reports the changes since the previous
+        poll, nothing on the first poll.
+
+        :returns: changes
+        :rtype: List[:py:class:`QueueChange`]
+        """
+        try:
+            snapshot = SchedulerSnapshot.from_resource_manager(self.resource_manager)
+        except (APIError, IOError) as e:
+            log.warning("Failed to poll scheduler: {err}".format(err=e))
+            return []
+
+        flattened = _flatten_snapshot(snapshot, self.fields)
+        changes = _diff(self._flattened, flattened) if self._flattened is not None else []
+        if self.saturation_threshold is not None:
+            changes.extend(self._saturation(snapshot))
+        self.snapshot, self._flattened = snapshot, flattened
+
+        if changes and self.on_change is not None:
+            self.on_change(changes)
+        return changes
+
+    def _saturation(self, snapshot):
+        changes = []
+        counts = {}
+        for node in snapshot.leaf_queues():
+            used = node.info.get('absoluteUsedCapacity')
+            count = self._saturated.get(node.path, 0)
+            if used is not None and used >= self.saturation_threshold:
+                counts[node.path] = count + 1
+                if count + 1 == self.saturation_polls:
+                    changes.append(QueueChange(QUEUE_SATURATED, node.path, {'absoluteUsedCapacity': (None, used)}))
+            elif count >= self.saturation_polls:
+                changes.append(QueueChange(QUEUE_RECOVERED, node.path, {'absoluteUsedCapacity': (None, used)}))
+        self._saturated = counts
+        return changes
@@ -0,0 +1,350 @@
+# -*- coding: utf-8 -*-
+"""
+Task skew and straggler analysis for finished MapReduce jobs.
+
+Tasks and task attempts returned by the History Server are loaded into
+columnar NumPy arrays once, after which all statistics are computed with
+vectorised operations.  This module requires ``numpy`` which can be
+installed with ``pip install yarn-api-client[analysis]``.
+"""
+from __future__ import unicode_literals
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .base import get_logger
+
+log = get_logger(__name__)
+
+MAP = 0
+REDUCE = 1
+TASK_TYPES = ('MAP', 'REDUCE')
+_TASK_TYPE_CODES = {'MAP': MAP, 'REDUCE': REDUCE, 'm': MAP, 'r': REDUCE}
+
+
+def _unwrap(data, outer, inner):
+    # Job History Server returns `null` instead of an empty list for
+    # collections without elements
+    container = data.get(outer) if data else None
+    if not container:
+        return []
+    return container.get(inner) or []
+
+
+def _int_column(records, key, count):
+    return np.fromiter((r.get(key) or 0 for r in records), dtype=np.int64, count=count)
+
+
+def _float_column(records, key, count):
+    return np.fromiter((r.get(key) or 0.0 for r in records), dtype=np.float64, count=count)
+
+
+def _type_column(records, count):
+    return np.fromiter((_TASK_TYPE_CODES.get(r.get('type'), MAP) for r in records), dtype=np.int8, count=count)
+
+
+class TaskTable(object):
+    """
+    Columnar representation of the tasks of one MapReduce job.
+
+    Every column is a NumPy array of the same length, one row per task.
+
+    :param list task_ids: task ids
+    :param numpy.ndarray task_type: task type codes (``MAP`` or ``REDUCE``)
+    :param numpy.ndarray start: start time in ms since epoch
+    :param numpy.ndarray finish: finish time in ms since epoch, 0 if running
+    :param numpy.ndarray elapsed: elapsed time in ms
+    :param numpy.ndarray progress: progress in percent
+    :param numpy.ndarray succeeded: whether the task finished successfully
+    """
+    def __init__(self, task_ids, task_type, start, finish, elapsed, progress, succeeded):
+        self.task_ids = task_ids
+        self.task_type = task_type
+        self.start = start
+        self.finish = finish
+        self.elapsed = elapsed
+        self.progress = progress
+        self.succeeded = succeeded
+        self._index = None
+
+    def __len__(self):
+        return len(self.task_ids)
+
+    @classmethod
+    def from_response(cls, data):
+        """
+        Builds the table from the JSON data of a `job_tasks` call.
+
+        :param dict data: `Response.data` of the tasks API
+        :rtype: :py:class:`TaskTable`
+        """
+        tasks = _unwrap(data, 'tasks', 'task')
+        count = len(tasks)
+        return cls(
+            task_ids=[t['id'] for t in tasks],
+            task_type=_type_column(tasks, count),
+            start=_int_column(tasks, 'startTime', count),
+            finish=_int_column(tasks, 'finishTime', count),
+            elapsed=_int_column(tasks, 'elapsedTime', count),
+            progress=_float_column(tasks, 'progress', count),
+            succeeded=np.fromiter((t.get('state') == 'SUCCEEDED' for t in tasks), dtype=bool, count=count),
+        )
+
+    def index_of(self, task_id):
+        """
+        Row number of the given task id.
+
+        :param str task_id: The task id
+        :rtype: int
+        """
+        if self._index is None:
+            self._index = dict((task_id, i) for i, task_id in enumerate(self.task_ids))
+        return self._index[task_id]
+
+
+class AttemptTable(object):
+    """
+    Columnar representation of the task attempts of one MapReduce job.
+
+    Node addresses are interned, `node` holds an index into `nodes`.
+
+    :param list attempt_ids: attempt ids
+    :param numpy.ndarray task_index: row of the owning task in the
+        :py:class:`TaskTable`
+    :param numpy.ndarray task_type: task type codes
+    :param numpy.ndarray start: start time in ms since epoch
+    :param numpy.ndarray finish: finish time in ms since epoch
+    :param numpy.ndarray elapsed: elapsed time in ms
+    :param numpy.ndarray node: node codes
+    :param list nodes: distinct node addresses
+    :param numpy.ndarray succeeded: whether the attempt succeeded
+    """
+    def __init__(self, attempt_ids, task_index, task_type, start, finish, elapsed, node, nodes, succeeded):
+        self.attempt_ids = attempt_ids
+        self.task_index = task_index
+        self.task_type = task_type
+        self.start = start
+        self.finish = finish
+        self.elapsed = elapsed
+        self.node = node
+        self.nodes = nodes
+        self.succeeded = succeeded
+
+    def __len__(self):
+        return len(self.attempt_ids)
+
+    @classmethod
+    def from_responses(cls, tasks, attempts_by_task):
+        """
+        Builds the table from the JSON data of `task_attempts` calls.
+
+        :param TaskTable tasks: tasks of the same job
+        :param dict attempts_by_task: `Response.data` of the task attempts
+            API keyed by task id
+        :rtype: :py:class:`AttemptTable`
+        """
+        records = []
+        owners = []
+        for task_id, data in attempts_by_task.items():
+            row = tasks.index_of(task_id)
+            for attempt in _unwrap(data, 'taskAttempts', 'taskAttempt'):
+                records.append(attempt)
+                owners.append(row)
+
+        node_codes = {}
+        count = len(records)
+        node = np.fromiter(
+            (node_codes.setdefault(r.get('nodeHttpAddress') or '', len(node_codes)) for r in records),
+            dtype=np.int32, count=count)
+
+        return cls(
+            attempt_ids=[r['id'] for r in records],
+            task_index=np.asarray(owners, dtype=np.int64),
+            task_type=_type_column(records, count),
+            start=_int_column(records, 'startTime', count),
+            finish=_int_column(records, 'finishTime', count),
+            elapsed=_int_column(records, 'elapsedTime', count),
+            node=node,
+            nodes=list(node_codes),
+            succeeded=np.fromiter((r.get('state') == 'SUCCEEDED' for r in records), dtype=bool, count=count),
+        )
+
+
+def load_job_tasks(history_server, job_id, attempts=True, max_workers=8):
+    """
+    Fetches tasks (and optionally their attempts) of a finished job.
+
+    Task attempts are fetched concurrently, one request per task.
+
+    :param HistoryServer history_server: History Server client
+    :param str job_id: The job id
+    :param boolean attempts: whether to fetch task attempts as well
+    :param int max_workers: number of concurrent attempt requests
+    :returns: tasks and attempts, attempts is `None` if not requested
+    :rtype: tuple
+    """
+    tasks = TaskTable.from_response(history_server.job_tasks(job_id).data)
+    if not attempts:
+        return tasks, None
+
+    def fetch(task_id):
+        return task_id, history_server.task_attempts(job_id, task_id).data
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        attempts_by_task = dict(executor.map(fetch, tasks.task_ids))
+
+    return tasks, AttemptTable.from_responses(tasks, attempts_by_task)
+
+
+def _medians_by_type(task_type, elapsed):
+    medians = np.zeros(len(TASK_TYPES), dtype=np.float64)
+    for code in range(len(TASK_TYPES)):
+        values = elapsed[task_type == code]
+        if values.size:
+            medians[code] = np.median(values)
+    return medians
+
+
+def skew_statistics(tasks):
+    """
+    Elapsed time distribution per task type.
+
+    `skew` is the ratio between the slowest task and the median task.
+
+    :param TaskTable tasks: tasks of a job
+    :returns: statistics keyed by task type (``MAP``, ``REDUCE``)
+    :rtype: dict
+    """
+    result = {}
+    for code, name in enumerate(TASK_TYPES):
+        values = tasks.elapsed[tasks.task_type == code]
+        if not values.size:
+            continue
+        p50, p90, p99 = np.percentile(values, (50, 90, 99))
+        maximum = int(values.max())
+        result[name] = {
+            'count': int(values.size),
+            'mean': float(values.mean()),
+            'std': float(values.std()),
+            'min': int(values.min()),
+            'p50': float(p50),
+            'p90': float(p90),
+            'p99': float(p99),
+            'max': maximum,
+            'skew': float(maximum / p50) if p50 else 0.0,
+        }
+    return result
+
+
+def find_stragglers(tasks, factor=1.5, min_elapsed=0):
+    """
+    Tasks which ran longer than `factor` times the median of their type.
+
+    :param TaskTable tasks: tasks of a job
+    :param float factor: ratio to the median above which a task is reported
+    :param int min_elapsed: ignore tasks faster than this (in ms)
+    :returns: stragglers ordered from the slowest, each item contains
+        `id`, `type`, `elapsed` and `ratio` to the median
+    :rtype: List[dict]
+    """
+    medians = _medians_by_type(tasks.task_type, tasks.elapsed)
+    task_medians = medians[tasks.task_type]
+    mask = (tasks.elapsed > task_medians * factor) & (tasks.elapsed >= min_elapsed)
+    rows = np.flatnonzero(mask)
+    ratios = tasks.elapsed[rows] / np.maximum(task_medians[rows], 1)
+    order = np.argsort(-ratios, kind='stable')
+
+    return [{
+        'id': tasks.task_ids[rows[i]],
+        'type': TASK_TYPES[tasks.task_type[rows[i]]],
+        'elapsed': int(tasks.elapsed[rows[i]]),
+        'ratio': float(ratios[i]),
+    } for i in order]
+
+
+def node_slowness(attempts, min_attempts=1):
+    """
+    Per node slowness of successful attempts.
+
+    Each attempt is normalised by the median elapsed time of successful
+    attempts of its task type, so map and reduce attempts can be compared.
+    A `mean_ratio` well above 1 points at a slow node.
+
+    :param AttemptTable attempts: attempts of a job
+    :param int min_attempts: ignore nodes with fewer successful attempts
+    :returns: nodes ordered from the slowest, each item contains `node`,
+        `attempts`, `mean_ratio` and `elapsed`
+    :rtype: List[dict]
+    """
+    ok = attempts.succeeded
+    task_type = attempts.task_type[ok]
+    elapsed = attempts.elapsed[ok]
+    node = attempts.node[ok]
+
+    medians = _medians_by_type(task_type, elapsed)
+    ratios = elapsed / np.maximum(medians[task_type], 1)
+
+    size = len(attempts.nodes)
+    counts = np.bincount(node, minlength=size)
+    ratio_sums = np.bincount(node, weights=ratios, minlength=size)
+    elapsed_sums = np.bincount(node, weights=elapsed, minlength=size)
+
+    rows = np.flatnonzero(counts >= max(min_attempts, 1))
+    mean_ratios = ratio_sums[rows] / counts[rows]
+    order = np.argsort(-mean_ratios, kind='stable')
+
+    return [{
+        'node': attempts.nodes[rows[i]],
+        'attempts': int(counts[rows[i]]),
+        'mean_ratio': float(mean_ratios[i]),
+        'elapsed': int(elapsed_sums[rows[i]]),
+    } for i in order]
+
+
+def speculative_waste(tasks, attempts):
+    """
+    Time spent in attempts which did not produce the task output.
+
+    Only tasks which finished successfully and ran more than one attempt
+    are taken into account.
+
+    :param TaskTable tasks: tasks of a job
+    :param AttemptTable attempts: attempts of the same job
+    :returns: `speculated_tasks`, `wasted_attempts`, `wasted_ms` and
+        `wasted_fraction` of the total attempt time
+    :rtype: dict
+    """
+    per_task = np.bincount(attempts.task_index, minlength=len(tasks))
+    speculated = (per_task > 1) & tasks.succeeded
+    wasted = speculated[attempts.task_index] & ~attempts.succeeded
+    wasted_ms = int(attempts.elapsed[wasted].sum())
+    total_ms = int(attempts.elapsed.sum())
+
+    return {
+        'speculated_tasks': int(speculated.sum()),
+        'wasted_attempts': int(wasted.sum()),
+        'wasted_ms': wasted_ms,
+        'wasted_fraction': float(wasted_ms) / total_ms if total_ms else 0.0,
+    }
+
+
+def analyze_job_tasks(history_server, job_id, factor=1.5, max_workers=8):
+    """
+    Loads a finished job and runs all analyses on it.
+
+    :param HistoryServer history_server: History Server client
+    :param str job_id: The job id
+    :param float factor: straggler threshold, see :py:func:`find_stragglers`
+    :param int max_workers: number of concurrent attempt requests
+    :returns: `skew`, `stragglers`, `node_slowness` and `speculative_waste`
+    :rtype: dict
+    """
+    tasks, attempts = load_job_tasks(history_server, job_id, max_workers=max_workers)
+
+    return {
+        'skew': skew_statistics(tasks),
+        'stragglers': find_stragglers(tasks, factor),
+        'node_slowness': node_slowness(attempts),
+        'speculative_waste': speculative_waste(tasks, attempts),
+    }
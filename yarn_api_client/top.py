@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import shutil
+import sys
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from .base import get_logger
+from .constants import RUNNING
+from .errors import APIError
+from .poller import Poller
+
+log = get_logger(__name__)
+
+#: Application fields not fetched by :py:class:`ResourceManagerTop`
+APPLICATION_DE_SELECTS = ['resourceRequests']
+
+_CLEAR_SCREEN = '\x1b[2J'
+_CLEAR_LINE = '\x1b[K'
+_HIDE_CURSOR = '\x1b[?25l'
+_SHOW_CURSOR = '\x1b[?25h'
+
+
+def _move_to(row):
+    return '\x1b[{row};1H'.format(row=row + 1)
+
+
+class Screen(object):
+    """
+    Terminal screen which rewrites only the lines which changed since the
+    previous draw.
+
+    :param stream: terminal stream written to
+    """
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.lines = None
+
+    def draw(self, lines):
+        """
+        Displays the given lines.
+
+        :param List[str] lines: lines to display
+        :returns: number of lines written
+        :rtype: int
+        """
+        output = []
+        if self.lines is None:
+            output.append(_HIDE_CURSOR + _CLEAR_SCREEN)
+            self.lines = []
+
+        written = 0
+        for row, line in enumerate(lines):
+            if row >= len(self.lines) or self.lines[row] != line:
+                output.append(_move_to(row) + line + _CLEAR_LINE)
+                written += 1
+        for row in range(len(lines), len(self.lines)):
+            output.append(_move_to(row) + _CLEAR_LINE)
+        output.append(_move_to(len(lines)))
+
+        self.stream.write(''.join(output))
+        self.stream.flush()
+        self.lines = list(lines)
+        return written
+
+    def close(self):
+        if self.lines is not None:
+            self.stream.write(_move_to(len(self.lines)) + _SHOW_CURSOR)
+            self.stream.flush()
+
+
+def _cell(value, width):
+    text = '-' if value is None else '{0}'.format(value)
+    return text[:width].ljust(width)
+
+
+def format_row(columns, values):
+    """
+    Row of fixed width columns, so that a row is redrawn only when one of
+    its values changed.
+
+    :param tuple columns: `(title, width)` tuples
+    :param values: column values
+    :rtype: str
+    """
+    return ' '.join(_cell(value, width) for (_, width), value in zip(columns, values)).rstrip()
+
+
+def format_header(columns):
+    return format_row(columns, [title for title, _ in columns])
+
+
+def _percent(value):
+    return None if value is None else '{0:.1f}'.format(value)
+
+
+def _elapsed(milliseconds):
+    if milliseconds is None:
+        return None
+    seconds = int(milliseconds) // 1000
+    hours, seconds = divmod(seconds, 3600)
+    return '{0}:{1:02d}:{2:02d}'.format(hours, seconds // 60, seconds % 60)
+
+
+def _items(data, *keys):
+    for key in keys:
+        data = data.get(key) if isinstance(data, dict) else None
+    return data or []
+
+
+def leaf_queues(scheduler_info):
+    """
+    Leaf queues of the Capacity or Fair Scheduler.
+
+    :param dict scheduler_info: `schedulerInfo` of the scheduler resource
+    :rtype: List[dict]
+    """
+    result = []
+    stack = [scheduler_info.get('rootQueue') or scheduler_info]
+    while stack:
+        queue = stack.pop()
+        children = _items(queue, 'queues', 'queue') or _items(queue, 'childQueues', 'queue')
+        if children:
+            stack.extend(reversed(children))
+        elif queue.get('queueName'):
+            result.append(queue)
+    return result
+
+
+class Top(Poller):
+    """
+    Base class of the `top` like views of the command line client.
+
+    :py:meth:`poll` fetches the view with :py:meth:`fetch` and draws it on a
+    :py:class:`Screen`, limited to the terminal height.  A failed refresh
+    keeps the previous view and reports the error on its last line.
+
+    :param float interval: refresh interval in seconds
+    :param stream: terminal stream written to
+    :param int max_rows: number of lines displayed, the terminal height if
+        `None`
+    """
+    def __init__(self, interval=2, stream=None, max_rows=None):
+        super(Top, self).__init__(interval)
+        self.screen = Screen(stream)
+        self.max_rows = max_rows
+        self._executor = None
+
+    def fetch(self):
+        """
+        Lines of the view.
+
+        :rtype: List[str]
+        """
+        raise NotImplementedError
+
+    def _fetch_all(self, *calls):
+        # Resources of a view are fetched concurrently
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=len(calls))
+        return [future.result() for future in [self._executor.submit(call) for call in calls]]
+
+    def rows(self):
+        if self.max_rows is not None:
+            return self.max_rows
+        return shutil.get_terminal_size().lines - 1
+
+    def poll(self):
+        try:
+            lines = self.fetch()
+        except (APIError, IOError) as e:
+            lines = list(self.screen.lines or [])[:self.rows() - 1]
+            lines.append('Refresh failed: {err}'.format(err=e))
+        return self.screen.draw(lines[:self.rows()])
+
+    def stop(self, timeout=None):
+        super(Top, self).stop(timeout)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self.screen.close()
+
+
+class ResourceManagerTop(Top):
+    """
+    Cluster metrics, leaf queues and running applications, refreshed at a
+    fixed interval.  Applications are fetched without their resource
+    requests (`de_selects`) and sorted by allocated memory.
+
+    :param ResourceManager resource_manager: ResourceManager client
+    """
+    QUEUE_COLUMNS = (('QUEUE', 24), ('USED%', 7), ('CAPACITY%', 9), ('MAX%', 7), ('APPS', 6), ('PENDING', 7))
+    APPLICATION_COLUMNS = (('APPLICATION', 32), ('USER', 12), ('QUEUE', 14), ('PROGRESS', 8), ('CONT', 5),
+                           ('MEMORY', 9), ('VCORES', 6), ('ELAPSED', 9), ('NAME', 40))
+
+    def __init__(self, resource_manager, interval=2, stream=None, max_rows=None):
+        super(ResourceManagerTop, self).__init__(interval, stream, max_rows)
+        self.resource_manager = resource_manager
+
+    def fetch(self):
+        rm = self.resource_manager
+        metrics, apps, scheduler = self._fetch_all(
+            rm.cluster_metrics,
+            lambda: rm.cluster_applications(states=[RUNNING], de_selects=APPLICATION_DE_SELECTS),
+            rm.cluster_scheduler)
+
+        m = metrics.data.get('clusterMetrics') or {}
+        lines = [
+            'yarn top - {now}  apps: {running} running, {pending} pending  containers: {containers}  '
+            'nodes: {active} active, {unhealthy} unhealthy'.format(
+                now=time.strftime('%H:%M:%S'), running=m.get('appsRunning'), pending=m.get('appsPending'),
+                containers=m.get('containersAllocated'), active=m.get('activeNodes'),
+                unhealthy=m.get('unhealthyNodes')),
+            'memory: {used}/{total} MB  vcores: {vused}/{vtotal}'.format(
+                used=m.get('allocatedMB'), total=m.get('totalMB'),
+                vused=m.get('allocatedVirtualCores'), vtotal=m.get('totalVirtualCores')),
+            '',
+            format_header(self.QUEUE_COLUMNS),
+        ]
+        for queue in leaf_queues(_items(scheduler.data, 'scheduler', 'schedulerInfo') or {}):
+            lines.append(format_row(self.QUEUE_COLUMNS, (
+                queue.get('queueName'), _percent(queue.get('absoluteUsedCapacity')),
+                _percent(queue.get('absoluteCapacity')), _percent(queue.get('absoluteMaxCapacity')),
+                queue.get('numApplications', queue.get('numActiveApps')), queue.get('numPendingApplications'))))
+
+        lines.extend(['', format_header(self.APPLICATION_COLUMNS)])
+        applications = sorted(_items(apps.data, 'apps', 'app'), key=lambda app: -(app.get('allocatedMB') or 0))
+        for app in applications:
+            lines.append(format_row(self.APPLICATION_COLUMNS, (
+                app.get('id'), app.get('user'), app.get('queue'), _percent(app.get('progress')),
+                app.get('runningContainers'), app.get('allocatedMB'), app.get('allocatedVCores'),
+                _elapsed(app.get('elapsedTime')), app.get('name'))))
+        return lines
+
+
+class NodeManagerTop(Top):
+    """
+    Node status and containers of a NodeManager, refreshed at a fixed
+    interval.
+
+    :param NodeManager node_manager: NodeManager client
+    """
+    CONTAINER_COLUMNS = (('CONTAINER', 40), ('STATE', 10), ('USER', 12), ('MEMORY', 8), ('VCORES', 6),
+                         ('EXIT', 5))
+
+    def __init__(self, node_manager, interval=2, stream=None, max_rows=None):
+        super(NodeManagerTop, self).__init__(interval, stream, max_rows)
+        self.node_manager = node_manager
+
+    def fetch(self):
+        nm = self.node_manager
+        info, containers = self._fetch_all(nm.node_information, nm.node_containers)
+
+        node = info.data.get('nodeInfo') or {}
+        lines = [
+            'yarn top - {now}  node: {host}  healthy: {healthy}  {report}'.format(
+                now=time.strftime('%H:%M:%S'), host=node.get('nodeHostName'), healthy=node.get('nodeHealthy'),
+                report=node.get('healthReport') or ''),
+            'allocated memory: {memory} MB  vcores: {vcores}'.format(
+                memory=node.get('totalPmemAllocatedContainersMB'),
+                vcores=node.get('totalVCoresAllocatedContainers')),
+            '',
+            format_header(self.CONTAINER_COLUMNS),
+        ]
+        for container in _items(containers.data, 'containers', 'container'):
+            lines.append(format_row(self.CONTAINER_COLUMNS, (
+                container.get('id'), container.get('state'), container.get('user'),
+                container.get('totalMemoryNeededMB'), container.get('totalVCoresNeeded'),
+                container.get('exitCode'))))
+        return lines